@@ -0,0 +1,361 @@
+"""Benchmarks.api_benchmark
+
+Load test for the read-side query API (`Utilities.query_api`).
+
+Seeds a scratch schema (`bench_api`) with synthetic listings shaped like
+`products`, spread over every source, category and a year of
+`created_at`. Then it runs the API in a separate process on that schema.
+First, every page of a few filters is walked through the cursors and
+checked against COUNT(*), so keyset pagination returns each row exactly
+once. Then `--clients` keep-alive clients send a mix of requests for
+`--duration` seconds, twice:
+
+    uncached    cache TTL 0: every request reads Postgres
+    cached      the default TTL, with a crawl-commit NOTIFY every
+                `--invalidate-every` seconds clearing the cache
+
+The mix is first pages of common filters, walks a few pages deep through
+the cursors, and revalidations of an earlier response with If-None-Match
+(answered 304). Reported per phase: requests/s, p50/p95/p99 latency per
+request kind and the server's cache hit rate. The exit status is 1 when
+pagination returned a row twice or missed one, any request failed, or
+the cached phase fell below `--min-rps` or above the `--budget-ms` p99.
+
+Use case:
+    python -m Benchmarks.api_benchmark --rows 200000 --clients 16 --duration 20
+    python -m Benchmarks.api_benchmark --skip-seed --min-rps 300 --budget-ms 25
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from Utilities import db_utils
+
+SCHEMA = "bench_api"
+
+SOURCES = ["motorsport", "rallycars", "racecars", "classiccars", "racecarsdirect"]
+CATEGORIES = ["race-cars", "rally-cars", "sports-cars", "touring-cars",
+              "historic-road-cars", "performance-road-cars", "other-items"]
+
+# Filters the clients page through; the first three are also walked in full
+FILTERS = [
+    {"category": "rally-cars"},
+    {"source": "racecars", "max_price": 40000},
+    {"since": "2026-06-01", "min_price": 20000},
+    {},
+    {"source": "motorsport"},
+    {"category": "race-cars", "min_price": 10000, "max_price": 80000},
+    {"source": "rallycars", "category": "historic-road-cars"},
+    {"until": "2026-03-01"},
+]
+
+# Share of each request kind in the client mix
+MIX = {"first_page": 0.5, "walk": 0.35, "revalidate": 0.15}
+WALK_PAGES = 5
+
+
+def seed(conn, rows, batch=100000):
+    """(Re)create the scratch schema and fill it with `rows` listings."""
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+    cur.execute(f"CREATE SCHEMA {SCHEMA};")
+    cur.execute(f"CREATE TABLE {SCHEMA}.products (LIKE public.products INCLUDING ALL);")
+    conn.commit()
+
+    sources = "ARRAY[" + ", ".join(f"'{s}'" for s in SOURCES) + "]"
+    cats = "ARRAY[" + ", ".join(f"'{c}'" for c in CATEGORIES) + "]"
+
+    for start in range(1, rows + 1, batch):
+        stop = min(start + batch - 1, rows)
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.products
+                (source, unique_id, title, price, date, image_urls, link_url, location,
+                 category, status, created_at)
+            SELECT
+                ({sources})[1 + g % {len(SOURCES)}],
+                'API_' || g,
+                'Listing ' || g,
+                '£' || (1000 + (g::bigint * 7919) % 200000),
+                to_char(TIMESTAMP '2026-10-01' - (g::bigint * 311 % 31536000) * INTERVAL '1 second', 'DD Month YYYY'),
+                ARRAY['https://example.com/img/' || g || '.jpg'],
+                'https://example.com/listing/' || g,
+                'Silverstone',
+                ARRAY[({cats})[1 + (g / 3) % {len(CATEGORIES)}]],
+                CASE WHEN g % 50 = 0 THEN 'removed' ELSE 'active' END,
+                -- Spread over a year, with some listings stored in the same second
+                TIMESTAMP '2026-10-01' - (g::bigint * 311 % 31536000 / 3 * 3) * INTERVAL '1 second'
+            FROM generate_series(%s, %s) AS g;
+        """, (start, stop))
+        conn.commit()
+        print(f"Seeded {stop}/{rows} rows", file=sys.stderr)
+
+    cur.execute(f"ANALYZE {SCHEMA}.products;")
+    conn.commit()
+    cur.close()
+
+
+def connect():
+    """A connection that reads the scratch schema's products."""
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+    cur.execute(f"SET search_path TO {SCHEMA}, public;")
+    conn.commit()
+    cur.close()
+    return conn
+
+
+def _serve(port_queue, cache_ttl, pool_size):
+    """Process entry point: run the API on the scratch schema until terminated."""
+    from Utilities.query_api import QueryServer
+
+    server = QueryServer(0, connect=connect, pool_size=pool_size, cache_ttl=cache_ttl).start()
+    port_queue.put(server.server_address[1])
+    threading.Event().wait()
+
+
+class Client:
+    """One keep-alive HTTP connection to the API."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    def get(self, path, etag=None):
+        self.conn.request("GET", path, headers={"If-None-Match": etag} if etag else {})
+        response = self.conn.getresponse()
+        body = response.read()
+        return response.status, response.getheader("ETag"), body
+
+    def close(self):
+        self.conn.close()
+
+
+def listings_path(filters, cursor=None, limit=None):
+    params = dict(filters)
+    if limit:
+        params["limit"] = limit
+    if cursor:
+        params["cursor"] = cursor
+    return "/listings?" + urlencode(params)
+
+
+def check_pagination(port, conn, limit=200):
+    """Walk every page of the first filters; each row must come back exactly once."""
+    client = Client(port)
+    results = []
+    try:
+        for filters in FILTERS[:3]:
+            seen, duplicates, pages, cursor = set(), 0, 0, None
+            while True:
+                status, _, body = client.get(listings_path(filters, cursor, limit))
+                if status != 200:
+                    raise RuntimeError(f"{filters}: HTTP {status} {body[:200]!r}")
+                page = json.loads(body)
+                pages += 1
+                for row in page["listings"]:
+                    key = (row["source"], row["unique_id"])
+                    duplicates += key in seen
+                    seen.add(key)
+                cursor = page["next"]
+                if not cursor:
+                    break
+            expected = _count(conn, filters)
+            results.append({"filters": filters, "pages": pages, "rows": len(seen),
+                            "expected": expected, "duplicates": duplicates,
+                            "passed": not duplicates and len(seen) == expected})
+    finally:
+        client.close()
+    return results
+
+
+def _count(conn, filters):
+    conditions = ["status IS DISTINCT FROM 'removed'", "created_at IS NOT NULL"]
+    if "source" in filters:
+        conditions.append("source = %(source)s")
+    if "category" in filters:
+        conditions.append("category @> ARRAY[%(category)s]::text[]")
+    if "min_price" in filters:
+        conditions.append("price_value >= %(min_price)s")
+    if "max_price" in filters:
+        conditions.append("price_value <= %(max_price)s")
+    if "since" in filters:
+        conditions.append("created_at >= %(since)s")
+    if "until" in filters:
+        conditions.append("created_at < %(until)s")
+    cur = conn.cursor()
+    cur.execute(f"SELECT count(*) FROM {SCHEMA}.products WHERE {' AND '.join(conditions)};", filters)
+    count = cur.fetchone()[0]
+    cur.close()
+    return count
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))], 2)
+
+
+def load(port, clients, duration, seed_value, invalidate_every=None):
+    """Run `clients` threads against the API for `duration` seconds."""
+    timings = {kind: [] for kind in MIX}
+    errors = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client_loop(n):
+        rng = random.Random(seed_value * 1000 + n)
+        client = Client(port)
+        etags = {}
+        kinds, weights = list(MIX), list(MIX.values())
+        local = {kind: [] for kind in MIX}
+        try:
+            while time.perf_counter() < deadline:
+                kind = rng.choices(kinds, weights)[0]
+                filters = rng.choice(FILTERS)
+                paths = [listings_path(filters)]
+                if kind == "revalidate" and not etags:
+                    kind = "first_page"
+                if kind == "revalidate":
+                    path = rng.choice(list(etags))
+                    started = time.perf_counter()
+                    status, etag, _ = client.get(path, etags[path])
+                    local[kind].append((time.perf_counter() - started) * 1000)
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+                    continue
+
+                for depth in range(WALK_PAGES if kind == "walk" else 1):
+                    path = paths[-1]
+                    started = time.perf_counter()
+                    status, etag, body = client.get(path)
+                    local[kind].append((time.perf_counter() - started) * 1000)
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+                    if status != 200:
+                        errors.append(f"{path}: HTTP {status}")
+                        break
+                    etags[path] = etag
+                    cursor = json.loads(body)["next"]
+                    if not cursor:
+                        break
+                    paths.append(listings_path(filters, cursor))
+        except Exception as e:
+            errors.append(f"client {n}: {e}")
+        finally:
+            client.close()
+            with lock:
+                for kind, values in local.items():
+                    timings[kind].extend(values)
+
+    stop = threading.Event()
+
+    def invalidator():
+        # Stand-in for refresh_summaries at the end of a crawl
+        conn = db_utils.get_connection()
+        conn.autocommit = True
+        cur = conn.cursor()
+        while not stop.wait(invalidate_every):
+            cur.execute("SELECT pg_notify(%s, %s);", (db_utils.CRAWLS_CHANNEL, '{"changed": 0}'))
+        cur.close()
+        conn.close()
+
+    threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(clients)]
+    if invalidate_every:
+        threads.append(threading.Thread(target=invalidator, daemon=True))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads[:clients]:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    everything = sorted(t for values in timings.values() for t in values)
+    return {
+        "requests": len(everything),
+        "requests_per_s": round(len(everything) / elapsed, 1),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "p50_ms": _percentile(everything, 0.5),
+        "p95_ms": _percentile(everything, 0.95),
+        "p99_ms": _percentile(everything, 0.99),
+        "by_kind": {kind: {"requests": len(values),
+                           "p50_ms": _percentile(sorted(values), 0.5),
+                           "p99_ms": _percentile(sorted(values), 0.99)}
+                    for kind, values in timings.items()},
+        "errors": errors[:10],
+    }
+
+
+def _health(port):
+    client = Client(port)
+    try:
+        return json.loads(client.get("/health")[2])
+    finally:
+        client.close()
+
+
+def run_phase(args, cache_ttl, invalidate_every=None, conn=None):
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    process = context.Process(target=_serve, args=(port_queue, cache_ttl, args.pool_size), daemon=True)
+    process.start()
+    try:
+        port = port_queue.get(timeout=30)
+        pagination = check_pagination(port, conn) if conn is not None else None
+        result = load(port, args.clients, args.duration, args.seed, invalidate_every)
+        result["cache"] = _health(port)["cache"]
+        lookups = result["cache"]["hits"] + result["cache"]["misses"]
+        result["cache_hit_rate"] = round(result["cache"]["hits"] / lookups, 3) if lookups else None
+    finally:
+        process.terminate()
+        process.join()
+    return result, pagination
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per phase")
+    parser.add_argument("--pool-size", type=int, default=8, help="server database connections")
+    parser.add_argument("--invalidate-every", type=float, default=5.0, metavar="S",
+                        help="seconds between crawl-commit NOTIFYs in the cached phase")
+    parser.add_argument("--min-rps", type=float, default=200.0)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="p99 budget of the cached phase")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the rows from a previous run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    db_utils.create_table()
+    conn = db_utils.get_connection()
+    try:
+        if not args.skip_seed:
+            seed(conn, args.rows)
+        uncached, pagination = run_phase(args, cache_ttl=0, conn=conn)
+        cached, _ = run_phase(args, cache_ttl=60, invalidate_every=args.invalidate_every)
+    finally:
+        conn.close()
+
+    passed = (all(check["passed"] for check in pagination)
+              and not uncached["errors"] and not cached["errors"]
+              and cached["requests_per_s"] >= args.min_rps
+              and cached["p99_ms"] is not None and cached["p99_ms"] <= args.budget_ms)
+    print(json.dumps({
+        "config": vars(args),
+        "pagination": pagination,
+        "uncached": uncached,
+        "cached": cached,
+        "passed": passed,
+    }, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Benchmarks.dedupe_benchmark
+
+Accuracy and throughput benchmark for the near-duplicate engine in
+`Utilities.dedupe`, without a database.
+
+Generates `--listings` synthetic adverts of which `--duplicate-share`
+are re-posts of another advert on a different site: the title gains a
+suffix, about 5% of the description's words are dropped and a few added,
+and the images are renamed the way WordPress resizes them. The listings are
+signed and bucketed in batches of `--batch-size` exactly as
+`update_clusters` does, with an in-memory dict standing in for the GIN
+index, then linked into clusters. Reported:
+
+    listings_per_s    signing + lookup + verification throughput
+    precision         linked pairs that are planted duplicates
+    recall            planted duplicate pairs that were linked
+    candidates_per_listing  pairs verified per listing (the work LSH saves)
+
+The exit status is 1 when precision or recall falls below its floor.
+
+Use case:
+    python -m Benchmarks.dedupe_benchmark --listings 200000
+    python -m Benchmarks.dedupe_benchmark --listings 50000 --min-recall 0.95
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from Utilities import dedupe
+
+SOURCES = ["motorsportauctions", "rallycarsforsale", "racecarsforyou"]
+MAKES = ["Mitsubishi Evo IX", "Subaru Impreza WRX", "Ford Escort Mk2", "Porsche 911 GT3 Cup",
+         "BMW E30 M3", "Lancia Delta Integrale", "Audi Quattro", "Peugeot 205 T16", "Toyota Celica GT4",
+         "Honda Civic Type R", "Renault Clio Cup", "Citroen DS3 R5", "Radical SR3", "Ginetta G40"]
+WORDS = ("gearbox spare engine rebuilt rally race fresh wheels tyres sequential dogbox cage fia "
+         "homologation seats harness suspension dampers brakes logbook trailer spares package turbo "
+         "intercooler diff limited slip ecu loom hours since refresh competition history tarmac gravel "
+         "championship winner podium stage forest hillclimb sprint track day road legal mot").split()
+
+
+def make_advert(rng, k):
+    title = f"{rng.choice(MAKES)} {rng.choice(WORDS)} {rng.choice(WORDS)}"
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 200)))
+    images = [f"https://cdn.example.com/uploads/2026/{k}-{j}-{rng.getrandbits(24):06x}.jpg"
+              for j in range(rng.randint(3, 12))]
+    return title, description, images
+
+
+def repost(rng, advert):
+    """The same car on another site: small edits, resized image copies."""
+    title, description, images = advert
+    words = description.split()
+    kept = [w for w in words if rng.random() > 0.05]
+    kept += [rng.choice(WORDS) for _ in range(rng.randint(0, 4))]
+    resized = [url.replace(".jpg", f"-{rng.choice([768, 1024])}x576.jpg") for url in images
+               if rng.random() > 0.2]
+    return f"{title} - price reduced", " ".join(kept), resized
+
+
+def generate(n, duplicate_share, seed):
+    """Return [(unique_id, title, description, images)] and the planted duplicate groups."""
+    rng = random.Random(seed)
+    listings, groups = [], []
+    originals = int(n * (1 - duplicate_share))
+    for k in range(originals):
+        listings.append((f"{rng.choice(SOURCES)}_{k}", *make_advert(rng, k)))
+    while len(listings) < n:
+        k = rng.randrange(originals)
+        uid = f"{SOURCES[len(listings) % len(SOURCES)]}_dup{len(listings)}"
+        listings.append((uid, *repost(rng, listings[k][1:])))
+        groups.append((listings[k][0], uid))
+    rng.shuffle(listings)
+    return listings, groups
+
+
+def run(listings, batch_size):
+    """Sign, bucket and link in batches; returns the linked pairs and counters."""
+    signatures, members_by_key = {}, {}
+    matched, candidates = [], 0
+
+    for start in range(0, len(listings), batch_size):
+        batch_keys = {}
+        for uid, title, description, images in listings[start:start + batch_size]:
+            sig, keys = dedupe.sign_listing(title, description, images)
+            if sig is not None:
+                signatures[uid] = sig
+            batch_keys[uid] = keys
+            for key in keys:
+                members_by_key.setdefault(key, []).append(uid)
+
+        pairs = dedupe.candidate_pairs(batch_keys, members_by_key)
+        candidates += len(pairs)
+        matched += [(a, b) for a, b in pairs
+                    if dedupe.similarity(signatures[a], signatures[b]) >= dedupe.MATCH_THRESHOLD]
+    return matched, candidates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--listings", type=int, default=100000)
+    parser.add_argument("--duplicate-share", type=float, default=0.2,
+                        help="share of listings that re-post another advert (default: 0.2)")
+    parser.add_argument("--batch-size", type=int, default=dedupe.BATCH_SIZE)
+    parser.add_argument("--min-precision", type=float, default=0.98)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    listings, groups = generate(args.listings, args.duplicate_share, args.seed)
+
+    started = time.perf_counter()
+    matched, candidates = run(listings, args.batch_size)
+    seconds = time.perf_counter() - started
+
+    # Planted truth: a re-post and its original, plus re-posts of the same original
+    truth = set()
+    for component in dedupe.link_components(groups):
+        members = sorted(component)
+        truth.update((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+    # Transitive links count: score pairs within the clusters the engine built
+    found = set()
+    for component in dedupe.link_components(matched):
+        members = sorted(component)
+        found.update((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+
+    true_positives = len(found & truth)
+    precision = true_positives / len(found) if found else 1.0
+    recall = true_positives / len(truth) if truth else 1.0
+
+    results = {
+        "config": vars(args),
+        "seconds": round(seconds, 2),
+        "listings_per_s": round(len(listings) / seconds, 1),
+        "candidates_per_listing": round(candidates / len(listings), 3),
+        "linked_pairs": len(found),
+        "planted_pairs": len(truth),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "passed": precision >= args.min_precision and recall >= args.min_recall,
+    }
+    print(json.dumps(results, indent=2))
+    return 0 if results["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
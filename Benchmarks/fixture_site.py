@@ -0,0 +1,593 @@
+"""Benchmarks.fixture_site
+
+Local HTTP server that imitates the scraped sites.
+
+Pages are generated on the fly from a seeded model and follow each page
+object's DOM contract:
+
+    /msa/        MotorsportAuctions: `advert-item-col` grids under
+                 `middle-content`, `page-numbers` pagination links, and
+                 detail pages with `adverts-content`, Location/Phone
+                 blocks and `wpadverts` galleries (some adverts 404 with
+                 the site's removal text). The home page has the recent
+                 (`#option01`) and featured (`#option02`) panels, whose
+                 "Load More" buttons POST to `wp-admin/admin-ajax.php`
+                 and append the JSON-wrapped card fragment it returns.
+    /rally/      RallyCarsForSale: `post-block-out` cards, WordPress
+                 `page-numbers` pagination and the `total` "Page N"
+                 indicator.
+    /racecars/   RaceCarsForYou: FacetWP `grid_listing` cards, refreshed
+                 in place over a JSON endpoint while the `loading-icon`
+                 shows, with `facetwp-page` pager links.
+
+Listing count, HTML latency, description size, removed share and the
+share of MotorsportAuctions adverts listed in two categories are
+configurable. `touch(share)` gives that share of the sitemap adverts a
+new `lastmod`, as if their sellers had edited them. Requests are counted
+per kind so a harness can report navigations.
+
+Use case:
+    server = FixtureSite(listings=500, latency=0.05)
+    server.start()
+    ...point a page object's homeLink at server.url("msa")...
+    server.stop()
+"""
+
+import gzip
+import hashlib
+import html
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MSA_CATEGORY_IDS = {
+    "esports": 20,
+    "race-cars": 61,
+    "rally-cars": 66,
+    "sports-cars": 75,
+    "performance-road-cars": 60,
+    "touring-cars": 79,
+    "historic-road-cars": 23,
+    "transporters-and-support-vehicles": 87,
+    "other-items": 24,
+}
+
+PAGE_SIZES = {"msa": 24, "rally": 20, "racecars": 50}
+
+# Cards per MotorsportAuctions home panel page ("Load More" adds this many)
+MSA_PANEL_SIZE = 12
+
+# URLs per Classiccarsforsale listing sitemap
+SITEMAP_SIZE = 100
+
+MSA_REMOVED_TEXT = "Oops! That page can’t be found."
+
+# 1x1 transparent GIF served for every image URL
+PIXEL = bytes.fromhex("47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b")
+
+MAKES = ["Mitsubishi Evo IX", "Subaru Impreza", "Porsche 911 GT3", "BMW E30 M3", "Ford Escort Mk2",
+         "Lotus Elise", "Radical SR3", "Ginetta G40", "Honda Civic Type R", "Audi Quattro"]
+
+WORDS = ("fresh engine rebuild sequential gearbox FIA seats harnesses roll cage spare wheels "
+         "data logger adjustable dampers brake bias lightweight panels log book history").split()
+
+
+def _hash(*parts):
+    return int(hashlib.sha256(":".join(map(str, parts)).encode()).hexdigest()[:12], 16)
+
+
+class FixtureSite(ThreadingHTTPServer):
+    """Generated stand-in for motorsportauctions, rallycarsforsale and racecarsforyou.
+
+    Args:
+        listings: adverts per site.
+        latency: seconds added to every HTML/JSON response.
+        description_kb: approximate size of each detail description.
+        removed_share: share of MotorsportAuctions adverts that 404.
+        overlap: share of MotorsportAuctions adverts also listed in the
+            next category.
+        categories: MotorsportAuctions categories the adverts are spread
+            over (defaults to all of them).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, listings=200, latency=0.0, description_kb=2, removed_share=0.02,
+                 overlap=0.1, categories=None, seed=0, port=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.listings = listings
+        self.latency = latency
+        self.description_kb = description_kb
+        self.removed_share = removed_share
+        self.overlap = overlap
+        self.categories = list(categories or MSA_CATEGORY_IDS)
+        self.seed = seed
+        self.revision = 0
+        self.touched_share = 0.0
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def url(self, site=""):
+        return f"http://127.0.0.1:{self.server_address[1]}/{site}/" if site else \
+            f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+
+    # ---------------- MODEL ---------------- #
+
+    def _title(self, site, k):
+        return f"{MAKES[_hash(self.seed, site, k) % len(MAKES)]} #{k}"
+
+    def _price(self, site, k):
+        return f"£{5000 + _hash(self.seed, site, k, 'p') % 95000:,}"
+
+    def _description(self, k):
+        words = []
+        size = 0
+        n = 0
+        while size < self.description_kb * 1024:
+            word = WORDS[_hash(self.seed, k, n) % len(WORDS)]
+            words.append(word + ("\r\n" if n % 12 == 11 else " "))
+            size += len(word) + 1
+            n += 1
+        return "".join(words)
+
+    def msa_category_ads(self, slug):
+        if slug not in self.categories:
+            return []
+        ci = self.categories.index(slug)
+        count = len(self.categories)
+        own = [k for k in range(self.listings) if k % count == ci]
+        # Adverts of the previous category also listed here
+        shared = [k for k in range(self.listings)
+                  if k % count == (ci - 1) % count and _hash(self.seed, "overlap", k) % 1000 < self.overlap * 1000]
+        return own + shared
+
+    def msa_removed(self, k):
+        return _hash(self.seed, "removed", k) % 1000 < self.removed_share * 1000
+
+    def msa_panel_ads(self, panel):
+        """Adverts of a home panel, in display order: recent is newest first, featured every fifth."""
+        if panel == "recent":
+            return [k for k in reversed(range(self.listings)) if not self.msa_removed(k)]
+        return [k for k in range(self.listings)
+                if _hash(self.seed, "featured", k) % 5 == 0 and not self.msa_removed(k)]
+
+    def touch(self, share):
+        """Give `share` of the sitemap adverts a new lastmod; returns how many changed."""
+        self.revision += 1
+        self.touched_share = share
+        return sum(1 for k in range(self.listings) if self._touched(k))
+
+    def _touched(self, k):
+        return self.revision and _hash(self.seed, "touch", self.revision, k) % 1000 < self.touched_share * 1000
+
+    def lastmod(self, site, k):
+        # Edited adverts move into April, so a touch always changes the value
+        if self._touched(k):
+            return f"2026-04-{1 + _hash(self.seed, site, k, self.revision) % 28:02d}T09:30:00+00:00"
+        return f"2026-03-{1 + _hash(self.seed, site, k) % 28:02d}T09:30:00+00:00"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FixtureSite
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", slow=True):
+        if slow and self.server.latency:
+            time.sleep(self.server.latency)
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        # The page objects build some links with a doubled slash
+        path = "/" + "/".join(p for p in parts.path.split("/") if p)
+        query = parse_qs(parts.query)
+        segments = path.strip("/").split("/")
+
+        if segments[0] == "img":
+            self.server.count("image")
+            return self._send(200, PIXEL, "image/gif", slow=False)
+
+        routes = {"msa": self._msa, "rally": self._rally, "racecars": self._racecars,
+                  "ccfs": self._ccfs, "rcd": self._rcd}
+        handler = routes.get(segments[0])
+        if handler is None:
+            self.server.count("other")
+            return self._send(404, "<html><body>Not found</body></html>")
+        return handler(segments[1:], query)
+
+    # ---------------- MOTORSPORTAUCTIONS ---------------- #
+
+    def _msa(self, segments, query):
+        server = self.server
+        if not segments:
+            server.count("msa.home")
+            return self._send(200, self._msa_home())
+
+        if segments[0] == "category" and len(segments) == 3:
+            server.count("msa.list")
+            slug = segments[2].removesuffix(".html")
+            page = int(query.get("page", ["1"])[0])
+            return self._send(200, self._msa_list(slug, page))
+
+        if segments[0] == "advert" and len(segments) == 2:
+            server.count("msa.detail")
+            k = int(segments[1].removesuffix(".html"))
+            if server.msa_removed(k):
+                return self._send(404, _page("Not found", f"<h1>{MSA_REMOVED_TEXT}</h1>"))
+            return self._send(200, self._msa_detail(k))
+
+        server.count("other")
+        return self._send(404, _page("Not found", f"<h1>{MSA_REMOVED_TEXT}</h1>"))
+
+    def _msa_list(self, slug, page):
+        server = self.server
+        ads = server.msa_category_ads(slug)
+        size = PAGE_SIZES["msa"]
+        pages = max(1, -(-len(ads) // size))
+        base = f"/msa/category/{MSA_CATEGORY_IDS.get(slug, 0)}/{slug}.html"
+
+        # Advert links are absolute, as on the live site; detail crawls navigate to them as-is
+        cards = []
+        for k in ads[(page - 1) * size:page * size]:
+            title = html.escape(server._title("msa", k))
+            cards.append(f"""
+<div class="advert-item-col">
+  <a href="{server.url("msa")}advert/{k}.html"><span title="{title}" class="ad-title">{title}</span></a>
+  <img src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" nitro-lazy-src="/img/{k}-0.gif">
+  <div class="advert-price">{server._price("msa", k)}</div>
+  <span class="advert-date">{1 + k % 28} March 2026</span>
+</div>""")
+
+        pager = "".join(
+            f'<span class="page-numbers current">{p}</span>' if p == page
+            else f'<a class="page-numbers" href="{base}?page={p}">{p}</a>'
+            for p in range(1, pages + 1)
+        )
+        return _page(slug, f'<div class="middle-content">{"".join(cards)}</div><nav>{pager}</nav>')
+
+    def _msa_home(self):
+        panels = []
+        for option, panel, heading in (("option01", "recent", "Recent Adverts"),
+                                       ("option02", "featured", "Featured Adverts")):
+            cards = self._msa_panel_cards(panel, 1)
+            button = (f'<button class="load-more" data-type="{panel}" data-page="2">Load More</button>'
+                      if len(self.server.msa_panel_ads(panel)) > MSA_PANEL_SIZE else "")
+            panels.append(f"""
+<div id="{option}" class="content-block"><h2>{heading}</h2>
+  <div class="content-block-inner"><div class="ads">{cards}</div>{button}</div>
+</div>""")
+        return _page("Motorsport Auctions", f"""
+<nav><a href="/msa/">Home</a></nav>
+<div class="middle-content">{"".join(panels)}</div>
+<script>
+document.querySelectorAll(".content-block h2").forEach(function (heading) {{
+  heading.addEventListener("click", function () {{
+    var inner = heading.nextElementSibling;
+    inner.style.display = inner.style.display === "none" ? "" : "none";
+  }});
+}});
+document.querySelectorAll("button.load-more").forEach(function (button) {{
+  button.addEventListener("click", function () {{
+    var body = new URLSearchParams({{action: "msa_load_more", type: button.dataset.type, paged: button.dataset.page}});
+    fetch("/msa/wp-admin/admin-ajax.php", {{method: "POST", body: body, headers: {{"X-Requested-With": "XMLHttpRequest"}}}})
+      .then(function (response) {{ return response.json(); }})
+      .then(function (reply) {{
+        button.previousElementSibling.insertAdjacentHTML("beforeend", reply.data.html);
+        button.dataset.page = String(Number(button.dataset.page) + 1);
+        if (!reply.data.has_more) button.remove();
+      }});
+  }});
+}});
+</script>""")
+
+    def _msa_panel_cards(self, panel, page):
+        server = self.server
+        ads = server.msa_panel_ads(panel)[(page - 1) * MSA_PANEL_SIZE:page * MSA_PANEL_SIZE]
+        prefix = "advert_id_" if panel == "recent" else "featured_id_"
+        cards = []
+        for k in ads:
+            title = html.escape(server._title("msa", k))
+            cards.append(f"""
+<div id="{prefix}{k}" class="advert-item">
+  <a href="{server.url("msa")}advert/{k}.html"><img data-src="/img/{k}-0.gif" src="/img/blank.gif"></a>
+  <span title="{title}" class="ad-title">{title}</span>
+  <div class="advert-price">{server._price("msa", k)}</div>
+  <span class="advert-date">{1 + k % 28} March 2026</span>
+</div>""")
+        return "".join(cards)
+
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if parts.path.rstrip("/") != "/msa/wp-admin/admin-ajax.php" or form.get("action") != ["msa_load_more"]:
+            self.server.count("other")
+            return self._send(400, json.dumps({"success": False}), "application/json")
+
+        self.server.count("msa.load_more")
+        panel = form.get("type", ["recent"])[0]
+        page = int(form.get("paged", ["1"])[0])
+        more = len(self.server.msa_panel_ads(panel)) > page * MSA_PANEL_SIZE
+        reply = {"success": True, "data": {"html": self._msa_panel_cards(panel, page), "has_more": more}}
+        return self._send(200, json.dumps(reply), "application/json; charset=UTF-8")
+
+    def _msa_detail(self, k):
+        server = self.server
+        gallery = "".join(f'<li class="wpadverts-slide"><img src="/img/{k}-{i}.gif"></li>' for i in range(4))
+        return _page(server._title("msa", k), f"""
+<div class="adverts-content">{html.escape(server._description(k))}</div>
+<div class="adverts-meta">
+  <span>Location</span><div>Silverstone, UK</div>
+  <span>Phone</span><div>+44 1234 {k:06d}</div>
+</div>
+<ul>{gallery}</ul>""")
+
+    # ---------------- RALLYCARSFORSALE ---------------- #
+
+    def _rally(self, segments, query):
+        self.server.count("rally.list")
+        page = int(segments[1]) if len(segments) >= 2 and segments[0] == "page" else 1
+        return self._send(200, self._rally_list(page))
+
+    def _rally_list(self, page):
+        server = self.server
+        size = PAGE_SIZES["rally"]
+        pages = max(1, -(-server.listings // size))
+        dates = ["{n} hours ago", "{n} dagen ago", "December {n}, 2025", "{n} minutes ago"]
+
+        cards = []
+        for k in range((page - 1) * size, min(page * size, server.listings)):
+            date = dates[k % len(dates)].format(n=1 + k % 20)
+            price = "" if k % 15 == 0 else f'<p class="post-price">{server._price("rally", k)}</p>'
+            cards.append(f"""
+<div class="post-block-out">
+  <a href="{server.url("rally")}ad/{k}/"><img src="/img/r{k}.gif"></a>
+  <h3><a href="{server.url("rally")}ad/{k}/">{html.escape(server._title("rally", k))}</a></h3>
+  {price}
+  <span class="dashicons-before clock"><span>{date}</span></span>
+</div>""")
+
+        query = "?s=&sa=search&scat=8"
+        links = "".join(
+            f'<span class="page-numbers current">{p}</span>' if p == page
+            else f'<a class="page-numbers" href="/rally/page/{p}/{query}">{p}</a>'
+            for p in range(1, pages + 1)
+        )
+        if page < pages:
+            links += f'<a class="next page-numbers" href="/rally/page/{page + 1}/{query}">Next</a>'
+        body = f"""
+<span class="total">Page {page} of {pages}</span>
+<div class="listings">{"".join(cards)}</div>
+<div class="paging">{links}</div>"""
+        return _page("Rally cars for sale", body)
+
+    # ---------------- RACECARSFORYOU ---------------- #
+
+    def _racecars(self, segments, query):
+        if segments and segments[0] == "fwp":
+            # FacetWP refresh: grid and pager for one page as JSON
+            self.server.count("racecars.ajax")
+            page = int(query.get("page", ["1"])[0])
+            grid, pager = self._racecars_fragments(page)
+            return self._send(200, json.dumps({"grid": grid, "pager": pager}), "application/json")
+
+        self.server.count("racecars.list")
+        grid, pager = self._racecars_fragments(1)
+        body = f"""
+<div class="loading-icon"></div>
+<div class="facetwp-template">{grid}</div>
+<div class="facetwp-pager">{pager}</div>
+<script>
+document.addEventListener("click", async (event) => {{
+  const link = event.target.closest("a.facetwp-page");
+  if (!link) return;
+  event.preventDefault();
+  const loader = document.querySelector(".loading-icon");
+  loader.className = "loading-icon loading";
+  const response = await fetch("/racecars/fwp?page=" + link.dataset.page);
+  const data = await response.json();
+  document.querySelector(".facetwp-template").innerHTML = data.grid;
+  document.querySelector(".facetwp-pager").innerHTML = data.pager;
+  loader.className = "loading-icon";
+}});
+</script>"""
+        return self._send(200, _page("Race cars for you", body))
+
+    def _racecars_fragments(self, page):
+        server = self.server
+        size = PAGE_SIZES["racecars"]
+        pages = max(1, -(-server.listings // size))
+
+        cards = []
+        for k in range((page - 1) * size, min(page * size, server.listings)):
+            price = server._price("racecars", k)
+            if k % 7 == 0:
+                price_html = f'<del>{price}</del><span class="sale_price">{server._price("racecars", k + 1)}</span>'
+            else:
+                price_html = price
+            cards.append(f"""
+<div class="grid_listing listing-{k}">
+  <img src="/img/c{k}.gif">
+  <h2 class="entry-title"><a href="{server.url("racecars")}listing/{k}/">{html.escape(server._title("racecars", k))}</a></h2>
+  <div class="grid_listing_price">{price_html}</div>
+</div>""")
+
+        def link(p, label, extra=""):
+            active = " active" if p == page else ""
+            return f'<a class="facetwp-page{extra}{active}" data-page="{p}">{label}</a>'
+
+        pager = "".join(link(p, p, " first" if p == 1 else "") for p in range(1, pages))
+        pager += link(pages, pages, " last")
+        if page < pages:
+            pager += link(page + 1, "Next", " next")
+        return "".join(cards), pager
+
+
+    # ---------------- CLASSICCARSFORSALE ---------------- #
+
+    def _ccfs(self, segments, query):
+        server = self.server
+        base = server.url("ccfs")
+        if segments == ["robots.txt"]:
+            server.count("ccfs.robots")
+            return self._send(200, f"User-agent: *\nDisallow: /search/\nSitemap: {base}sitemap_index.xml\n",
+                              "text/plain", slow=False)
+
+        if segments == ["sitemap_index.xml"]:
+            server.count("ccfs.sitemap")
+            children = [f"{base}sitemap-listings-{i}.xml.gz"
+                        for i in range((server.listings + SITEMAP_SIZE - 1) // SITEMAP_SIZE)]
+            children.append(f"{base}sitemap-pages.xml")
+            return self._send(200, _sitemap_index(children), "application/xml")
+
+        if len(segments) == 1 and segments[0].startswith("sitemap-listings-"):
+            server.count("ccfs.sitemap")
+            i = int(segments[0].removeprefix("sitemap-listings-").removesuffix(".xml.gz"))
+            ks = range(i * SITEMAP_SIZE, min(server.listings, (i + 1) * SITEMAP_SIZE))
+            xml = _urlset((self._ccfs_link(k), server.lastmod("ccfs", k)) for k in ks)
+            return self._send(200, gzip.compress(xml.encode("utf-8")), "application/x-gzip")
+
+        if segments == ["sitemap-pages.xml"]:
+            server.count("ccfs.sitemap")
+            return self._send(200, _urlset([(f"{base}about/", None), (f"{base}listings/", None)]),
+                              "application/xml")
+
+        if segments[0] == "listing" and len(segments) == 2:
+            server.count("ccfs.detail")
+            k = int(segments[1].rsplit("-", 1)[1])
+            if k >= server.listings or server.msa_removed(k):
+                return self._send(404, _page("Not found", "<h1>Listing not found</h1>"))
+            return self._send(200, self._ccfs_detail(k))
+
+        server.count("other")
+        return self._send(404, _page("Not found", "<h1>Not found</h1>"))
+
+    def _ccfs_link(self, k):
+        slug = self.server._title("ccfs", k).split(" #")[0].lower().replace(" ", "-")
+        return f"{self.server.url('ccfs')}listing/{slug}-{k}/"
+
+    def _ccfs_detail(self, k):
+        server = self.server
+        title = server._title("ccfs", k)
+        description = server._description(k)
+        images = [f"{server.url()}img/ccfs-{k}-{i}.jpg" for i in range(5)]
+        vehicle = {
+            "@context": "https://schema.org",
+            "@type": "Vehicle",
+            "name": title,
+            "description": description[:160],
+            "image": images,
+            "category": "Classic Cars",
+            "datePosted": server.lastmod("ccfs", k)[:10],
+            "offers": {
+                "@type": "Offer",
+                "price": str(5000 + _hash(server.seed, "ccfs", k, "p") % 95000),
+                "priceCurrency": "USD",
+                "availableAtOrFrom": {"@type": "Place", "address": {
+                    "@type": "PostalAddress", "addressLocality": "Austin", "addressRegion": "TX"}},
+                "seller": {"@type": "Person", "name": "Private seller", "telephone": f"+1 512 {k:07d}"},
+            },
+        }
+        crumbs = {"@context": "https://schema.org", "@type": "BreadcrumbList", "itemListElement": [
+            {"@type": "ListItem", "position": 1, "name": "Home"},
+            {"@type": "ListItem", "position": 2, "name": "Classic Cars"},
+            {"@type": "ListItem", "position": 3, "name": title},
+        ]}
+        scripts = "".join(f'<script type="application/ld+json">{json.dumps(block)}</script>'
+                          for block in (vehicle, crumbs))
+        paragraphs = "".join(f"<p>{html.escape(part)}</p>" for part in description.split("\r\n") if part)
+        return _page(title, f"""{scripts}
+<h1>{html.escape(title)}</h1>
+<script>window.dataLayer = [];</script>
+<div class="listing-description">{paragraphs}</div>
+<div class="gallery">{"".join(f'<img src="{src}">' for src in images)}</div>""")
+
+    # ---------------- RACECARSDIRECT ---------------- #
+
+    def _rcd(self, segments, query):
+        server = self.server
+        base = server.url("rcd")
+        if segments == ["sitemap.xml"]:
+            server.count("rcd.sitemap")
+            entries = [(f"{base}", None), (f"{base}Advert/Search", None)]
+            entries += [(f"{base}Advert/Details/{k}/{self._rcd_slug(k)}", server.lastmod("rcd", k))
+                        for k in range(server.listings)]
+            return self._send(200, _urlset(entries), "application/xml")
+
+        if len(segments) >= 3 and segments[0] == "Advert" and segments[1] == "Details":
+            server.count("rcd.detail")
+            k = int(segments[2])
+            if k >= server.listings or server.msa_removed(k):
+                return self._send(404, _page("Not found", "<h1>Advert not found</h1>"))
+            return self._send(200, self._rcd_detail(k))
+
+        server.count("other")
+        return self._send(404, _page("Not found", "<h1>Not found</h1>"))
+
+    def _rcd_slug(self, k):
+        return self.server._title("rcd", k).split(" #")[0].replace(" ", "-")
+
+    def _rcd_detail(self, k):
+        server = self.server
+        title = server._title("rcd", k)
+        price = 5000 + _hash(server.seed, "rcd", k, "p") % 95000
+        images = [f"{server.url()}img/rcd-{k}-{i}.jpg" for i in range(4)]
+        paragraphs = "".join(f"<p>{html.escape(part)}</p>"
+                             for part in server._description(k).split("\r\n") if part)
+        og = "".join(f'<meta property="og:image" content="{src}">' for src in images)
+        body = f"""{og}
+<meta property="og:title" content="{html.escape(title)}">
+<div itemscope itemtype="https://schema.org/Product">
+  <h1 itemprop="name">{html.escape(title)}</h1>
+  <div itemprop="offers" itemscope itemtype="https://schema.org/Offer">
+    <span itemprop="priceCurrency" content="GBP">£</span><span itemprop="price">{price}</span>
+  </div>
+  <span itemprop="addressLocality">Silverstone</span>
+  <span itemprop="telephone">+44 1327 {k:06d}</span>
+  <div class="advert-description">{paragraphs}</div>
+</div>"""
+        return _page(title, body)
+
+
+def _sitemap_index(urls):
+    items = "".join(f"<sitemap><loc>{html.escape(url)}</loc></sitemap>" for url in urls)
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</sitemapindex>')
+
+
+def _urlset(entries):
+    items = "".join(f"<url><loc>{html.escape(url)}</loc>"
+                    + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</url>"
+                    for url, lastmod in entries)
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</urlset>')
+
+
+def _page(title, body):
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(str(title))}</title></head>
+<body>{body}</body></html>"""
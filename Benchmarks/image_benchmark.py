@@ -0,0 +1,200 @@
+"""Benchmarks.image_benchmark
+
+Throughput and dedupe benchmark for the image pipeline
+(`Utilities.images_async` into `Utilities.image_store`).
+
+A local image server serves `--images` generated JPEGs of about
+`--width` pixels. Each photo is reachable under one gallery URL per
+listing it appears in, plus a list-card URL for the first photo of every
+listing, and `--repost-share` of the listings re-use another listing's
+photos. So the pipeline fetches more URLs than there are distinct images,
+as it does on the real sites. The URLs are fetched into a fresh store
+in a temporary directory, and then fetched again. The second pass must
+request nothing because the index already holds every URL. Reported:
+
+    images_per_s / mb_per_s   first-pass download + store throughput
+    dedupe_ratio              fetched URLs per distinct image stored
+    second_pass_requests      requests the server saw on the second pass
+
+The exit status is 1 when anything failed, the stored image count is
+wrong, or the second pass requested anything.
+
+Use case:
+    python -m Benchmarks.image_benchmark --images 500 --latency 30
+    python -m Benchmarks.image_benchmark --images 2000 --concurrency 32 --width 1600
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PHOTOS_PER_LISTING = 6
+
+
+class ImageServer(ThreadingHTTPServer):
+    """Serves /img/<photo>/<alias>.jpg; every alias of a photo returns the same bytes."""
+
+    daemon_threads = True
+
+    def __init__(self, photos, width, latency=0.0, seed=0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.photos = photos
+        self.width = width
+        self.latency = latency
+        self.seed = seed
+        self.requests = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def url(self, photo, alias):
+        return f"http://127.0.0.1:{self.server_address[1]}/img/{photo}/{alias}.jpg"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def photo(self, k):
+        """JPEG bytes for photo `k`: a seeded colour grid upscaled smoothly, so it compresses like a photo."""
+        with self._lock:
+            self.requests += 1
+            if k in self._cache:
+                return self._cache[k]
+        from PIL import Image
+
+        rng = random.Random(self.seed * 1_000_003 + k)
+        height = self.width * 3 // 4
+        small = Image.new("RGB", (32, 24))
+        small.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(32 * 24)])
+        image = small.resize((self.width, height), Image.Resampling.BICUBIC)
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=85)
+        data = out.getvalue()
+        with self._lock:
+            self._cache[k] = data
+        return data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: ImageServer
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        segments = self.path.strip("/").split("/")
+        if len(segments) != 3 or segments[0] != "img" or not segments[1].isdigit() \
+                or int(segments[1]) >= self.server.photos:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = self.server.photo(int(segments[1]))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def gallery_urls(server, photos, repost_share, seed):
+    """Card and gallery URLs of every listing; re-posts re-use another listing's photos."""
+    rng = random.Random(seed)
+    listings = photos // PHOTOS_PER_LISTING
+    urls = []
+    for listing in range(listings):
+        owner = rng.randrange(listings) if rng.random() < repost_share else listing
+        gallery = range(owner * PHOTOS_PER_LISTING, (owner + 1) * PHOTOS_PER_LISTING)
+        urls.append(server.url(gallery[0], f"card-{listing}"))
+        urls += [server.url(photo, f"listing-{listing}-{i}") for i, photo in enumerate(gallery)]
+    return urls
+
+
+async def fetch_twice(server, urls, directory, concurrency):
+    from playwright.async_api import async_playwright
+
+    from Utilities.image_store import ImageStore
+    from Utilities.images_async import fetch_images
+    from Utilities.throttle_async import UNLIMITED, configure_host
+
+    configure_host(server.url(0, "x"), **UNLIMITED)
+    async with async_playwright() as pw:
+        request = await pw.request.new_context()
+        store = ImageStore(directory)
+        try:
+            first = await fetch_images(request, urls, store, concurrency=concurrency)
+            before = server.requests
+            second = await fetch_images(request, urls, store, concurrency=concurrency)
+            second["server_requests"] = server.requests - before
+            stats = store.stats()
+        finally:
+            store.close()
+            await request.dispose()
+    return first, second, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--images", type=int, default=600, help="distinct photos on the server")
+    parser.add_argument("--width", type=int, default=1200, help="photo width in pixels")
+    parser.add_argument("--repost-share", type=float, default=0.15,
+                        help="share of listings re-using another listing's photos (default: 0.15)")
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency per image (ms)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--keep", metavar="DIR", help="store into DIR and keep it (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = ImageServer(args.images, args.width, latency=args.latency / 1000, seed=args.seed)
+    # Encode the photos up front so the server's JPEG work is not timed against the pipeline
+    for k in range(args.images):
+        server.photo(k)
+    server.requests = 0
+    server.start()
+    urls = gallery_urls(server, args.images, args.repost_share, args.seed)
+    # Photos no listing links to are never fetched
+    expected = len({url.split("/")[-2] for url in urls})
+
+    directory = args.keep or tempfile.mkdtemp(prefix="image_bench_")
+    try:
+        first, second, stats = asyncio.run(fetch_twice(server, urls, directory, args.concurrency))
+    finally:
+        server.stop()
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    seconds = first["seconds"] or 1e-9
+    passed = (first["failed"] == 0 and stats["images"] == expected
+              and second["server_requests"] == 0 and second["skipped"] == len(set(urls)))
+    results = {
+        "config": vars(args),
+        "urls": len(set(urls)),
+        "distinct_images": expected,
+        "first_pass": first,
+        "second_pass": second,
+        "images_per_s": round(first["fetched"] / seconds, 1),
+        "mb_per_s": round(first["bytes"] / 1024 ** 2 / seconds, 2),
+        "dedupe_ratio": first["dedupe_ratio"],
+        "second_pass_requests": second["server_requests"],
+        "store": stats,
+        "passed": passed,
+    }
+    print(json.dumps(results, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
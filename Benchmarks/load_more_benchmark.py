@@ -0,0 +1,106 @@
+"""Benchmarks.load_more_benchmark
+
+Clicking "Load More" versus paging its endpoint directly, on the home
+panels of the `/msa/` site of `Benchmarks.fixture_site`.
+
+Each mode opens the fixture home page in a fresh Chromium page:
+
+    clicks   `click_through_home_panel` for both panels: expand, click
+             until the button is gone, read the cards from the DOM
+    harvest  `harvest_home_panels`: one dispatched click per panel, then
+             `Utilities.load_more_async.harvest` over the page's request
+             context
+
+Reported per mode, as JSON:
+
+    seconds            time to read both panels (details are not fetched)
+    adverts            distinct adverts collected
+    load_more_posts    requests the fixture's admin-ajax endpoint served
+    dom_cards          advert cards in the DOM afterwards
+    fallbacks          panels the harvest had to click through instead
+
+The exit status is 1 when a mode misses adverts or the harvest fell back.
+
+Use case:
+    python -m Benchmarks.load_more_benchmark --listings 2000
+    python -m Benchmarks.load_more_benchmark --listings 500 --latency 50 --modes harvest
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from Benchmarks.fixture_site import FixtureSite
+from Benchmarks.scraper_benchmark import fixture_class
+
+MODES = ("clicks", "harvest")
+
+CARD_SELECTOR = "[id^='advert_id_'], [id^='featured_id_']"
+
+
+async def run_mode(server, mode, headless=True):
+    from Utilities.browser_async import get_page
+    from Utilities.throttle_async import UNLIMITED, configure_host
+
+    site_cls = fixture_class("motorsport", server.url(), [])
+    pw, browser, context, page = await get_page(headless=headless)
+    try:
+        site = site_cls(page)
+        configure_host(site.homeLink, **UNLIMITED)
+        await site.open()
+
+        before = server.requests["msa.load_more"]
+        started = time.perf_counter()
+        items, fallbacks = [], 0
+        if mode == "clicks":
+            for ad_type in site.HOME_PANELS:
+                await site.click_through_home_panel(ad_type, items)
+        else:
+            for ad_type, cards in (await site.harvest_home_panels()).items():
+                if cards is None:
+                    fallbacks += 1
+                    await site.click_through_home_panel(ad_type, items)
+                else:
+                    site.register_ads(cards, items, category=ad_type)
+        seconds = time.perf_counter() - started
+        dom_cards = await page.locator(CARD_SELECTOR).count()
+    finally:
+        await context.close()
+        await browser.close()
+        await pw.stop()
+
+    return {
+        "seconds": round(seconds, 2),
+        "adverts": len(items),
+        "load_more_posts": server.requests["msa.load_more"] - before,
+        "dom_cards": dom_cards,
+        "fallbacks": fallbacks,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--listings", type=int, default=500, help="adverts on the fixture site")
+    parser.add_argument("--latency", type=float, default=0.0, help="fixture latency per response (ms)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FixtureSite(listings=args.listings, latency=args.latency / 1000, seed=args.seed).start()
+    try:
+        expected = len(set(server.msa_panel_ads("recent")) | set(server.msa_panel_ads("featured")))
+        results = {mode: asyncio.run(run_mode(server, mode, not args.headed)) for mode in args.modes}
+    finally:
+        server.stop()
+
+    passed = all(result["adverts"] == expected and not result["fallbacks"] for result in results.values())
+    print(json.dumps({"config": vars(args), "expected_adverts": expected, "modes": results,
+                      "passed": passed}, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
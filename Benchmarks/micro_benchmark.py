@@ -0,0 +1,315 @@
+"""Benchmarks.micro_benchmark
+
+Micro-benchmarks for the CPU-side helpers the scrapers run per listing:
+
+    normalise_dates        date normalisation of a page of values, warm cache
+    normalise_dates_cold   the same with the parse cache cleared first
+    generate_id            SHA-256 listing IDs
+    normalise_description  MotorsportAuctions detail text clean-up
+    get_all_image_urls     lazy-src fallback plus dedupe/sort (stub locators)
+    as_excel               DataFrame build and .xlsx write
+    build_payload          JSON payload for the bulk API
+
+Each case runs over generated, seeded inputs at several sizes and
+records the best and median time of `--repeat` runs. `run --save`
+stores the results as a baseline; `compare` re-runs and flags cases
+slower than the baseline by more than `--threshold`. Baselines are
+machine-specific, so compare on the machine that saved them.
+
+Use case:
+    python -m Benchmarks.micro_benchmark run --save
+    python -m Benchmarks.micro_benchmark compare --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+MAKES = ["Mitsubishi Evo IX", "Subaru Impreza WRX", "Porsche 911 GT3 Cup", "BMW E30 M3",
+         "Ford Escort Mk2", "Radical SR3", "Ginetta G40", "Audi Quattro"]
+
+
+# ---------------- INPUTS ---------------- #
+
+def _dates(rng, n):
+    relative = ["{n} uur ago", "{n} hours ago", "{n} minuten ago", "{n} dagen ago", "{n} days ago",
+                "{n} weeks ago", "{n} maanden ago", "{n} year ago"]
+    explicit = ["December {d} , 2025", "{d} maart 2026", "{d} okt 2025", "2026-01-{d:02d}",
+                "{d}/04/2026", "mei {d} 2025", "not a date"]
+    out = []
+    for _ in range(n):
+        if rng.random() < 0.6:
+            out.append(rng.choice(relative).format(n=rng.randint(1, 23)))
+        else:
+            out.append(rng.choice(explicit).format(d=rng.randint(1, 28)))
+    return out
+
+
+def _urls(rng, n):
+    return [f"https://www.motorsportauctions.com/advert/{rng.randint(1, 10 ** 6)}/"
+            f"{rng.choice(MAKES).lower().replace(' ', '-')}.html" for _ in range(n)]
+
+
+def _descriptions(rng, n):
+    words = "fresh engine rebuild sequential gearbox FIA seats roll cage spare wheels log book".split()
+    out = []
+    for _ in range(n):
+        lines = []
+        for _ in range(rng.randint(5, 40)):
+            line = " ".join(rng.choice(words) for _ in range(rng.randint(0, 14)))
+            lines.append(line + " " * rng.randint(0, 3))
+        out.append("\r\n".join(lines))
+    return out
+
+
+class _StubImg:
+    """Stands in for a Playwright locator: only `get_attribute`."""
+
+    def __init__(self, attrs):
+        self.attrs = attrs
+
+    async def get_attribute(self, name):
+        return self.attrs.get(name)
+
+
+class _StubImgs:
+    def __init__(self, imgs):
+        self.imgs = imgs
+
+    def nth(self, i):
+        return self.imgs[i]
+
+
+def _galleries(rng, n):
+    galleries = []
+    for _ in range(n):
+        urls = [f"https://cdn.example.com/img/{rng.randint(1, 40)}.jpg" for _ in range(rng.randint(4, 20))]
+        attrs = rng.choice(["nitro-lazy-src", "data-src", "src"])
+        galleries.append(_StubImgs([_StubImg({attrs: url}) for url in urls]))
+    return galleries
+
+
+def _rows(rng, n):
+    start = datetime(2026, 1, 1)
+    return [{
+        "unique_id": f"MSA_{rng.getrandbits(128):032x}",
+        "title": f"{rng.choice(MAKES)} #{i}",
+        "price": f"£{rng.randint(5000, 150000):,}",
+        "date": f"{rng.randint(1, 28)} March 2026",
+        "category": rng.sample(["race-cars", "rally-cars", "historic-road-cars", "other-items"], 2),
+        "image_urls": [f"https://cdn.example.com/img/{i}-{j}.jpg" for j in range(rng.randint(1, 8))],
+        "link_url": f"https://www.motorsportauctions.com/advert/{i}/",
+        "detailed_description": " ".join(rng.choice(MAKES) for _ in range(40)),
+        "created_at": start + timedelta(minutes=i),
+        "updated_at": start + timedelta(minutes=i, seconds=30),
+    } for i in range(n)]
+
+
+# ---------------- CASES ---------------- #
+# Each setup(size, rng) returns a zero-argument callable that processes one batch.
+
+def _run_async(coro_factory):
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(coro_factory())
+
+
+def setup_normalise_dates(size, rng):
+    from Utilities.normalise import normalise_dates
+
+    texts = _dates(rng, size)
+    return lambda: normalise_dates(texts)
+
+
+def setup_normalise_dates_cold(size, rng):
+    from Utilities.normalise import _parse_date, normalise_dates
+
+    texts = _dates(rng, size)
+
+    def batch():
+        _parse_date.cache_clear()
+        normalise_dates(texts)
+    return batch
+
+
+def setup_generate_id(size, rng):
+    from Utilities.id_utils import generate_id
+
+    urls = _urls(rng, size)
+    return lambda: [generate_id("MSA_", url) for url in urls]
+
+
+def setup_normalise_description(size, rng):
+    from Pages.Motorsportauctions import normalise_description
+
+    texts = _descriptions(rng, size)
+    return lambda: [normalise_description(text) for text in texts]
+
+
+def setup_get_all_image_urls(size, rng):
+    from Pages.Motorsportauctions import MotorsportAuctions
+
+    site = MotorsportAuctions(None)
+    galleries = _galleries(rng, size)
+
+    async def batch():
+        for imgs in galleries:
+            await site.get_all_image_urls(imgs, len(imgs.imgs))
+    return _run_async(batch)
+
+
+def setup_as_excel(size, rng):
+    from Utilities.output import as_excel
+
+    items = _rows(rng, size)
+    workdir = tempfile.mkdtemp(prefix="micro_excel_")
+
+    def batch():
+        # as_excel writes under ./output and appends to an existing file; start fresh each time
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            path = os.path.join("output", "bench.xlsx")
+            if os.path.exists(path):
+                os.remove(path)
+            as_excel(items, meta={"source": "bench"}, file_path="bench.xlsx")
+        finally:
+            os.chdir(cwd)
+    return batch
+
+
+def setup_build_payload(size, rng):
+    from Utilities.db_utils import build_payload
+
+    rows = _rows(rng, size)
+    return lambda: build_payload(rows)
+
+
+CASES = {
+    "normalise_dates": (setup_normalise_dates, DEFAULT_SIZES),
+    "normalise_dates_cold": (setup_normalise_dates_cold, DEFAULT_SIZES),
+    "generate_id": (setup_generate_id, DEFAULT_SIZES),
+    "normalise_description": (setup_normalise_description, DEFAULT_SIZES),
+    "get_all_image_urls": (setup_get_all_image_urls, DEFAULT_SIZES),
+    "as_excel": (setup_as_excel, (100, 1000)),
+    "build_payload": (setup_build_payload, DEFAULT_SIZES),
+}
+
+
+# ---------------- RUNNER ---------------- #
+
+def measure(batch, repeat):
+    batch()  # warm-up: imports, regex caches, first-call allocations
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        batch()
+        times.append(time.perf_counter() - started)
+    return min(times), statistics.median(times)
+
+
+def run_cases(selected=None, repeat=5, seed=0):
+    """Run the selected cases; returns the results dict a baseline stores."""
+    results = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine()},
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "cases": {},
+    }
+    for name, (setup, sizes) in CASES.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        for size in sizes:
+            key = f"{name}[{size}]"
+            try:
+                batch = setup(size, random.Random(seed))
+            except ImportError as e:
+                # e.g. pandas or psycopg2 missing on this machine
+                results["cases"][key] = {"skipped": str(e)}
+                print(f"{key:32} skipped ({e})", file=sys.stderr)
+                continue
+            best, median = measure(batch, repeat)
+            results["cases"][key] = {
+                "size": size,
+                "best_s": round(best, 6),
+                "median_s": round(median, 6),
+                "per_item_us": round(best / size * 1e6, 3),
+            }
+            print(f"{key:32} {best * 1000:10.2f} ms  ({best / size * 1e6:.2f} µs/item)", file=sys.stderr)
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Compare best times case by case.
+
+    Returns:
+        list: one dict per case present in both, with `regressed` set when
+        the case got slower by more than `threshold`.
+    """
+    rows = []
+    for key, now in current["cases"].items():
+        before = baseline.get("cases", {}).get(key)
+        if not before or "best_s" not in before or "best_s" not in now:
+            continue
+        ratio = now["best_s"] / before["best_s"] if before["best_s"] else 1.0
+        rows.append({"case": key, "baseline_s": before["best_s"], "current_s": now["best_s"],
+                     "change": round(ratio - 1, 3), "regressed": ratio > 1 + threshold})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run the suite and print JSON")
+    run_cmd.add_argument("--save", nargs="?", const=BASELINE_PATH, metavar="PATH",
+                         help=f"store the results as a baseline (default: {BASELINE_PATH})")
+
+    compare_cmd = commands.add_parser("compare", help="run the suite and compare with a baseline")
+    compare_cmd.add_argument("--baseline", default=BASELINE_PATH)
+    compare_cmd.add_argument("--threshold", type=float, default=0.15,
+                             help="allowed slowdown before a case is flagged (default: 0.15)")
+
+    for cmd in (run_cmd, compare_cmd):
+        cmd.add_argument("--filter", nargs="*", help="only cases whose name contains one of these")
+        cmd.add_argument("--repeat", type=int, default=5)
+        cmd.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.command == "compare" and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}, run with `run --save` first")
+
+    results = run_cases(args.filter, repeat=args.repeat, seed=args.seed)
+
+    if args.command == "run":
+        if args.save:
+            os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"Saved baseline to {args.save}", file=sys.stderr)
+        print(json.dumps(results, indent=2))
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['case']:32} {row['change']:+8.1%}  {flag}", file=sys.stderr)
+    regressions = [row for row in rows if row["regressed"]]
+    print(json.dumps({"threshold": args.threshold, "cases": rows, "regressions": len(regressions)}, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
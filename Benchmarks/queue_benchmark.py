@@ -0,0 +1,135 @@
+"""Benchmarks.queue_benchmark
+
+Speed-up check for `Utilities.work_queue` with several worker processes.
+
+Serves a local fixture site whose pages each take `--latency` seconds,
+queues one list job that fans out into `--details` detail jobs, and
+drains the crawl with 1 worker and then with `--workers` workers. Every
+worker is a separate process running the real claim/lease/complete
+loop. Prints JSON with the wall times, the speed-up, and whether any job
+ran more than once. Needs the local Postgres from docker-compose.
+
+Use case:
+    python -m Benchmarks.queue_benchmark --workers 4 --details 200
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Utilities import db_utils, work_queue
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = b"<html><body>fixture</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FixtureSite:
+    """Stand-in page object: list jobs fan out, detail jobs fetch one page."""
+
+    SOURCE = "benchmark"
+
+    def __init__(self, base_url, details):
+        self.base_url = base_url
+        self.details = details
+
+    async def run_job(self, job):
+        await asyncio.to_thread(lambda: urllib.request.urlopen(job["url"], timeout=30).read())
+        if job["kind"] == "list":
+            work_queue.enqueue_jobs(job["crawl_id"], "detail", self.SOURCE, [
+                (f"{self.base_url}/detail/{i}", {"category": ["benchmark"]})
+                for i in range(self.details)
+            ])
+
+
+def _worker(base_url, details, crawl_id):
+    site = FixtureSite(base_url, details)
+    asyncio.run(work_queue.run_worker(site, crawl_id=crawl_id, idle_timeout=2.0, poll_interval=0.2))
+
+
+def drain(base_url, details, workers):
+    """Queue a fresh crawl and time `workers` processes draining it."""
+    crawl_id = f"bench-{uuid.uuid4().hex[:8]}"
+    work_queue.enqueue_jobs(crawl_id, "list", FixtureSite.SOURCE, [(f"{base_url}/list", {"category": "benchmark"})])
+
+    started = time.perf_counter()
+    procs = [multiprocessing.Process(target=_worker, args=(base_url, details, crawl_id)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    # Workers wait `idle_timeout` after the last job before exiting; take it off
+    elapsed = time.perf_counter() - started - 2.0
+
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT count(*), count(*) FILTER (WHERE status = 'done'), max(attempts)
+        FROM crawl_jobs WHERE crawl_id = %s;
+    """, (crawl_id,))
+    jobs, done, max_attempts = cur.fetchone()
+    cur.execute("DELETE FROM crawl_jobs WHERE crawl_id = %s;", (crawl_id,))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    return {"workers": workers, "seconds": round(elapsed, 2), "jobs": jobs,
+            "done": done, "max_attempts": max_attempts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--details", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="fixture page latency (s)")
+    parser.add_argument("--min-efficiency", type=float, default=0.7,
+                        help="required speed-up / workers")
+    args = parser.parse_args(argv)
+
+    work_queue.create_queue_table()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    server.latency = args.latency
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        single = drain(base_url, args.details, 1)
+        parallel = drain(base_url, args.details, args.workers)
+    finally:
+        server.shutdown()
+
+    speedup = single["seconds"] / parallel["seconds"] if parallel["seconds"] > 0 else 0.0
+    no_duplicates = parallel["max_attempts"] == 1 and parallel["done"] == parallel["jobs"]
+    passed = no_duplicates and speedup / args.workers >= args.min_efficiency
+
+    print(json.dumps({
+        "single": single,
+        "parallel": parallel,
+        "speedup": round(speedup, 2),
+        "efficiency": round(speedup / args.workers, 3),
+        "no_duplicates": no_duplicates,
+        "passed": passed,
+    }, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
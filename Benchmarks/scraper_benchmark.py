@@ -0,0 +1,179 @@
+"""Benchmarks.scraper_benchmark
+
+End-to-end throughput of each page object's `collect()` against the
+local fixture site in `Benchmarks.fixture_site`.
+
+Each scraper runs in a fresh process with its own Chromium. Its
+`homeLink` points at the fixture and `persist` is swapped for a
+collector, so nothing reaches PostgreSQL or the Excel files. Reports
+listings/s, navigations/s (HTML and JSON responses the fixture served)
+and the peak RSS of the Python process and of its largest child process
+(Chromium), as JSON. With `--baseline`, exits 1 when a scraper's
+listings/s fell more than `--tolerance` below the stored result.
+
+Use case:
+    python -m Benchmarks.scraper_benchmark --listings 500 --latency 50 --output scrapers.json
+    python -m Benchmarks.scraper_benchmark --listings 500 --latency 50 --baseline scrapers.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Benchmarks.fixture_site import FixtureSite
+
+# site key -> (module, class, fixture prefix)
+SCRAPERS = {
+    "motorsport": ("Pages.Motorsportauctions", "MotorsportAuctions", "msa"),
+    "rallycars": ("Pages.Rallycarsforsale", "RallyCarsForSale", "rally"),
+    "racecars": ("Pages.Racecarsforyou", "RaceCarsForYou", "racecars"),
+    "classiccars": ("Pages.Classiccarsforsale", "ClassicCarsForSale", "ccfs"),
+    "racecarsdirect": ("Pages.Racecarsdirect", "RaceCarsDirect", "rcd"),
+}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None, None
+    # ru_maxrss is in KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(own, 1), round(children, 1)
+
+
+def fixture_class(site_key, base_url, collected):
+    """Subclass the page object so it crawls the fixture and keeps its results."""
+    module, name, prefix = SCRAPERS[site_key]
+    site_cls = getattr(importlib.import_module(module), name)
+
+    def persist(self, items, category=None):
+        collected.extend(items)
+
+    overrides = {"homeLink": f"{base_url}{prefix}/", "persist": persist}
+    if hasattr(site_cls, "load_lastmods"):
+        # Sitemap sites keep their lastmods in memory instead of PostgreSQL
+        lastmods = {}
+        overrides["load_lastmods"] = lambda self: dict(lastmods)
+        overrides["record_run"] = lambda self, fetched, unchanged_ids: lastmods.update(fetched)
+    return type(f"{name}Fixture", (site_cls,), overrides)
+
+
+def run_scraper(site_key, base_url, throttled=False, headless=True):
+    """Process entry point: time one `open()` + `collect()` against the fixture."""
+    return asyncio.run(_run_scraper(site_key, base_url, throttled, headless))
+
+
+async def _run_scraper(site_key, base_url, throttled, headless):
+    from Utilities.browser_async import get_page
+    from Utilities.throttle_async import UNLIMITED, configure_host
+
+    collected = []
+    site_cls = fixture_class(site_key, base_url, collected)
+    pw, browser, context, page = await get_page(headless=headless)
+
+    try:
+        site = site_cls(page)
+        configure_host(site.homeLink, **(getattr(site, "THROTTLE", {}) if throttled else UNLIMITED))
+        started = time.perf_counter()
+        await site.open()
+        await site.collect()
+        seconds = time.perf_counter() - started
+    finally:
+        await context.close()
+        await browser.close()
+        await pw.stop()
+
+    python_rss, browser_rss = _peak_rss_mb()
+    return {
+        "seconds": round(seconds, 2),
+        "listings": len(collected),
+        "unique_listings": len({item.get("id") for item in collected}),
+        "with_details": sum(1 for item in collected if item.get("detailedDescription")),
+        "python_peak_rss_mb": python_rss,
+        "browser_peak_rss_mb": browser_rss,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the scrapers whose listings/s dropped more than `tolerance` below `baseline`."""
+    regressions = []
+    for site_key, current in results["scrapers"].items():
+        before = baseline.get("scrapers", {}).get(site_key)
+        if not before or not before.get("listings_per_s"):
+            continue
+        change = current["listings_per_s"] / before["listings_per_s"] - 1
+        if change < -tolerance:
+            regressions.append({"scraper": site_key, "baseline": before["listings_per_s"],
+                                "current": current["listings_per_s"], "change": round(change, 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("scrapers", nargs="*", default=list(SCRAPERS), help="site keys to run")
+    parser.add_argument("--listings", type=int, default=200, help="adverts per fixture site")
+    parser.add_argument("--latency", type=float, default=0.0, help="fixture latency per page (ms)")
+    parser.add_argument("--description-kb", type=float, default=2.0)
+    parser.add_argument("--overlap", type=float, default=0.1,
+                        help="share of MotorsportAuctions adverts listed in two categories")
+    parser.add_argument("--throttled", action="store_true",
+                        help="apply each site's THROTTLE limits instead of running unthrottled")
+    parser.add_argument("--headed", action="store_true", help="show the browser windows")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed listings/s drop versus the baseline (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    # MotorsportAuctions only walks its configured categories
+    from Pages.Motorsportauctions import MotorsportAuctions
+
+    server = FixtureSite(listings=args.listings, latency=args.latency / 1000,
+                         description_kb=args.description_kb, overlap=args.overlap,
+                         categories=MotorsportAuctions.CATEGORIES).start()
+    results = {"config": vars(args) | {"scrapers": args.scrapers}, "scrapers": {}}
+
+    try:
+        for site_key in args.scrapers:
+            before = sum(n for kind, n in server.requests.items() if kind != "image")
+            # A fresh process per scraper keeps the peak-RSS numbers separate
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                result = pool.submit(run_scraper, site_key, server.url(), args.throttled, not args.headed).result()
+            navigations = sum(n for kind, n in server.requests.items() if kind != "image") - before
+
+            seconds = result["seconds"] or 1e-9
+            result |= {
+                "navigations": navigations,
+                "listings_per_s": round(result["listings"] / seconds, 2),
+                "navigations_per_s": round(navigations / seconds, 2),
+            }
+            results["scrapers"][site_key] = result
+            print(f"{site_key}: {result['listings']} listings in {result['seconds']}s", file=sys.stderr)
+    finally:
+        server.stop()
+
+    passed = True
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["regressions"] = compare(results, json.load(f), args.tolerance)
+        passed = not results["regressions"]
+    results["passed"] = passed
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    print(report)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
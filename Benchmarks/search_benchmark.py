@@ -0,0 +1,187 @@
+"""Benchmarks.search_benchmark
+
+Latency benchmark for `db_utils.search_products`.
+
+Seeds a scratch schema (`bench_search`) with synthetic listings in a
+copy of `products`, partitioned by source like the real table, then
+times a fixed set of searches through the real search function.
+Description words are drawn from `VOCABULARY` with Zipf-like
+frequencies (a word's frequency falls with its rank), so common words
+such as "race" match most rows while "intercooler" turns up in about
+one advert in ten, as in real adverts. Results are printed as JSON;
+the exit status is 1 when any query's p95 exceeds the budget.
+
+Use case:
+    python -m Benchmarks.search_benchmark --rows 1000000 --budget-ms 50
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from Utilities import db_utils
+from Utilities.id_utils import SOURCE_PREFIXES
+
+SCHEMA = "bench_search"
+
+MAKES = ["Mitsubishi", "Subaru", "Ford", "Porsche", "BMW", "Lancia", "Audi",
+         "Peugeot", "Toyota", "Honda", "Renault", "Nissan", "Citroen", "Vauxhall"]
+MODELS = ["Evo IX", "Impreza", "Escort Mk2", "911 Cup", "M3 E30", "Delta Integrale",
+          "Quattro", "205 T16", "Celica GT4", "Civic Type R", "Clio Cup", "GT-R",
+          "DS3 R5", "Astra"]
+# Most frequent first: rank r turns up about 1/r as often as rank 1
+VOCABULARY = [
+    "car", "race", "engine", "new", "good", "condition", "rally", "wheels", "tyres",
+    "fresh", "rebuilt", "gearbox", "spare", "season", "ready", "brakes", "seats",
+    "suspension", "cage", "fia", "miles", "hours", "logbook", "spares", "package",
+    "front", "rear", "dampers", "harness", "built", "track", "history", "service",
+    "paint", "body", "fuel", "tank", "cell", "power", "bhp", "sequential", "dogbox",
+    "diff", "limited", "slip", "ecu", "loom", "turbo", "clutch", "radiator", "oil",
+    "cooler", "exhaust", "manifold", "pump", "brake", "bias", "pedal", "box",
+    "steering", "wheel", "quick", "release", "extinguisher", "plumbed", "system",
+    "lights", "pod", "bonnet", "boot", "doors", "carbon", "kevlar", "composite",
+    "splitter", "wing", "diffuser", "arches", "wide", "kit", "shell", "seam",
+    "welded", "stripped", "rust", "free", "mot", "road", "legal", "registered",
+    "v5", "homologation", "papers", "expired", "valid", "hillclimb", "sprint",
+    "circuit", "stages", "tarmac", "gravel", "snow", "championship", "winning",
+    "class", "podium", "results", "driver", "selling", "reason", "offers", "swap",
+    "px", "trailer", "covered", "transporter", "included", "extras", "set", "rims", "slicks", "wets", "intermediates", "alloy", "magnesium",
+    "forged", "pistons", "rods", "crank", "cams", "head", "ported", "polished",
+    "throttle", "bodies", "injectors", "intercooler", "wastegate", "actuator",
+    "anti", "lag", "paddle", "shift", "straight", "cut", "ratios", "final", "drive",
+    "plated", "lsd", "propshaft", "driveshafts", "hubs", "bearings", "uprights",
+    "wishbones", "rose", "joints", "adjustable", "coilovers", "springs", "rollbars",
+    "corner", "weights", "geometry", "setup", "dyno", "sheet", "data", "logger",
+    "dash", "display", "camera", "intercom", "helmet", "hans", "suit", "boots",
+    "gloves", "restored", "concours", "matching", "numbers", "original", "period",
+    "correct", "provenance", "ex", "works", "chassis", "number", "documented",
+]
+CATEGORIES = ["race-cars", "rally-cars", "sports-cars", "touring-cars",
+              "historic-road-cars", "performance-road-cars", "other-items"]
+
+QUERIES = [
+    {"query": "Evo IX with spare gearbox"},
+    {"query": "escort mk2 rally"},
+    {"query": "\"delta integrale\" -trailer"},
+    {"query": "sequential dogbox", "category": "rally-cars"},
+    {"query": "porsche 911 cup", "min_price": 20000, "max_price": 120000},
+    {"query": "turbo OR intercooler", "category": "race-cars", "max_price": 50000},
+]
+
+
+def _sql_array(values):
+    return "ARRAY[" + ", ".join("'" + v.replace("'", "''") + "'" for v in values) + "]"
+
+
+def seed(conn, rows, batch=100000):
+    """(Re)create the scratch schema and fill it with `rows` listings."""
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+    cur.execute(f"CREATE SCHEMA {SCHEMA};")
+    # Partitioned by source like public.products, so searches plan the same way
+    cur.execute(f"""
+        CREATE TABLE {SCHEMA}.products (LIKE public.products INCLUDING ALL)
+        PARTITION BY LIST (source);
+    """)
+    for source in SOURCE_PREFIXES:
+        cur.execute(f"""
+            CREATE TABLE {SCHEMA}.products_{source}
+            PARTITION OF {SCHEMA}.products FOR VALUES IN ('{source}');
+        """)
+    cur.execute(f"CREATE TABLE {SCHEMA}.products_other PARTITION OF {SCHEMA}.products DEFAULT;")
+    conn.commit()
+
+    sources = list(SOURCE_PREFIXES)
+    makes, models = _sql_array(MAKES), _sql_array(MODELS)
+    words, cats = _sql_array(VOCABULARY), _sql_array(CATEGORIES)
+
+    for start in range(1, rows + 1, batch):
+        stop = min(start + batch - 1, rows)
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.products
+                (source, unique_id, title, price, detailed_description, category, status, created_at)
+            SELECT
+                ({_sql_array(sources)})[1 + g % {len(sources)}],
+                'BENCH_' || g,
+                ({makes})[1 + g % {len(MAKES)}] || ' ' ||
+                ({models})[1 + (g / 7) % {len(MODELS)}] || ' ' || (1975 + g % 50),
+                '£' || (1000 + (g::bigint * 7919) % 200000),
+                -- Log-uniform rank from a seeded hash: P(rank r) ~ 1/r
+                array_to_string(ARRAY(
+                    SELECT ({words})[floor(exp(
+                        ((g::bigint * k * 2654435761) % 1000003) / 1000003.0 * ln({len(VOCABULARY)} + 1)
+                    ))::int]
+                    FROM generate_series(1, 40 + g % 80) AS k
+                ), ' '),
+                ARRAY[({cats})[1 + (g / 3) % {len(CATEGORIES)}]],
+                'active',
+                NOW()
+            FROM generate_series(%s, %s) AS g;
+        """, (start, stop))
+        conn.commit()
+        print(f"Seeded {stop}/{rows} rows", file=sys.stderr)
+
+    cur.execute(f"ANALYZE {SCHEMA}.products;")
+    conn.commit()
+    cur.close()
+
+
+def measure(conn, repeats):
+    """Time every query in QUERIES `repeats` times after one warm-up call."""
+    results = []
+    for spec in QUERIES:
+        db_utils.search_products(conn, **spec)
+        timings = []
+        hits = 0
+        for _ in range(repeats):
+            started = time.perf_counter()
+            hits = len(db_utils.search_products(conn, **spec))
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results.append({
+            **spec,
+            "hits": hits,
+            "p50_ms": round(timings[len(timings) // 2], 2),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            "max_ms": round(timings[-1], 2),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="reuse the rows from a previous run")
+    args = parser.parse_args(argv)
+
+    db_utils.create_table()
+    conn = db_utils.get_connection()
+    try:
+        if not args.skip_seed:
+            seed(conn, args.rows)
+
+        cur = conn.cursor()
+        cur.execute(f"SET search_path TO {SCHEMA}, public;")
+        cur.close()
+
+        results = measure(conn, args.repeats)
+    finally:
+        conn.close()
+
+    passed = all(r["p95_ms"] <= args.budget_ms for r in results)
+    print(json.dumps({
+        "rows": args.rows,
+        "budget_ms": args.budget_ms,
+        "ranked_candidates": db_utils.SEARCH_CANDIDATES,
+        "passed": passed,
+        "queries": results,
+    }, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
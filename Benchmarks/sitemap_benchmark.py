@@ -0,0 +1,119 @@
+"""Benchmarks.sitemap_benchmark
+
+Incremental-crawl benchmark for the sitemap collectors
+(`Utilities.sitemap_async`) against the `/ccfs/` and `/rcd/` sites of
+`Benchmarks.fixture_site`.
+
+No browser is started: the collectors only use a page's `request`
+context, so they get a bare `APIRequestContext`. Each site is collected
+twice. Between the passes `--touch` of the adverts get a new `lastmod`,
+and the second pass must fetch only those adverts plus the ones that
+404 (they were never stored, so they cannot be skipped). Lastmods are
+kept in memory, so nothing reaches PostgreSQL or the Excel files.
+Reported per site:
+
+    listings_per_s             first-pass detail pages parsed per second
+    second_pass_fetches        detail pages requested on the second pass
+    complete                   records with title, price, date, images and description
+
+The exit status is 1 when a pass stored the wrong number of listings,
+the second pass fetched anything unchanged, or a record lacks fields.
+
+Use case:
+    python -m Benchmarks.sitemap_benchmark --listings 2000 --latency 30
+    python -m Benchmarks.sitemap_benchmark --listings 500 --touch 0.2 --throttled
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+from Benchmarks.fixture_site import FixtureSite
+from Benchmarks.scraper_benchmark import fixture_class
+
+SITES = {"classiccars": "ccfs", "racecarsdirect": "rcd"}
+
+FIELDS = ("title", "price", "date", "imageURL", "detailedDescription")
+
+
+async def _pass(site_cls, request):
+    site = site_cls(SimpleNamespace(request=request))
+    started = time.perf_counter()
+    await site.open()
+    items = await site.collect()
+    return items, time.perf_counter() - started
+
+
+async def run_site(server, site_key, touch, throttled):
+    from playwright.async_api import async_playwright
+
+    from Utilities.throttle_async import UNLIMITED, configure_host
+
+    prefix = SITES[site_key]
+    collected = []
+    site_cls = fixture_class(site_key, server.url(), collected)
+    configure_host(site_cls.homeLink, **(site_cls.THROTTLE if throttled else UNLIMITED))
+    live = sum(1 for k in range(server.listings) if not server.msa_removed(k))
+
+    async with async_playwright() as pw:
+        request = await pw.request.new_context()
+        try:
+            server.revision, server.touched_share = 0, 0.0
+            before = server.requests[f"{prefix}.detail"]
+            first, seconds = await _pass(site_cls, request)
+            first_fetches = server.requests[f"{prefix}.detail"] - before
+
+            server.touch(touch)
+            changed = sum(1 for k in range(server.listings)
+                          if server._touched(k) or server.msa_removed(k))
+            before = server.requests[f"{prefix}.detail"]
+            second, _ = await _pass(site_cls, request)
+            second_fetches = server.requests[f"{prefix}.detail"] - before
+        finally:
+            await request.dispose()
+
+    complete = sum(1 for item in first if all(item.get(field) for field in FIELDS))
+    return {
+        "seconds": round(seconds, 2),
+        "listings": len(first),
+        "expected_listings": live,
+        "first_pass_fetches": first_fetches,
+        "listings_per_s": round(len(first) / (seconds or 1e-9), 1),
+        "second_pass_fetches": second_fetches,
+        "expected_second_pass_fetches": changed,
+        "second_pass_listings": len(second),
+        "complete": complete,
+        "passed": (len(first) == live == complete and second_fetches == changed
+                   and len(second) == changed - (server.listings - live)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--listings", type=int, default=500, help="adverts per site")
+    parser.add_argument("--latency", type=float, default=0.0, help="fixture latency per detail page (ms)")
+    parser.add_argument("--touch", type=float, default=0.1,
+                        help="share of adverts edited between the passes (default: 0.1)")
+    parser.add_argument("--removed-share", type=float, default=0.02, help="share of adverts that 404")
+    parser.add_argument("--throttled", action="store_true", help="use each site's THROTTLE instead of no limit")
+    parser.add_argument("--sites", nargs="+", choices=sorted(SITES), default=sorted(SITES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FixtureSite(listings=args.listings, latency=args.latency / 1000,
+                         removed_share=args.removed_share, seed=args.seed).start()
+    try:
+        results = {key: asyncio.run(run_site(server, key, args.touch, args.throttled)) for key in args.sites}
+    finally:
+        server.stop()
+
+    passed = all(result["passed"] for result in results.values())
+    print(json.dumps({"config": vars(args), "sites": results, "passed": passed}, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Benchmarks.soak_benchmark
+
+Soak test for memory and handle leaks in long detail crawls.
+
+Drives MotorsportAuctions with one browser and one page against the
+local fixture site in `Benchmarks.fixture_site` the way the revisit
+scheduler does: one `collect_categorized_data` visit after another,
+cycling through `CATEGORIES`, until `--navigations` list and detail
+pages have loaded. Each visit starts a new run inside the scraper (its
+registry is reset), so per-run data does not grow and whatever still
+grows is a leak. About every `--sample-every` navigations, between
+visits, it collects garbage and records:
+
+    python_rss_mb     current RSS of this process
+    browser_rss_mb    RSS of the Playwright driver and Chromium processes
+    traced_mb         Python heap traced by tracemalloc
+    open_fds          open file descriptors (sockets, pipes, files)
+    tasks             live asyncio tasks
+    gc_objects        objects tracked by the garbage collector
+
+After a warm-up, growth is the least-squares slope of each series times
+the navigations measured, and the run passes when every growth is within
+its budget. The allocation sites that grew most since the warm-up
+(tracemalloc) are listed to show where a leak lives.
+
+Use case:
+    python -m Benchmarks.soak_benchmark --navigations 5000 --output soak.json
+    python -m Benchmarks.soak_benchmark --navigations 20000 --python-budget-mb 20 --browser-budget-mb 100
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from Benchmarks.fixture_site import FixtureSite
+from Benchmarks.scraper_benchmark import fixture_class
+
+# Series checked against a budget: sample field -> budget argument
+BUDGETS = {
+    "python_rss_mb": "python_budget_mb",
+    "browser_rss_mb": "browser_budget_mb",
+    "open_fds": "fd_budget",
+    "tasks": "task_budget",
+}
+
+
+def python_rss_mb():
+    """Current RSS of this process (Linux); falls back to the peak elsewhere."""
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        import resource
+        # ru_maxrss is KiB on Linux, bytes on macOS; only the trend matters here
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def open_fds():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path))
+    return None
+
+
+def take_sample(navigations, started):
+    from Utilities.metrics import browser_rss_bytes
+
+    # Garbage is not a leak; only count what survives a full collection
+    gc.collect()
+    browser = browser_rss_bytes()
+    return {
+        "navigations": navigations,
+        "seconds": round(time.monotonic() - started, 1),
+        "python_rss_mb": round(python_rss_mb(), 1),
+        "browser_rss_mb": round(browser / 1024 ** 2, 1) if browser is not None else None,
+        "traced_mb": round(tracemalloc.get_traced_memory()[0] / 1024 ** 2, 2) if tracemalloc.is_tracing() else None,
+        "open_fds": open_fds(),
+        "tasks": len(asyncio.all_tasks()),
+        "gc_objects": len(gc.get_objects()),
+    }
+
+
+def growth(samples, field):
+    """Least-squares slope of `field` over navigations, times the navigations covered."""
+    points = [(s["navigations"], s[field]) for s in samples if s.get(field) is not None]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var:
+        return 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+    return round(slope * (points[-1][0] - points[0][0]), 2)
+
+
+def top_growth(baseline, current, limit):
+    """Allocation sites whose traced size grew most between two tracemalloc snapshots."""
+    stats = current.compare_to(baseline, "lineno")
+    return [{"where": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1),
+             "count_diff": stat.count_diff}
+            for stat in stats[:limit] if stat.size_diff > 0]
+
+
+async def soak(server, args):
+    from Utilities.browser_async import get_page
+    from Utilities.throttle_async import UNLIMITED, configure_host
+
+    collected = []
+    site_cls = fixture_class("motorsport", server.url(), collected)
+    warmup = int(args.navigations * args.warmup)
+
+    def navigations():
+        return server.requests["msa.list"] + server.requests["msa.detail"]
+
+    pw, browser, context, page = await get_page(headless=not args.headed)
+    started = time.monotonic()
+    samples = [take_sample(0, started)]
+    baseline_snapshot = None
+    done = 0
+
+    try:
+        site = site_cls(page)
+        configure_host(site.homeLink, **UNLIMITED)
+
+        first = navigations()
+        next_sample = args.sample_every
+        visits = 0
+        while done < args.navigations:
+            # One scheduler visit; the scraper resets its per-run state itself
+            category = site.CATEGORIES[visits % len(site.CATEGORIES)]
+            await site.collect_categorized_data(category)
+            visits += 1
+            done = navigations() - first
+            if done < next_sample and done < args.navigations:
+                continue
+            next_sample = done + args.sample_every
+
+            sample = take_sample(done, started)
+            samples.append(sample)
+            print(f"{done:>7} navigations  python {sample['python_rss_mb']} MB  "
+                  f"browser {sample['browser_rss_mb']} MB  fds {sample['open_fds']}", file=sys.stderr)
+
+            if baseline_snapshot is None and done >= warmup and tracemalloc.is_tracing():
+                baseline_snapshot = tracemalloc.take_snapshot()
+    finally:
+        await context.close()
+        await browser.close()
+        await pw.stop()
+
+    allocators = []
+    if baseline_snapshot is not None:
+        allocators = top_growth(baseline_snapshot, tracemalloc.take_snapshot(), args.top)
+    return samples, allocators, warmup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--navigations", type=int, default=2000, help="list and detail pages to load")
+    parser.add_argument("--listings", type=int, default=500, help="adverts on the fixture site")
+    parser.add_argument("--sample-every", type=int, default=50, metavar="N",
+                        help="navigations between samples (default: 50)")
+    parser.add_argument("--warmup", type=float, default=0.1,
+                        help="share of navigations before growth is measured (default: 0.1)")
+    parser.add_argument("--latency", type=float, default=0.0, help="fixture latency per page (ms)")
+    parser.add_argument("--description-kb", type=float, default=4.0)
+    parser.add_argument("--python-budget-mb", type=float, default=30.0)
+    parser.add_argument("--browser-budget-mb", type=float, default=150.0)
+    parser.add_argument("--fd-budget", type=float, default=10.0)
+    parser.add_argument("--task-budget", type=float, default=5.0)
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="skip allocation tracing (it slows Python down and adds its own memory)")
+    parser.add_argument("--top", type=int, default=15, help="allocation sites to report")
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+
+    server = FixtureSite(listings=args.listings, latency=args.latency / 1000,
+                         description_kb=args.description_kb).start()
+    try:
+        samples, allocators, warmup = asyncio.run(soak(server, args))
+    finally:
+        server.stop()
+
+    measured = [s for s in samples if s["navigations"] >= warmup]
+    checks = {}
+    for field, budget_arg in BUDGETS.items():
+        grew = growth(measured, field)
+        budget = getattr(args, budget_arg)
+        checks[field] = {"growth": grew, "budget": budget, "passed": grew is None or grew <= budget}
+    passed = all(check["passed"] for check in checks.values())
+
+    results = {
+        "config": vars(args),
+        "navigations": samples[-1]["navigations"],
+        "seconds": samples[-1]["seconds"],
+        "growth": checks | {"traced_mb": {"growth": growth(measured, "traced_mb")},
+                            "gc_objects": {"growth": growth(measured, "gc_objects")}},
+        "top_allocators": allocators,
+        "samples": samples,
+        "passed": passed,
+    }
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    print(report)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Benchmarks.startup_benchmark
+
+Cold start-up time of the entry points, with an `-X importtime` breakdown.
+
+Each target module is imported `--repeats` times, every time in a fresh
+interpreter run with `-X importtime`. The per-module timings Python
+writes to stderr are summed by top-level package (self time, so the
+packages add up to the total). `python Run.py --help` is timed end to
+end as well, since that is what every cron run and shard worker pays
+before doing any work. Reported as JSON:
+
+    import_ms      median time to import the target (cumulative)
+    packages       slowest top-level packages by self time, median run
+    heavy          heavy dependencies the import pulled in
+    cli_help_ms    median wall time of `python Run.py --help`
+    json_import_ms the same measure for `json`, a yardstick for the machine
+
+The exit status is 1 when a target imports any of `HEAVY` (they belong
+behind the feature that needs them) or its import takes longer than
+`--budget-ms`.
+
+Use case:
+    python -m Benchmarks.startup_benchmark
+    python -m Benchmarks.startup_benchmark --targets Run Utilities.query_api --budget-ms 250
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Imported only by the features that use them (Excel output, MinHash, browsers, images)
+HEAVY = ("pandas", "numpy", "openpyxl", "playwright", "PIL", "screeninfo")
+
+TARGETS = ("Run", "Utilities.query_api")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us)] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        self_us, cumulative_us, module = line.split(":", 1)[1].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_once(target):
+    """Import `target` in a fresh interpreter; returns (cumulative ms, {package: self ms})."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+
+    rows = parse_importtime(result.stderr)
+    packages = {}
+    total = 0
+    for module, self_us, cumulative_us in rows:
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us / 1000
+        if module == target:
+            total = cumulative_us / 1000
+    return total, packages
+
+
+def measure_target(target, repeats, top):
+    runs = [import_once(target) for _ in range(repeats)]
+    totals = [total for total, _ in runs]
+    # Break down the median run rather than averaging packages across runs
+    median_run = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+    packages = sorted(median_run[1].items(), key=lambda item: item[1], reverse=True)
+    return {
+        "import_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "packages": {name: round(ms, 1) for name, ms in packages[:top]},
+        "heavy": sorted(name for name in median_run[1] if name in HEAVY),
+    }
+
+
+def cli_help_ms(repeats):
+    """Median wall time of `python Run.py --help`, interpreter start-up included."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "Run.py", "--help"], cwd=ROOT, capture_output=True, check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), metavar="MODULE")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages listed per target")
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="import budget per target (median)")
+    args = parser.parse_args(argv)
+
+    targets = {target: measure_target(target, args.repeats, args.top) for target in args.targets}
+    baseline = measure_target("json", args.repeats, 0)["import_ms"]
+
+    passed = all(not result["heavy"] and result["import_ms"] <= args.budget_ms for result in targets.values())
+    print(json.dumps({
+        "config": vars(args),
+        "python": sys.version.split()[0],
+        "targets": targets,
+        "json_import_ms": baseline,
+        "cli_help_ms": cli_help_ms(args.repeats),
+        "passed": passed,
+    }, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Benchmarks.throttle_benchmark
+
+Convergence check for `Utilities.throttle_async` against a throttling stub.
+
+Starts a local HTTP server that answers 429 once requests exceed its
+capacity (requests per second) and slows down past a concurrency knee,
+then drives it through one `HostLimiter` and reports how close the
+limiter settles to the server's capacity. Prints JSON; exits 1 when the
+steady-state throughput or 429 share misses the targets.
+
+Use case:
+    python -m Benchmarks.throttle_benchmark --capacity 40 --seconds 30
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Utilities.throttle_async import HostLimiter
+
+
+class ThrottlingStub(ThreadingHTTPServer):
+    """Server with a hard request-rate capacity and a latency knee."""
+
+    daemon_threads = True
+
+    def __init__(self, capacity, knee, base_latency):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.capacity = capacity
+        self.knee = knee
+        self.base_latency = base_latency
+        self.in_flight = 0
+        self._tokens = float(capacity)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def admit(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.capacity)
+            self._refilled_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        if not server.admit():
+            self.send_response(429)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            overload = max(0, server.in_flight - server.knee)
+            time.sleep(server.base_latency * (1 + overload))
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            server.release()
+
+    def log_message(self, *args):
+        pass
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+async def drive(url, limiter, seconds, workers):
+    """Hammer `url` through `limiter` and sample it once per second."""
+    timeline = []
+    ok = throttled = 0
+    deadline = time.monotonic() + seconds
+
+    async def worker():
+        nonlocal ok, throttled
+        while time.monotonic() < deadline:
+            async with limiter.acquire() as slot:
+                status = await asyncio.to_thread(_get, url)
+                slot.record_status(status)
+            if status == 200:
+                ok += 1
+            elif status == 429:
+                throttled += 1
+
+    async def sampler():
+        last_ok = last_throttled = 0
+        while time.monotonic() < deadline:
+            await asyncio.sleep(1)
+            timeline.append({
+                "ok_per_s": ok - last_ok,
+                "throttled_per_s": throttled - last_throttled,
+                "rate": round(limiter.rate, 2),
+                "concurrency": limiter.concurrency,
+            })
+            last_ok, last_throttled = ok, throttled
+
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    await asyncio.gather(sampler(), *(worker() for _ in range(workers)))
+    return timeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--capacity", type=float, default=40.0, help="stub requests/second")
+    parser.add_argument("--knee", type=int, default=8, help="in-flight requests before slowdown")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub base latency (s)")
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--min-efficiency", type=float, default=0.7)
+    parser.add_argument("--max-throttled-share", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    server = ThrottlingStub(args.capacity, args.knee, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    limiter = HostLimiter(rate=1.0, burst=2, max_rate=args.capacity * 4,
+                          max_concurrency=args.knee * 4, latency_target=args.latency * 4)
+    try:
+        timeline = asyncio.run(drive(url, limiter, args.seconds, workers=args.knee * 4))
+    finally:
+        server.shutdown()
+
+    steady = timeline[-max(1, len(timeline) // 3):]
+    steady_ok = sum(s["ok_per_s"] for s in steady) / len(steady)
+    steady_throttled = sum(s["throttled_per_s"] for s in steady)
+    steady_total = steady_throttled + sum(s["ok_per_s"] for s in steady)
+    efficiency = steady_ok / args.capacity
+    throttled_share = steady_throttled / steady_total if steady_total else 0.0
+    passed = efficiency >= args.min_efficiency and throttled_share <= args.max_throttled_share
+
+    print(json.dumps({
+        "capacity": args.capacity,
+        "steady_ok_per_s": round(steady_ok, 2),
+        "efficiency": round(efficiency, 3),
+        "steady_throttled_share": round(throttled_share, 3),
+        "passed": passed,
+        "timeline": timeline,
+    }, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
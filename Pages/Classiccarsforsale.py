@@ -0,0 +1,25 @@
+"""Pages.Classiccarsforsale
+
+Sitemap-driven collector for classiccarsforsale.com.
+
+Listings are discovered from the site's XML sitemaps and their detail
+pages fetched over HTTP (see `Utilities.sitemap_async.SitemapSite`); no
+browser navigation is involved.
+"""
+
+import re
+
+from Utilities.sitemap_async import SitemapSite
+
+
+class ClassicCarsForSale(SitemapSite):
+    homeLink = "https://www.classiccarsforsale.com/"
+    SOURCE = "classiccars"
+    OUTPUT_FILE_NAME = "classiccars.xlsx"
+    # Advert pages: /listing/<slug>/ (search, dealer and editorial pages are skipped)
+    LISTING_URL_PATTERN = re.compile(r"^/listings?/[^/]+/?$")
+    SITEMAP_URLS = ("sitemap_index.xml", "sitemap.xml")
+    # Full seller text; the structured data carries a shortened summary
+    DESCRIPTION_CLASS = "listing-description"
+    # Per-host limits for Utilities.throttle_async (see configure_host)
+    THROTTLE = {"rate": 1.0, "burst": 2, "max_rate": 10.0, "max_concurrency": 8}
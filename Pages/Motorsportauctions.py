@@ -9,15 +9,123 @@ as async coroutines and rely on utility helpers in `Utilities`.
 
 from os import link
 
-from Utilities import db_utils
+import asyncio
+import time
+from html.parser import HTMLParser
+
+from Utilities import db_utils, metrics, page_archive, work_queue
 from Utilities.actions_async import safe_click, safe_text
 from Utilities.output import as_excel,deleteoldfile
 from Utilities.scroll_async import scroll_into_view
 from Utilities.waits_async import wait_dom, wait_network, wait_for
 from Utilities.state_async import is_visible
-from Utilities.id_utils import generate_id
-from typing import Optional
-from playwright.async_api import Locator
+from Utilities.id_utils import generate_listing_id
+from Utilities.listing_registry import ListingRegistry
+from Utilities.load_more_async import discover_load_more, harvest
+from Utilities.navigation_async import throttled
+from Utilities.replay_async import uses_har
+from Utilities.normalise import normalise_items
+from Utilities.retry_async import NavigationError, navigate
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Locator
+
+
+def normalise_description(description):
+    """Normalise a detail page description's line endings and trailing spaces.
+
+    Blank lines are kept so paragraphs survive.
+    """
+    # Normalize Windows line endings
+    description = description.replace("\r\n", "\n")
+
+    # Remove excessive trailing spaces but KEEP blank lines
+    description = "\n".join(line.rstrip() for line in description.split("\n"))
+
+    return description.strip()
+
+
+class _AdCards(HTMLParser):
+    """Read the fields `extract_ad_data` takes from each card whose id starts with `id_prefix`."""
+
+    def __init__(self, id_prefix):
+        super().__init__(convert_charrefs=True)
+        self.id_prefix = id_prefix
+        self.cards = []
+        self._card = None
+        self._depth = 0  # open divs inside the current card
+        self._span_seen = False
+        self._capture = None  # [field, tag, depth, parts] of the text being read
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self._card is None:
+            if tag == "div" and (attrs.get("id") or "").startswith(self.id_prefix):
+                self._card = {"title": None, "price": None, "date": None, "imageURLs": [], "linkURL": None}
+                self._depth, self._span_seen = 1, False
+            return
+
+        card = self._card
+        classes = (attrs.get("class") or "").split()
+        if tag == "div":
+            self._depth += 1
+        if self._capture and self._capture[1] == tag:
+            self._capture[2] += 1
+
+        if tag == "span":
+            # Title: the first span's title attribute, else the text of span.ad-title
+            if not self._span_seen:
+                self._span_seen = True
+                card["title"] = attrs.get("title") or None
+            if card["title"] is None and "ad-title" in classes:
+                self._start("title", tag)
+            elif card["date"] is None and "advert-date" in classes:
+                self._start("date", tag)
+        elif tag == "div" and card["price"] is None and "advert-price" in classes:
+            self._start("price", tag)
+        elif tag == "img":
+            src = attrs.get("nitro-lazy-src") or attrs.get("data-src") or attrs.get("src")
+            if src:
+                card["imageURLs"].append(src)
+        elif tag == "a" and card["linkURL"] is None:
+            card["linkURL"] = attrs.get("href")
+
+    def _start(self, field, tag):
+        if self._capture is None:
+            self._capture = [field, tag, 1, []]
+
+    def handle_endtag(self, tag):
+        if self._card is None:
+            return
+        if self._capture and self._capture[1] == tag:
+            self._capture[2] -= 1
+            if self._capture[2] == 0:
+                field, _, _, parts = self._capture
+                self._card[field] = " ".join("".join(parts).split())
+                self._capture = None
+        if tag == "div":
+            self._depth -= 1
+            if self._depth == 0:
+                self._card["imageURLs"] = sorted(set(self._card["imageURLs"]))
+                self.cards.append(self._card)
+                self._card = None
+
+    def handle_data(self, data):
+        if self._capture:
+            self._capture[3].append(data)
+
+
+def parse_ad_cards(html, id_prefix):
+    """Return the advert cards of an HTML page or fragment as `extract_ad_data` would read them.
+
+    Use case: the home panels' "Load More" fragments, parsed without
+    putting them into the page.
+    """
+    parser = _AdCards(id_prefix)
+    parser.feed(html)
+    parser.close()
+    return parser.cards
 
 
 class MotorsportAuctions:
@@ -34,10 +142,29 @@ class MotorsportAuctions:
 
     def __init__(self, page):
         self.page = page
+        # One entry per advert for this run, however many panels list it
+        self.registry = ListingRegistry()
+        # IDs already in the list register_ads last appended to
+        self._listed_items = None
+        self._listed_ids = set()
 
     homeLink = "https://www.motorsportauctions.com/"
+    SOURCE = "motorsport"
     OUTPUT_FILE_NAME = "motorsport_auctions.xlsx"
-
+    # Text shown on the page of a removed advert
+    REMOVED_MARKERS = ("Oops! That page can’t be found",)
+    # Categories walked by collect() and enqueued by enqueue_crawl()
+    CATEGORIES = ["historic-road-cars", "performance-road-cars", "transporters-and-support-vehicles", "other-items"]
+    # Per-host limits for Utilities.throttle_async (see configure_host)
+    THROTTLE = {"rate": 1.0, "burst": 2, "max_rate": 20.0, "max_concurrency": 16}
+    # Advert cards on a category list page
+    LIST_ITEM_XPATH = "//div[contains(@class,'middle-content')]//div[contains(@class,'advert-item-col')]"
+    # Home page panels: their container and the id prefix of their advert cards
+    HOME_PANELS = {"recent": {"panel": "div#option01", "card_id": "advert_id_"},
+                   "featured": {"panel": "div#option02", "card_id": "featured_id_"}}
+    LOAD_MORE_XPATH = "//button[contains(., 'Load More')]"
+
+    @metrics.timed("open")
     async def open(self):
         """Navigate to the homepage and wait for DOM/network settle.
 
@@ -47,9 +174,9 @@ class MotorsportAuctions:
         """
 
         # Debug: starting navigation to homeLink
-        await self.page.goto(self.homeLink, timeout=120000, wait_until="domcontentloaded")
+        await navigate(self.page, self.homeLink, f"{self.SOURCE}.open")
         # Wait until basic DOM is loaded before performing further actions
-        await wait_dom(self.page,999999)
+        await wait_dom(self.page, 60000)
         try:
             # Wait for network idle where possible; tolerate timeouts
             await wait_network(self.page)
@@ -115,7 +242,9 @@ class MotorsportAuctions:
 
         await self.page.wait_for_timeout(1000)
 
+    @metrics.timed("list_page")
     async def extract_ad_data(self, adsList, adCount, items, category=None):
+        ads = []
         for i in range(adCount):
             ad = adsList.nth(i)
             ad_data = {}
@@ -150,17 +279,44 @@ class MotorsportAuctions:
             link = ad.locator("a").first
             val = await link.get_attribute("href")
             ad_data["linkURL"] = val
-            
+            ads.append(ad_data)
+
+        return self.register_ads(ads, items, category)
+
+    def register_ads(self, ads, items, category=None):
+        """Give list cards their id, source and category and add them to `items` once per advert.
+
+        Use case: the shared tail of `extract_ad_data` and the home panel
+        harvest, whichever way the cards were read.
+        """
+        # Dates and prices for the whole page at once, before a card refreshes a known item
+        normalise_items(ads)
+        listed = self._ids_in(items)
+        for ad_data in ads:
             # Create unique ID for the ad based on its link
-            ad_data["id"] = generate_id("MSA_", val)
+            ad_data["id"] = generate_listing_id(self.SOURCE, ad_data["linkURL"])
+            ad_data["source"] = self.SOURCE
             
             # Add category if provided
             if category:
                 ad_data["category"] = [category] if category else []
             
-            items.append(ad_data)
+            # Seen under another category or panel: share that item, with categories merged
+            canonical = self.registry.register(ad_data)
+            if canonical["id"] not in listed:
+                listed.add(canonical["id"])
+                items.append(canonical)
+
+        metrics.ITEMS.inc(self.SOURCE, "list", amount=len(ads))
         return items
 
+    def _ids_in(self, items):
+        # Pages of one category append to the same list, so the set is rebuilt only when it changes
+        if items is not self._listed_items or len(self._listed_ids) != len(items):
+            self._listed_items = items
+            self._listed_ids = {item.get("id") for item in items}
+        return self._listed_ids
+
     async def get_all_image_urls(self, imgs , count):
         image_urls = []
 
@@ -182,32 +338,84 @@ class MotorsportAuctions:
     async def load_all_ads(self, ad_type: str):
         """Click 'Load More' buttons until all ads are loaded.
 
-        Use case: repeatedly click 'Load More' buttons on the page
-        until no more are present, waiting for network idle after
-        each click to ensure new content is loaded.
+        Use case: repeatedly click the panel's 'Load More' button until
+        the site removes it, waiting for network idle after each click
+        to ensure new content is loaded.
         """
 
-        loadMore = "(//button[contains(., 'Load More')])"
-        c=0
-        while True:
-        # while c < 2:  # limit to 3 clicks to avoid infinite loops
-            c+=1
-            loadMoreCount = await self.page.locator(loadMore).count()
-            if loadMoreCount > 1:
-                if ad_type == "recent":
-                    await safe_click(self.page.locator(loadMore).first)
-                    
-                elif ad_type == "featured":
-                    await safe_click(self.page.locator(loadMore).nth(1))
-                try:
-                    await wait_network(self.page)
-                except Exception:
-                    # tolerant: continue even if network idle isn't reached
-                    pass
-                # small pause to allow UI update before re-checking
-                await self.page.wait_for_timeout(500)
+        # Scoped to the panel: a button's index shifts once the other panel's is removed
+        loadMore = self.page.locator(self.HOME_PANELS[ad_type]["panel"]).locator(f"xpath=.{self.LOAD_MORE_XPATH}")
+        while await loadMore.count() > 0:
+            await safe_click(loadMore.first)
+            try:
+                await wait_network(self.page)
+            except Exception:
+                # tolerant: continue even if network idle isn't reached
+                pass
+            # small pause to allow UI update before re-checking
+            await self.page.wait_for_timeout(500)
+
+    async def harvest_home_panels(self):
+        """Return {panel: cards} for the home panels, read through their "Load More" endpoints.
+
+        Cards already on the page are parsed from its HTML. One dispatched
+        click per panel shows which request its button sends, and the
+        following pages are then fetched directly, both panels at once,
+        so the DOM never grows. A panel without a button is complete as
+        shown. A panel maps to None when its request could not be worked
+        out or a page failed; the caller then clicks through it instead.
+
+        Direct requests bypass HAR record/replay and the page archive, so
+        every panel maps to None while either is on.
+        """
+        if uses_har(self.page.context) or page_archive.enabled():
+            print("Recording, replaying or archiving: loading the home panels by clicking")
+            return {ad_type: None for ad_type in self.HOME_PANELS}
+
+        html = await self.page.content()
+        panels, specs = {}, {}
+        # One click at a time, so each captured request belongs to its panel
+        for ad_type, panel in self.HOME_PANELS.items():
+            panels[ad_type] = parse_ad_cards(html, panel["card_id"])
+            button = self.page.locator(panel["panel"]).locator(f"xpath=.{self.LOAD_MORE_XPATH}")
+            if await button.count() == 0:
                 continue
-            break
+            specs[ad_type] = await discover_load_more(self.page, button.first)
+            if specs[ad_type] is None:
+                panels[ad_type] = None
+
+        async def harvest_panel(ad_type, spec):
+            card_id = self.HOME_PANELS[ad_type]["card_id"]
+            result = await harvest(self.page.request, spec, parse=lambda fragment: parse_ad_cards(fragment, card_id),
+                                   key=lambda card: card["linkURL"], source=self.SOURCE)
+            print(f"{ad_type}: {len(result['cards'])} adverts from {result['pages']} Load More pages")
+            if not result["complete"]:
+                return None
+            shown = {card["linkURL"] for card in panels[ad_type]}
+            return panels[ad_type] + [card for card in result["cards"] if card["linkURL"] not in shown]
+
+        pending = {ad_type: spec for ad_type, spec in specs.items() if spec is not None}
+        harvested = await asyncio.gather(*(harvest_panel(ad_type, spec) for ad_type, spec in pending.items()))
+        panels.update(zip(pending, harvested))
+        return panels
+
+    async def click_through_home_panel(self, ad_type, items):
+        """Load a home panel by clicking "Load More" until it is gone, then read its cards from the DOM.
+
+        Use case: the fallback of `harvest_home_panels` for a panel whose
+        endpoint could not be paged directly.
+        """
+        other = "featured" if ad_type == "recent" else "recent"
+        await self.collapse_expand_Advertisements(other)
+        await self.collapse_expand_Advertisements(ad_type, action="expand")
+
+        # Ensure all ads are loaded by clicking 'Load More' buttons
+        await self.load_all_ads(ad_type)
+
+        await page_archive.capture(self.page, self.SOURCE, "list", category=ad_type)
+        adsList = self.page.locator(f"//div[contains(@id,'{self.HOME_PANELS[ad_type]['card_id']}')]")
+        adCount = await adsList.count()
+        return await self.extract_ad_data(adsList, adCount, items, category=ad_type)
 
     async def gather_detailed_data(self, items):
         """Gather detailed data for each advertisement in the list.
@@ -216,116 +424,155 @@ class MotorsportAuctions:
         extract additional information (e.g., description, seller info).
         """
         for idx, item in enumerate(items, start=1):
+            metrics.QUEUE_DEPTH.set(len(items) - idx + 1, f"{self.SOURCE}.detail")
             link = item.get("linkURL")
             if not link:
                 continue
+
+            # Already enriched under another category this run
+            if not self.registry.needs_details(item):
+                continue
             
             # await wait_for(2000)  # small pause before navigation
-            await self.page.goto(link, timeout=120000, wait_until="domcontentloaded")
-            await wait_dom(self.page,100000)
-            
-            # Check for the error message indicating the ad page is not found; if present, skip detailed extraction
-            if await self.page.locator("text=Oops! That page can’t be found.").count() > 0:
-                item["detailedDescription"] = None
-                item["location"] = None
-                item["contactInfo"] = None
-                item["imageURLs"] = []
-                continue
+            started = time.perf_counter()
+            not_found = False
+            try:
+                await navigate(self.page, link, f"{self.SOURCE}.detail")
+            except NavigationError as e:
+                if e.kind != "not_found":
+                    # Leave the stored row untouched rather than blanking its details
+                    print(f"Skipping details for item #{idx}: {e}")
+                    metrics.ERRORS.inc("detail", self.SOURCE)
+                    item["detailError"] = e.kind
+                    continue
+                not_found = True
 
-            # extract description
-            description_locator = self.page.locator("div.adverts-content")
+            try:
+                await wait_dom(self.page, 30000)
+            except Exception:
+                # DOM content is already parsed; late images/ads must not stall the run
+                pass
 
-            # Extract full visible text in DOM order
-            description = await description_locator.inner_text()
+            if not not_found:
+                await page_archive.capture(self.page, self.SOURCE, "detail", url=link)
 
-            # Normalize Windows line endings
-            description = description.replace("\r\n", "\n")
+            await self.extract_detail_data(item, not_found=not_found, idx=idx)
+            self.registry.mark_enriched(item)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "detail", self.SOURCE)
+            metrics.ITEMS.inc(self.SOURCE, "detail")
 
-            # Remove excessive trailing spaces but KEEP blank lines
-            description = "\n".join(line.rstrip() for line in description.split("\n"))
+        metrics.QUEUE_DEPTH.set(0, f"{self.SOURCE}.detail")
 
-            description = description.strip()
+    async def extract_detail_data(self, item, not_found=False, idx=0):
+        """Fill an item's detail fields from the detail page currently loaded.
 
-            item["detailedDescription"] = description
+        Use case: the parsing half of `gather_detailed_data`; the offline
+        re-parse runs it on archived HTML loaded with `set_content`.
+        """
+        # Check for the error message indicating the ad page is not found; if present, skip detailed extraction
+        if not_found or await self.page.locator(f"text={self.REMOVED_MARKERS[0]}.").count() > 0:
+            item["detailedDescription"] = None
+            item["location"] = None
+            item["contactInfo"] = None
+            item["imageURLs"] = []
+            return item
 
-            location_locator = self.page.locator(
-                "(//span[contains(text(),'Location')]//following::div)[1]"
-            )
+        # extract description
+        description_locator = self.page.locator("div.adverts-content")
 
-            if await location_locator.count() > 0:
-                location = await safe_text(location_locator)
-                item["location"] = location
-            else:
-                item["location"] = None
+        # Extract full visible text in DOM order
+        description = await description_locator.inner_text()
 
-            try:
-                # Contact Info Locator
-                contact_locator = self.page.locator("(//span[contains(text(),'Phone')]//following::div)[1]")
-                contact_info = await safe_text(contact_locator)
-                item["contactInfo"] = contact_info
-            except Exception:
-                item["contactInfo"] = None
-            
-            # Extract additional image URLs if available
-            try:
-                images_locators = self.page.locator(
-                "//li[contains(@class,'wpadverts')]"
-            )              
-                imgs = images_locators.locator("img")
-                count = await imgs.count()      
-                if count > 0:
-                    item["imageURLs"] = await self.get_all_image_urls(imgs, count)
-            except Exception as e:
-                print(f"Error extracting image URLs for item #{idx}: {e}")
-            
-            # Ensure imageURLs is always a list
-            if "imageURLs" not in item:
-                item["imageURLs"] = []
+        item["detailedDescription"] = normalise_description(description)
 
-    async def collect_categorized_data(self, category):
-        items =[]
+        location_locator = self.page.locator(
+            "(//span[contains(text(),'Location')]//following::div)[1]"
+        )
+
+        if await location_locator.count() > 0:
+            location = await safe_text(location_locator)
+            item["location"] = location
+        else:
+            item["location"] = None
+
+        try:
+            # Contact Info Locator
+            contact_locator = self.page.locator("(//span[contains(text(),'Phone')]//following::div)[1]")
+            contact_info = await safe_text(contact_locator)
+            item["contactInfo"] = contact_info
+        except Exception:
+            item["contactInfo"] = None
+        
+        # Extract additional image URLs if available
+        try:
+            images_locators = self.page.locator(
+            "//li[contains(@class,'wpadverts')]"
+        )              
+            imgs = images_locators.locator("img")
+            count = await imgs.count()      
+            if count > 0:
+                item["imageURLs"] = await self.get_all_image_urls(imgs, count)
+        except Exception as e:
+            print(f"Error extracting image URLs for item #{idx}: {e}")
         
-         # Nested helper function to build category-based links
-        def build_category_link(category):
-            """Build a link based on the category value.
-            
-            Args:
-                category: The category value (e.g., 'recent', 'featured', 'esports')
-                
-            Returns:
-                str: The constructed link or None if category is unknown
-            """
+        # Ensure imageURLs is always a list
+        if "imageURLs" not in item:
+            item["imageURLs"] = []
+
+        return item
+
+    def build_category_link(self, category):
+        """Build a link based on the category value.
+        
+        Args:
+            category: The category value (e.g., 'recent', 'featured', 'esports')
             
-            if category == "esports":
-                return self.homeLink + "category/20/esports.html"
-            elif category == "race-cars":
-                return self.homeLink + "/category/61/race-cars.html"
-            elif category == "rally-cars":
-                return self.homeLink + "/category/66/rally-cars.html" 
-            elif category == "sports-cars":
-                return self.homeLink + "category/75/sports-cars.html"           
-            elif category == "performance-road-cars":
-                return self.homeLink + "category/60/performance-road-cars.html"
-            elif category == "touring-cars":
-                return self.homeLink + "category/79/touring-cars.html"
-            elif category == "historic-road-cars":
-                return self.homeLink + "category/23/historic-road-cars.html"
-            elif category == "transporters-and-support-vehicles":
-                return self.homeLink + "category/87/transporters-and-support-vehicles.html"
-            elif category == "other-items":
-                return self.homeLink + "category/24/other-items.html"            
-            else:
-                return None
+        Returns:
+            str: The constructed link or None if category is unknown
+        """
         
-        category_link = build_category_link(category)
+        if category == "esports":
+            return self.homeLink + "category/20/esports.html"
+        elif category == "race-cars":
+            return self.homeLink + "/category/61/race-cars.html"
+        elif category == "rally-cars":
+            return self.homeLink + "/category/66/rally-cars.html" 
+        elif category == "sports-cars":
+            return self.homeLink + "category/75/sports-cars.html"           
+        elif category == "performance-road-cars":
+            return self.homeLink + "category/60/performance-road-cars.html"
+        elif category == "touring-cars":
+            return self.homeLink + "category/79/touring-cars.html"
+        elif category == "historic-road-cars":
+            return self.homeLink + "category/23/historic-road-cars.html"
+        elif category == "transporters-and-support-vehicles":
+            return self.homeLink + "category/87/transporters-and-support-vehicles.html"
+        elif category == "other-items":
+            return self.homeLink + "category/24/other-items.html"            
+        else:
+            return None
+
+    async def collect_category_listing(self, category):
+        """Walk every list page of `category` and return its ads without details.
+
+        Use case: the list half of `collect_categorized_data`; the work
+        queue runs it alone and fans the detail pages out as separate jobs.
+        """
+        items =[]
+        
+        category_link = self.build_category_link(category)
         if not category_link:
             print(f"Unknown category '{category}'. Skipping.")
             return items
         
-        await self.page.goto(category_link, timeout=120000, wait_until="domcontentloaded")
-        await wait_dom(self.page)
+        try:
+            await navigate(self.page, category_link, f"{self.SOURCE}.category")
+        except NavigationError as e:
+            print(f"Error opening category '{category}': {e}")
+            return items
+        await wait_dom(self.page, 60000)
         
-        adsList = self.page.locator("//div[contains(@class,'middle-content')]//div[contains(@class,'advert-item-col')]")
+        adsList = self.page.locator(self.LIST_ITEM_XPATH)
         
         # Check if ads exist on this page
         try:
@@ -337,6 +584,7 @@ class MotorsportAuctions:
             # Check if first ad is visible (strict mode issue with multiple elements)
             if await is_visible(adsList.first):              
                 # Page 1 (already loaded)
+                await page_archive.capture(self.page, self.SOURCE, "list", category=category)
                 await self.extract_ad_data(adsList, adCount, items, category=category)
                 # Pagination loop (2, 3, 4...)
                 page = 2
@@ -346,24 +594,105 @@ class MotorsportAuctions:
                     if await next_page.count() == 0:
                         break
 
-                    await next_page.click()
-                    await wait_dom(self.page)
-                    await wait_network(self.page)
+                    with metrics.timer("pagination", self.SOURCE):
+                        async with throttled(self.page.url):
+                            await next_page.click()
+                            await wait_dom(self.page, 60000)
+                            await wait_network(self.page)
 
                     # re-evaluate ads after page change
                     adCount = await adsList.count()
+                    await page_archive.capture(self.page, self.SOURCE, "list", category=category)
 
                     await self.extract_ad_data(adsList, adCount, items, category=category)
                     page += 1
-                
-                await self.gather_detailed_data(items)
 
             else:
                 print(f"Ads found for category '{category}' but not visible")
         except Exception as e:
             print(f"Error processing category '{category}': {e}")
+            metrics.ERRORS.inc("list_page", self.SOURCE)
         
         return items
+
+    async def extract_list_page(self, items, category=None):
+        """Extract the ads of the list page currently loaded into `items`.
+
+        Use case: offline re-parse of an archived list page. A home page
+        archived for a panel (category "recent" or "featured") yields that
+        panel's cards.
+        """
+        if category in self.HOME_PANELS:
+            adsList = self.page.locator(f"//div[contains(@id,'{self.HOME_PANELS[category]['card_id']}')]")
+        else:
+            adsList = self.page.locator(self.LIST_ITEM_XPATH)
+        return await self.extract_ad_data(adsList, await adsList.count(), items, category=category)
+
+    async def enqueue_crawl(self, crawl_id, categories=None):
+        """Queue one list job per category so several workers can share the crawl.
+
+        Use case: run once, then start any number of `run_worker` processes
+        with the same `crawl_id` (see Utilities.work_queue).
+        """
+        jobs = [
+            (self.build_category_link(category), {"category": category})
+            for category in (categories or self.CATEGORIES)
+        ]
+        queued = work_queue.enqueue_jobs(crawl_id, "list", self.SOURCE, jobs)
+        print(f"Queued {queued} category jobs for crawl '{crawl_id}'")
+        return queued
+
+    async def run_job(self, job):
+        """Run one claimed work-queue job.
+
+        A "list" job walks a category's pages and queues a "detail" job per
+        ad; a "detail" job enriches that one ad and upserts it. Both only
+        make idempotent writes, so a job re-run after a lost lease is safe.
+        Each job is a run of its own: the registry is reset, so a re-run
+        detail job is always enriched again.
+        """
+        self.registry.reset()
+        if job["kind"] == "list":
+            items = await self.collect_category_listing(job["payload"]["category"])
+            db_utils.mark_seen(self.SOURCE, [item["id"] for item in items])
+            work_queue.enqueue_jobs(
+                job["crawl_id"], "detail", self.SOURCE,
+                [(item["linkURL"], item) for item in items if item.get("linkURL")],
+            )
+
+        elif job["kind"] == "detail":
+            item = job["payload"]
+            await self.gather_detailed_data([item])
+            if item.get("detailError"):
+                # Raise so the queue retries it later instead of marking it done
+                raise RuntimeError(f"detail page failed: {item['detailError']}")
+            with metrics.timer("db_upsert", self.SOURCE):
+                db_utils.upsert_product(item)
+                # Categories another list job merged in while this one ran
+                work_queue.settle_categories(job)
+            metrics.ITEMS.inc(self.SOURCE, "stored")
+
+        else:
+            raise ValueError(f"Unknown job kind '{job['kind']}'")
+
+    async def collect_categorized_data(self, category, new_run=True):
+        """Collect one category with details.
+
+        `new_run` resets the registry first, as a scheduler visit needs;
+        `collect` passes False so adverts listed under several categories
+        are still fetched once.
+        """
+        if new_run:
+            self.registry.reset()
+        items = await self.collect_category_listing(category)
+
+        try:
+            await self.gather_detailed_data(items)
+        except Exception as e:
+            print(f"Error processing category '{category}': {e}")
+            metrics.ERRORS.inc("detail", self.SOURCE)
+
+        return items
            
     async def collect_test(self):
         items = []
@@ -408,52 +737,28 @@ class MotorsportAuctions:
         """Collect advertisement listings from the current page.
 
         Workflow / Use case:
-            1. Optionally collapse or expand ad sections to reduce noise.
-            2. Locate all ad containers and extract title, price, date,
-               image URL and link for each listing.
+            1. Read the recent and featured panels through their "Load
+               More" endpoints (`harvest_home_panels`), clicking through
+               a panel only when its endpoint cannot be paged.
+            2. Gather each advert's detail page.
             3. Save results to an Excel file with basic metadata.
 
         Returns:
             List[Dict]: list of ad metadata dictionaries.
         """
 
+        self.registry.reset()
         homeAnchor = self.page.locator("//a[normalize-space()='Home']")
         await safe_click(homeAnchor)
-        
-        items = []
-        # Small initial pause to ensure any last rendering completes
-        await self.page.wait_for_timeout(1000)
-
-        # Collapse the featured advertisement section header (if present) to get stable layout
-        await self.collapse_expand_Advertisements("featured")
-
-
-        # Ensure all ads are loaded by clicking 'Load More' buttons
-        await self.load_all_ads("recent")
-        
-        # All Recent adverts containers match id pattern 'advert_id_'
-        adsList = self.page.locator("//div[contains(@id,'advert_id_')]")
-        adCount = await adsList.count()
+        await wait_dom(self.page, 60000)
 
-        items = await self.extract_ad_data(adsList, adCount, items, category="recent")
-        
-        # Collapse the recent advertisement section header (if present) to get stable layout
-        await self.collapse_expand_Advertisements("recent")
-
-        # Expand the featured advertisement section header (if present) to get stable layout
-        await self.collapse_expand_Advertisements("featured", action="expand")
-        
-        # Ensure all ads are loaded by clicking 'Load More' buttons
-        await self.load_all_ads("featured")
-        
-        # All Featured adverts containers match id pattern 'featured_id_'
-        adsList = self.page.locator("//div[contains(@id,'featured_id_')]")
-        adCount = await adsList.count()
-
-        items.extend(await self.extract_ad_data(adsList, adCount, [], category="featured"))
-        
-        # Small initial pause to ensure any last rendering completes
-        await self.page.wait_for_timeout(10000)
+        # Recent and featured share one list, so an advert in both panels is one item
+        items = []
+        for ad_type, cards in (await self.harvest_home_panels()).items():
+            if cards is None:
+                await self.click_through_home_panel(ad_type, items)
+            else:
+                self.register_ads(cards, items, category=ad_type)
         
         await self.gather_detailed_data(items)
         
@@ -466,13 +771,50 @@ class MotorsportAuctions:
         return items
 
     async def store_in_db_excel(self, items,category):
+        self.persist(items, category)
+
+    def persist(self, items, category=None):
+        """Upsert `items`, mark them seen and append them to the Excel output.
+
+        Use case: the write half of `store_in_db_excel`; needs no page, so
+        the sharded runner calls it on `MotorsportAuctions(None)` in the
+        parent process as worker results arrive.
+        """
         for item in items:
-            db_utils.upsert_product(item)
+            # Details failed to load; don't overwrite what is already stored
+            if item.get("detailError"):
+                continue
+            with metrics.timer("db_upsert", self.SOURCE):
+                db_utils.upsert_product(item)
+            metrics.ITEMS.inc(self.SOURCE, "stored")
+
+        # Listings found by this crawl are not candidates for the liveness sweep
+        db_utils.mark_seen(self.SOURCE, [item["id"] for item in items])
             
         # Metadata describing the collection
         meta = {"source": self.homeLink,"category": category, "records": len(items)}
         # Persist results to Excel; `as_excel` will create a metadata sheet
-        as_excel(items, meta=meta, file_path=self.OUTPUT_FILE_NAME)
+        with metrics.timer("file_output", self.SOURCE):
+            as_excel(items, meta=meta, file_path=self.OUTPUT_FILE_NAME)
+
+    def persist_reparsed(self, items, category=None):
+        """Upsert items rebuilt from the page archive and append them to the Excel output.
+
+        Use case: `page_archive.reparse`. Unlike `persist`, listings keep
+        their status and last_seen_at, since an old page says nothing about
+        whether the advert is still up, and stored details stay when the
+        archive holds no detail page for an item.
+        """
+        for item in items:
+            if item.get("detailError"):
+                continue
+            with metrics.timer("db_upsert", self.SOURCE):
+                db_utils.upsert_product(item, reparsed=True)
+            metrics.ITEMS.inc(self.SOURCE, "stored")
+
+        meta = {"source": self.homeLink, "category": category, "records": len(items), "reparsed": True}
+        with metrics.timer("file_output", self.SOURCE):
+            as_excel(items, meta=meta, file_path=self.OUTPUT_FILE_NAME)
     
     async def collect(self):
         """Main method to collect advertisement listings from the current page.
@@ -487,12 +829,12 @@ class MotorsportAuctions:
         # categories = ["esports","sports-cars", "race-cars", "rally-cars",  "touring-cars", "historic-road-cars", "performance-road-cars", "transporters-and-support-vehicles", "other-items"]
         
         # deleteoldfile(self.OUTPUT_FILE_NAME)
-        
-        categories = ["historic-road-cars", "performance-road-cars", "transporters-and-support-vehicles", "other-items"]
-        
-        for cat in categories:
+
+        # A new run: earlier sightings must not mask price changes or skip details
+        self.registry.reset()
+        for cat in self.CATEGORIES:
             items = []
-            items.extend(await self.collect_categorized_data(cat))
+            items.extend(await self.collect_categorized_data(cat, new_run=False))
             await self.store_in_db_excel(items,cat)
         
         # items.extend(await self.collect_featured_and_recent_ads())
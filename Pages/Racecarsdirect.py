@@ -0,0 +1,24 @@
+"""Pages.Racecarsdirect
+
+Sitemap-driven collector for racecarsdirect.com.
+
+Listings are discovered from the site's XML sitemaps and their detail
+pages fetched over HTTP (see `Utilities.sitemap_async.SitemapSite`); no
+browser navigation is involved.
+"""
+
+import re
+
+from Utilities.sitemap_async import SitemapSite
+
+
+class RaceCarsDirect(SitemapSite):
+    homeLink = "https://www.racecarsdirect.com/"
+    SOURCE = "racecarsdirect"
+    OUTPUT_FILE_NAME = "racecarsdirect.xlsx"
+    # Advert pages: /Advert/Details/<id>/<slug>
+    LISTING_URL_PATTERN = re.compile(r"^/Advert/Details/\d+", re.IGNORECASE)
+    SITEMAP_URLS = ("sitemap.xml",)
+    DESCRIPTION_CLASS = "advert-description"
+    # Per-host limits for Utilities.throttle_async (see configure_host)
+    THROTTLE = {"rate": 0.5, "burst": 1, "max_rate": 5.0, "max_concurrency": 4}
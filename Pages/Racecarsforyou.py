@@ -2,10 +2,15 @@ from datetime import datetime, timedelta
 import re
 import time
 
+from Utilities import metrics, page_archive
 from Utilities.actions_async import safe_click, safe_text
 from Utilities.output import as_excel
 from Utilities.waits_async import wait_dom, wait_network
 from Utilities.scroll_async import scroll_into_view
+from Utilities.id_utils import generate_listing_id
+from Utilities.navigation_async import throttled
+from Utilities.normalise import normalise_items
+from Utilities.retry_async import navigate
 from Utilities.state_async import get_attr_async, is_visible
 
 
@@ -14,17 +19,27 @@ class RaceCarsForYou:
         self.page = page
     
     homeLink = "https://racecarsforyou.com/"
+    SOURCE = "racecars"
+    OUTPUT_FILE_NAME = "racecars.xlsx"
+    # Advert cards on a search results page
+    LIST_ITEM_XPATH = "//div[contains(@class,'grid_listing listing-')]"
+    # Per-host limits for Utilities.throttle_async (see configure_host)
+    THROTTLE = {"rate": 0.5, "burst": 1, "max_rate": 10.0, "max_concurrency": 8}
     
     # ---------------- OPEN ---------------- #
 
+    @metrics.timed("open")
     async def open(self):
-        await self.page.goto(
-            f"{self.homeLink}/search-for-race-cars/?_listing_type=race-car%2Crace-car-parts%2Crace-car-pit-equipment-tools%2Crace-trailers%2Ctransporters-trucks-toters&_sorter=date&_currency=undefined&_per_page=50"
+        await navigate(
+            self.page,
+            f"{self.homeLink}/search-for-race-cars/?_listing_type=race-car%2Crace-car-parts%2Crace-car-pit-equipment-tools%2Crace-trailers%2Ctransporters-trucks-toters&_sorter=date&_currency=undefined&_per_page=50",
+            f"{self.SOURCE}.open",
         )
         await wait_dom(self.page)
 
     # ---------------- PAGINATION ---------------- #
 
+    @metrics.timed("pagination")
     async def move_to_next_page(self, current_page: int, count: int) -> bool:
         next_button = self.page.locator(
             "(//a[contains(@class,'facetwp-page next')])[1]"
@@ -35,9 +50,13 @@ class RaceCarsForYou:
 
         await scroll_into_view(next_button)
         await self.page.wait_for_timeout(500)
-        await safe_click(next_button)
+        async with throttled(self.page.url) as slot:
+            await safe_click(next_button)
+            moved = await self.wait_for_page_number(current_page + 1)
+            if not moved:
+                slot.record_timeout()
 
-        return await self.wait_for_page_number(current_page + 1)
+        return moved
 
 
     # ---------------- PAGE INDICATOR ---------------- #
@@ -69,7 +88,9 @@ class RaceCarsForYou:
 
     # ---------------- EXTRACT DATA ---------------- #
     
+    @metrics.timed("list_page")
     async def extract_ad_data(self, adsList, adCount, items):
+        start = len(items)
         for i in range(adCount):
             ad = adsList.nth(i)
             ad_data = {}
@@ -115,7 +136,15 @@ class RaceCarsForYou:
             val = await link.get_attribute("href")
             ad_data["linkURL"] = val
 
+            # Create unique ID for the ad based on its link
+            ad_data["id"] = generate_listing_id(self.SOURCE, val)
+            ad_data["source"] = self.SOURCE
+
             items.append(ad_data)
+
+        # Listing cards carry no date; prices only
+        normalise_items(items[start:])
+        metrics.ITEMS.inc(self.SOURCE, "list", amount=adCount)
         return items
     
     # ---------------- COLLECT ---------------- #
@@ -135,7 +164,8 @@ class RaceCarsForYou:
 
         while current_page <= pages_count:
             
-            ad_blocks = self.page.locator("//div[contains(@class,'grid_listing listing-')]")
+            await page_archive.capture(self.page, self.SOURCE, "list")
+            ad_blocks = self.page.locator(self.LIST_ITEM_XPATH)
             count = await ad_blocks.count()
 
             await self.extract_ad_data(ad_blocks, count, items)
@@ -146,6 +176,7 @@ class RaceCarsForYou:
             moved = await self.move_to_next_page(current_page,count)
             if not moved:
                 print(f"⚠️ Failed to move from page {current_page}")
+                metrics.ERRORS.inc("pagination", self.SOURCE)
                 break
 
             current_page += 1
@@ -153,12 +184,30 @@ class RaceCarsForYou:
         # Small initial pause to ensure any last rendering completes
         await self.page.wait_for_timeout(1000)
         
+        self.persist(items)
+        return items
+
+    # ---------------- PERSIST ---------------- #
+
+    def persist(self, items, category=None):
+        """Append `items` to this site's Excel output.
+
+        Use case: end of `collect`, and the offline re-parse of archived pages.
+        """
         # Metadata describing the collection
         meta = {"source": self.homeLink, "records": len(items)}
 
         # Persist results to Excel; `as_excel` will create a metadata sheet
-        as_excel(items, meta=meta, file_path="racecars.xlsx")
-        return items
+        with metrics.timer("file_output", self.SOURCE):
+            as_excel(items, meta=meta, file_path=self.OUTPUT_FILE_NAME)
+
+    async def extract_list_page(self, items, category=None):
+        """Extract the ads of the results page currently loaded into `items`.
+
+        Use case: offline re-parse of an archived list page.
+        """
+        ad_blocks = self.page.locator(self.LIST_ITEM_XPATH)
+        return await self.extract_ad_data(ad_blocks, await ad_blocks.count(), items)
 
 
 # 
\ No newline at end of file
@@ -1,11 +1,15 @@
-from datetime import datetime, timedelta
 import re
 import time
 
+from Utilities import metrics, page_archive
 from Utilities.actions_async import safe_click, safe_text
 from Utilities.output import as_excel
 from Utilities.waits_async import wait_dom, wait_network
 from Utilities.scroll_async import scroll_into_view
+from Utilities.id_utils import generate_listing_id
+from Utilities.navigation_async import throttled
+from Utilities.normalise import normalise_items
+from Utilities.retry_async import navigate
 from Utilities.state_async import is_visible
 
 
@@ -13,13 +17,18 @@ class RallyCarsForSale:
     def __init__(self, page):
         self.page = page
     homeLink = "https://rallycarsforsale.net/"
+    SOURCE = "rallycars"
+    OUTPUT_FILE_NAME = "rallycars.xlsx"
+    # Advert cards on a search results page
+    LIST_ITEM_XPATH = "//div[contains(@class,'post-block-out')]"
+    # Per-host limits for Utilities.throttle_async (see configure_host)
+    THROTTLE = {"rate": 1.0, "burst": 2, "max_rate": 20.0, "max_concurrency": 16}
 
     # ---------------- OPEN ---------------- #
 
+    @metrics.timed("open")
     async def open(self):
-        await self.page.goto(
-            f"{self.homeLink}?s=&sa=search&scat=8"
-        )
+        await navigate(self.page, f"{self.homeLink}?s=&sa=search&scat=8", f"{self.SOURCE}.open")
         await wait_dom(self.page)
         await wait_network(self.page)
         await self.accept_cookies_if_present()
@@ -56,121 +65,9 @@ class RallyCarsForSale:
 
         return False
 
-    # ---------------- DATE PARSING ---------------- #
-
-    async def parse_relative_date(self, text: str) -> str:
-        """Convert relative time strings (e.g. '14 uur ago' or 'December 20 , 2025')
-
-        Returns a formatted date like '22 December 2025' when possible, otherwise
-        returns the original text.
-        """
-        if not text:
-            return ""
-
-        s = text.strip()
-        # normalize spacing and remove extra commas and 'ago'
-        s_clean = re.sub(r"\s+", " ", s.replace(',', '')).strip().lower()
-        s_proc = s_clean.replace('ago', '').strip()
-
-        now = datetime.now()
-
-        # relative: hours
-        m = re.match(r"^(\d+)\s*(uur|u|hours?|hrs?|h)\b", s_proc)
-        if m:
-            dt = now - timedelta(hours=int(m.group(1)))
-            return dt.strftime("%d %B %Y")
-
-        # minutes
-        m = re.match(r"^(\d+)\s*(min|mins|minuten|minutes?)\b", s_proc)
-        if m:
-            dt = now - timedelta(minutes=int(m.group(1)))
-            return dt.strftime("%d %B %Y")
-
-        # days
-        m = re.match(r"^(\d+)\s*(dag|dagen|d|day|days)\b", s_proc)
-        if m:
-            dt = now - timedelta(days=int(m.group(1)))
-            return dt.strftime("%d %B %Y")
-
-        # weeks
-        m = re.match(r"^(\d+)\s*(week|weeks|w)\b", s_proc)
-        if m:
-            dt = now - timedelta(weeks=int(m.group(1)))
-            return dt.strftime("%d %B %Y")
-
-        # months / years (approximate)
-        m = re.match(r"^(\d+)\s*(month|months|maand|maanden)\b", s_proc)
-        if m:
-            dt = now - timedelta(days=30 * int(m.group(1)))
-            return dt.strftime("%d %B %Y")
-
-        m = re.match(r"^(\d+)\s*(year|years|jaar)\b", s_proc)
-        if m:
-            dt = now - timedelta(days=365 * int(m.group(1)))
-            return dt.strftime("%d %B %Y")
-
-        # Try parsing common explicit date formats after removing commas
-        s_try = re.sub(r",", "", s).strip()
-
-        # --- ✅ DUTCH MONTH NORMALIZATION (ADDED PART) ---
-        DUTCH_TO_EN_MONTHS = {
-            "januari": "January",
-            "februari": "February",
-            "maart": "March",
-            "april": "April",
-            "mei": "May",
-            "juni": "June",
-            "juli": "July",
-            "augustus": "August",
-            "september": "September",
-            "oktober": "October",
-            "november": "November",
-            "december": "December",
-
-            # abbreviations
-            "jan": "January",
-            "feb": "February",
-            "mrt": "March",
-            "apr": "April",
-            "jun": "June",
-            "jul": "July",
-            "aug": "August",
-            "sep": "September",
-            "okt": "October",
-            "nov": "November",
-            "dec": "December",
-        }
-
-        for nl, en in DUTCH_TO_EN_MONTHS.items():
-            pattern = r"\b" + nl + r"\b"
-            if re.search(pattern, s_try, flags=re.IGNORECASE):
-                s_try = re.sub(pattern, en, s_try, flags=re.IGNORECASE)
-                break
-        # --- END ADDED PART ---
-
-        formats = [
-            "%B %d %Y",
-            "%b %d %Y",
-            "%d %B %Y",
-            "%d %b %Y",
-            "%Y-%m-%dT%H:%M:%S",
-            "%Y-%m-%d",
-            "%d/%m/%Y",
-            "%d-%m-%Y",
-        ]
-
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(s_try, fmt)
-                return dt.strftime("%d %B %Y")
-            except Exception:
-                pass
-
-        # fallback
-        return text
-    
     # ---------------- PAGINATION ---------------- #
 
+    @metrics.timed("pagination")
     async def move_to_next_page(self, current_page: int) -> bool:
         next_button = (
             self.page.locator(
@@ -185,13 +82,19 @@ class RallyCarsForSale:
 
         await scroll_into_view(next_button)
         await self.page.wait_for_timeout(500)
-        await safe_click(next_button)
+        async with throttled(self.page.url) as slot:
+            await safe_click(next_button)
+            moved = await self.wait_for_page_number(current_page + 1)
+            if not moved:
+                slot.record_timeout()
 
-        return await self.wait_for_page_number(current_page + 1)
+        return moved
 
     # ---------------- EXTRACT DATA ---------------- #
     
+    @metrics.timed("list_page")
     async def extract_ad_data(self, adsList, adCount, items):
+        start = len(items)
         for i in range(adCount):
         # for i in range(1):
             ad = adsList.nth(i)
@@ -227,7 +130,7 @@ class RallyCarsForSale:
 
             # Date: human readable posted/auction date
             date = ad.locator("xpath=.//span[@class ='dashicons-before clock']//span").first
-            val = await self.parse_relative_date(await safe_text(date))
+            val = await safe_text(date)
             ad_data["date"] = val
 
             # Image URL: prefer lazy-loaded attributes then fallback to src
@@ -240,7 +143,15 @@ class RallyCarsForSale:
             val = await link.get_attribute("href")
             ad_data["linkURL"] = val
 
+            # Create unique ID for the ad based on its link
+            ad_data["id"] = generate_listing_id(self.SOURCE, val)
+            ad_data["source"] = self.SOURCE
+
             items.append(ad_data)
+
+        # Relative dates ("14 uur ago") and prices, for the whole page at once
+        normalise_items(items[start:])
+        metrics.ITEMS.inc(self.SOURCE, "list", amount=adCount)
         return items
     
     # ---------------- COLLECT ---------------- #
@@ -261,7 +172,8 @@ class RallyCarsForSale:
         while current_page <= pages_count:
             await self.accept_cookies_if_present()
 
-            ad_blocks = self.page.locator("//div[contains(@class,'post-block-out')]")
+            await page_archive.capture(self.page, self.SOURCE, "list")
+            ad_blocks = self.page.locator(self.LIST_ITEM_XPATH)
             count = await ad_blocks.count()
 
             await self.extract_ad_data(ad_blocks, count, items)
@@ -272,16 +184,35 @@ class RallyCarsForSale:
             moved = await self.move_to_next_page(current_page)
             if not moved:
                 print(f"⚠️ Failed to move from page {current_page}")
+                metrics.ERRORS.inc("pagination", self.SOURCE)
                 break
 
             current_page += 1
         
         # Small initial pause to ensure any last rendering completes
-        await self.page.wait_for_timeout(1000000)
+        await self.page.wait_for_timeout(1000)
         
+        self.persist(items)
+        return items
+
+    # ---------------- PERSIST ---------------- #
+
+    def persist(self, items, category=None):
+        """Append `items` to this site's Excel output.
+
+        Use case: end of `collect`, and the offline re-parse of archived pages.
+        """
         # Metadata describing the collection
         meta = {"source": self.homeLink, "records": len(items)}
 
         # Persist results to Excel; `as_excel` will create a metadata sheet
-        as_excel(items, meta=meta, file_path="rallycars.xlsx")
-        return items
+        with metrics.timer("file_output", self.SOURCE):
+            as_excel(items, meta=meta, file_path=self.OUTPUT_FILE_NAME)
+
+    async def extract_list_page(self, items, category=None):
+        """Extract the ads of the results page currently loaded into `items`.
+
+        Use case: offline re-parse of an archived list page.
+        """
+        ad_blocks = self.page.locator(self.LIST_ITEM_XPATH)
+        return await self.extract_ad_data(ad_blocks, await ad_blocks.count(), items)
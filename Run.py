@@ -1,11 +1,26 @@
+import argparse
 import asyncio
-from screeninfo import get_monitors
+import json
+import os
+import sys
+import time
+from datetime import datetime
 from Utilities import db_utils
+from Utilities.liveness_async import sweep_stale_listings
+from Utilities.images_async import store_listing_images
+from Utilities.sitemap_async import create_sitemap_table
+from Utilities.throttle_async import UNLIMITED, configure_host, snapshot
+from Utilities.retry_async import outcome_counts
+from Utilities import dedupe, metrics, page_archive, profiler, work_queue
+from Utilities.shard_runner import run_sharded
+from Utilities.scheduler_async import run_scheduler
 
 from Pages.Racecarsforyou import RaceCarsForYou
 from Utilities.browser_async import get_page
 from Pages.Motorsportauctions import MotorsportAuctions
 from Pages.Rallycarsforsale import RallyCarsForSale
+from Pages.Classiccarsforsale import ClassicCarsForSale
+from Pages.Racecarsdirect import RaceCarsDirect
 
 
 
@@ -13,20 +28,72 @@ SITES = {
     "motorsport": MotorsportAuctions,
     "rallycars": RallyCarsForSale,
     "racecars": RaceCarsForYou,
+    "classiccars": ClassicCarsForSale,
+    "racecarsdirect": RaceCarsDirect,
 }
 
 
-async def run(site_key):
+def recording_path(directory, site_key):
+    return os.path.join(directory, f"{site_key}.har.zip")
+
+
+async def run(site_key, worker_crawl_id=None, headless=False, record_dir=None, replay_dir=None,
+              images=False, **replay_options):
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
     pw, browser, context, page = await get_page(
-        headless=False,
+        headless=headless,
+        record_har=recording_path(record_dir, site_key) if record_dir else None,
+        replay_har=recording_path(replay_dir, site_key) if replay_dir else None,
+        **replay_options,
     )
+    run_started = time.perf_counter()
 
     try:
         site = SITES[site_key](page)
+        if (record_dir or replay_dir) and not getattr(site, "USES_BROWSER", True):
+            # Its requests bypass the HAR: a replay would reach the live site and a recording stay empty
+            print(f"⚠️ Skipping {site_key}: it fetches without the browser, so it cannot be recorded or replayed")
+            return
+        # A replayed run has no server to protect, so it runs unthrottled
+        configure_host(site.homeLink, **(UNLIMITED if replay_dir else getattr(site, "THROTTLE", {})))
+
+        if worker_crawl_id:
+            # Share a queued crawl with other workers (see --enqueue)
+            await work_queue.run_worker(site, crawl_id=worker_crawl_id)
+        else:
+            # From the database clock: last_seen_at and updated_at are stamped with its NOW()
+            crawl_started = db_utils.db_now()
+
+            await site.open()
+            # data = await site.collect_test()
+            await site.collect()
+
+            # Probe stored listings this crawl did not see and flag the dead ones;
+            # the probes bypass the browser, so a replayed run skips them
+            if not replay_dir:
+                user_agent = await page.evaluate("navigator.userAgent")
+                await sweep_stale_listings(
+                    pw,
+                    site.SOURCE,
+                    crawl_started,
+                    removed_markers=getattr(site, "REMOVED_MARKERS", ()),
+                    user_agent=user_agent,
+                )
+                # Download the galleries this crawl added or changed (same database-clock cutoff)
+                if images:
+                    await store_listing_images(pw, site.SOURCE, since=crawl_started, user_agent=user_agent)
+
+        # Fold this run's inserts/updates into the dashboard summaries
+        changed = db_utils.refresh_summaries()
+        print(f"Refreshed summaries with {changed} changed listings")
 
-        await site.open()
-        # data = await site.collect_test()
-        await site.collect()
+        if hasattr(site, "registry"):
+            metrics.record_dedupe(site.SOURCE, site.registry.report())
+            print(f"Listing dedupe: {site.registry.report()}")
+        print(f"Host limits after run: {snapshot()}")
+        print(f"Navigation outcomes: {outcome_counts()}")
+        print(f"Run time for {site_key}: {time.perf_counter() - run_started:.1f}s")
 
         # print(f"\nCollected {len(data)} items from {site_key}")
         # for d in data[:3]:
@@ -38,14 +105,135 @@ async def run(site_key):
         await pw.stop()
 
 
-async def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape competition car listings into PostgreSQL.")
+    parser.add_argument("sites", nargs="*", default=["motorsport"], metavar="site",
+                        help=f"sites to crawl: {', '.join(SITES)} (default: motorsport)")
+    parser.add_argument("--headless", action="store_true", help="run Chromium without a window")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="shard the crawl across N browser processes (0 = one per CPU)")
+    parser.add_argument("--enqueue", metavar="CRAWL_ID",
+                        help="queue the site's crawl as jobs for --worker processes and exit")
+    parser.add_argument("--worker", metavar="CRAWL_ID",
+                        help="claim and run queued jobs for CRAWL_ID until it drains")
+    parser.add_argument("--schedule", action="store_true",
+                        help="keep revisiting the sites' categories on adaptive intervals")
+    parser.add_argument("--nav-budget", type=int, default=600, metavar="N",
+                        help="navigations per hour allowed in --schedule mode (default: 600)")
+    parser.add_argument("--archive", action="store_true",
+                        help=f"keep compressed copies of fetched pages in {page_archive.ARCHIVE_DIR}/")
+    parser.add_argument("--reparse", action="store_true",
+                        help="re-extract archived pages with the current extractors (no network) and store them")
+    parser.add_argument("--since", type=datetime.fromisoformat, metavar="DATE",
+                        help="with --reparse, only pages fetched on or after DATE (YYYY-MM-DD)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="save every response of the run to DIR/<site>.har.zip")
+    parser.add_argument("--replay", metavar="DIR",
+                        help="serve the run from DIR/<site>.har.zip instead of the network")
+    parser.add_argument("--latency", type=float, default=0.0, metavar="MS",
+                        help="with --replay, delay every response by MS milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, metavar="MS",
+                        help="with --replay, add a seeded random 0..MS ms on top of --latency")
+    parser.add_argument("--recorded-latency", action="store_true",
+                        help="with --replay, delay each response by its recorded time")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics on localhost:PORT/metrics while running")
+    parser.add_argument("--report", default=metrics.REPORT_PATH, metavar="PATH",
+                        help=f"JSON run report written at exit (default: {metrics.REPORT_PATH})")
+    parser.add_argument("--images", action="store_true",
+                        help="download new listing images with thumbnails into images/ after each crawl")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="skip clustering new listings with their near-duplicates on other sites")
+    parser.add_argument("--profile", action="store_true",
+                        help="time Playwright calls per call site and print the chattiest at exit "
+                             f"(folded stacks in {profiler.FOLDED_PATH})")
+    args = parser.parse_args(argv)
+
+    unknown = [site for site in args.sites if site not in SITES]
+    if unknown:
+        parser.error(f"unknown site(s): {', '.join(unknown)}")
+    if (args.enqueue or args.worker) and len(args.sites) != 1:
+        parser.error("--enqueue and --worker take exactly one site")
+    queueable = [key for key, site_cls in SITES.items()
+                 if hasattr(site_cls, "enqueue_crawl") and hasattr(site_cls, "run_job")]
+    if (args.enqueue or args.worker) and args.sites[0] not in queueable:
+        parser.error(f"{args.sites[0]} cannot be queued; --enqueue and --worker support: {', '.join(queueable)}")
+    return args
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    if args.profile:
+        profiler.enable()
+    try:
+        return await dispatch(args)
+    finally:
+        print(f"Run report written to {metrics.write_report(args.report)}")
+        if args.profile:
+            profiler.print_report()
+            print(f"Folded stacks written to {profiler.write_folded()}")
+
+
+def cluster_duplicates(args):
+    """Fold the listings this run added or changed into the cross-site duplicate clusters."""
+    if args.no_dedupe:
+        return
+    print(f"Duplicate clusters: {json.dumps(dedupe.update_clusters())}")
+
+
+async def dispatch(args):
     db_utils.create_table()
-    
-    # Run ONE site
-    await run("motorsport")
+    dedupe.create_dedupe_tables()
+    create_sitemap_table()
+
+    if args.enqueue or args.worker:
+        work_queue.create_queue_table()
+
+    if args.enqueue:
+        # Queueing needs no browser; pass None for the page
+        await SITES[args.sites[0]](None).enqueue_crawl(args.enqueue)
+        return 0
+
+    if args.reparse:
+        report = page_archive.reparse([SITES[site] for site in args.sites], since=args.since)
+        changed = db_utils.refresh_summaries()
+        print(f"Re-parsed archive: {json.dumps(report)}; {changed} listings changed")
+        cluster_duplicates(args)
+        return 1 if report["errors"] else 0
+
+    if args.archive:
+        page_archive.enable()
+
+    if args.schedule:
+        # Runs until interrupted; fresh data lands as each target is revisited
+        await run_scheduler([SITES[site] for site in args.sites],
+                            nav_budget=args.nav_budget, headless=args.headless)
+        return 0
+
+    if args.workers is not None:
+        # One browser per worker process; this process is the only DB writer
+        report = await run_sharded([SITES[site] for site in args.sites],
+                                   workers=args.workers or None, headless=args.headless,
+                                   archive=page_archive.ARCHIVE_DIR if args.archive else None,
+                                   profile=args.profile)
+        changed = db_utils.refresh_summaries()
+        print(f"Refreshed summaries with {changed} changed listings")
+        cluster_duplicates(args)
+        print(f"Shard report: {json.dumps(report, indent=2)}")
+        return 1 if report["failed"] else 0
+
+    # Run the sites one after another in this process
+    for site in args.sites:
+        await run(site, worker_crawl_id=args.worker, headless=args.headless, images=args.images,
+                  record_dir=args.record, replay_dir=args.replay, latency_ms=args.latency,
+                  jitter_ms=args.jitter, recorded_latency=args.recorded_latency)
+    cluster_duplicates(args)
     # await run("rallycars")
     # await run("racecars")
+    return 0
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(asyncio.run(main()))
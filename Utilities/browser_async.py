@@ -23,9 +23,19 @@
 
 #     return pw, browser, context, page
 
-from playwright.async_api import async_playwright
-
-async def get_page(headless=True, user_agent=None):
+from Utilities.replay_async import install_replay, mark_har
+
+async def get_page(headless=True, user_agent=None, record_har=None, replay_har=None,
+                   latency_ms=0.0, jitter_ms=0.0, recorded_latency=False):
+    """Start Chromium and return (pw, browser, context, page).
+
+    Args:
+        record_har: save every response of this run to a HAR file
+            (".har.zip" keeps bodies as separate zip entries); written
+            when the context closes.
+        replay_har: serve the run from a recorded HAR instead of the
+            network; see Utilities.replay_async for the latency options.
+    """
     
     # pw = await async_playwright().start()
     
@@ -52,6 +62,9 @@ async def get_page(headless=True, user_agent=None):
         "Chrome/122.0.0.0 Safari/537.36"
     )
 
+    # Imported here so entry points that never open a browser start faster
+    from playwright.async_api import async_playwright
+
     pw = await async_playwright().start()
 
     browser = await pw.chromium.launch(
@@ -75,8 +88,15 @@ async def get_page(headless=True, user_agent=None):
         extra_http_headers={
             "Accept-Language": "en-US,en;q=0.9",
         },
+        **({"record_har_path": record_har} if record_har else {}),
     )
 
+    if record_har:
+        mark_har(context)
+    if replay_har:
+        await install_replay(context, replay_har, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                             recorded_latency=recorded_latency)
+
     # 🔥 Patch browser fingerprints
     await context.add_init_script("""
         // Remove webdriver flag
@@ -1,6 +1,34 @@
 import json
+import math
+import select
+from datetime import datetime
 
 import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.extras import execute_values
+
+from Utilities.id_utils import SOURCE_PREFIXES, source_from_id
+
+# Channel consumers LISTEN on to hear about new listing_events rows
+EVENTS_CHANNEL = "listing_events"
+
+# Channel refresh_summaries NOTIFYs once a crawl's changes are committed
+CRAWLS_CHANNEL = "crawl_commits"
+
+# Fields whose changes are recorded in listing_events
+TRACKED_FIELDS = ("title", "price", "status")
+
+# Months (YYYY, MM) whose listing_events partition exists, per process
+_event_partitions = set()
+
+# Price histogram resolution: buckets per unit of ln(1 + price), ~2.5% error
+PRICE_BUCKETS_PER_E = 20
+
+# Re-read rows changed this long before the watermark to catch late commits
+SUMMARY_OVERLAP = "5 minutes"
+
+# Matches ranked per search; a broad query ranks only the first this many it finds
+SEARCH_CANDIDATES = 1000
 
 def get_connection():
     return psycopg2.connect(
@@ -11,14 +39,37 @@ def get_connection():
         port=5432
     )
 
+
+def db_now():
+    """The database's current time, as NOW() stores it in the TIMESTAMP columns.
+
+    Use case: cutoffs compared against those columns (crawl start, revisit
+    due times), so a host clock or time zone that differs from the
+    database's cannot skew them.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT LOCALTIMESTAMP;")
+    now = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return now
+
 # 🧱 CREATE TABLE
 def create_table():
     conn = get_connection()
     cur = conn.cursor()
 
+    # Pre-partitioning installs have a plain products heap; move it aside
+    legacy = _products_kind(cur) == "r"
+    if legacy:
+        _retire_legacy_products(cur)
+
+    # One list partition per source so per-site work only touches its own rows
     cur.execute("""
         CREATE TABLE IF NOT EXISTS products (
-            unique_id TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            unique_id TEXT NOT NULL,
 
             title TEXT,
             price TEXT,
@@ -33,45 +84,329 @@ def create_table():
 
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP,
-            is_synced BOOLEAN DEFAULT FALSE
-        );
+            is_synced BOOLEAN DEFAULT FALSE,
+
+            PRIMARY KEY (source, unique_id)
+        ) PARTITION BY LIST (source);
+    """)
+
+    for source in SOURCE_PREFIXES:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition_name(source)}
+            PARTITION OF products FOR VALUES IN ('{source}');
+        """)
+    cur.execute("CREATE TABLE IF NOT EXISTS products_other PARTITION OF products DEFAULT;")
+
+    cur.execute("""
+        ALTER TABLE products
+        ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'active';
+    """)
+
+    # Last time a list crawl or liveness probe confirmed the listing exists
+    cur.execute("""
+        ALTER TABLE products
+        ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP;
+    """)
+
+    # Numeric price parsed from the display text ("£12,500" -> 12500)
+    cur.execute("""
+        ALTER TABLE products
+        ADD COLUMN IF NOT EXISTS price_value NUMERIC GENERATED ALWAYS AS (
+            substring(replace(price, ',', '') from '[0-9]+(?:\\.[0-9]+)?')::numeric
+        ) STORED;
+    """)
+
+    # Full-text document: title outranks the description
+    cur.execute("""
+        ALTER TABLE products
+        ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(detailed_description, '')), 'B')
+        ) STORED;
+    """)
+
+    create_summary_tables(cur)
+
+    if legacy:
+        _copy_legacy_products(cur)
+
+    # Search and filter indexes
+    cur.execute("CREATE INDEX IF NOT EXISTS products_search_idx ON products USING GIN (search_vector);")
+    cur.execute("CREATE INDEX IF NOT EXISTS products_category_idx ON products USING GIN (category);")
+    cur.execute("CREATE INDEX IF NOT EXISTS products_price_value_idx ON products (price_value);")
+
+    # Watermark scans for refresh_summaries
+    cur.execute("CREATE INDEX IF NOT EXISTS products_created_at_idx ON products (created_at);")
+    cur.execute("CREATE INDEX IF NOT EXISTS products_updated_at_idx ON products (updated_at);")
+
+    # Keyset pagination for get_listings_page: newest first, ties broken by key
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS products_keyset_idx
+        ON products (created_at, source, unique_id);
+    """)
+
+    # Append-only history, one partition per month
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS listing_events (
+            event_id BIGSERIAL,
+            unique_id TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            old_value TEXT,
+            new_value TEXT,
+            occurred_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (event_id, occurred_at)
+        ) PARTITION BY RANGE (occurred_at);
+    """)
+
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS listing_events_unique_id_idx
+        ON listing_events (unique_id, occurred_at);
     """)
 
+    # Writing transaction of each event; the change feed pages in this order (see get_changes_since)
+    cur.execute("""
+        ALTER TABLE listing_events
+        ADD COLUMN IF NOT EXISTS xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS listing_events_xid_idx
+        ON listing_events (xid, event_id);
+    """)
+
+    _event_partitions.clear()
+    ensure_event_partitions(cur)
+
     conn.commit()
     cur.close()
     conn.close()
 
 
-# 🚀 INSERT / UPDATE (SMART UPSERT)
-def upsert_product(data):
+# 🧩 SOURCE PARTITIONS
+def partition_name(source):
+    """Return the products partition holding rows for `source`."""
+    if source not in SOURCE_PREFIXES:
+        raise ValueError(f"Unknown source '{source}'")
+    return f"products_{source}"
+
+
+def _products_kind(cur):
+    # 'p' = partitioned, 'r' = plain table, None = missing
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('products');")
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _retire_legacy_products(cur):
+    """Rename a plain products table so the partitioned one can take its names."""
+    cur.execute("ALTER TABLE products RENAME TO products_legacy;")
+    cur.execute("ALTER TABLE products_legacy RENAME CONSTRAINT products_pkey TO products_legacy_pkey;")
+    cur.execute("""
+        DROP INDEX IF EXISTS products_search_idx, products_category_idx,
+            products_price_value_idx, products_created_at_idx, products_updated_at_idx;
+    """)
+    # Installs older than listing_events never had a status column
+    cur.execute("ALTER TABLE products_legacy ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'active';")
+
+
+def _copy_legacy_products(cur):
+    """Move rows from products_legacy into the partitioned table and drop it.
+
+    The source is recovered from each row's ID prefix. Summaries were keyed
+    on the prefix before, so they are reset and rebuilt on the next refresh.
+    """
+    source_case = " ".join(
+        f"WHEN unique_id LIKE '{prefix}%' THEN '{source}'"
+        for source, prefix in SOURCE_PREFIXES.items()
+    )
+    cur.execute(f"""
+        INSERT INTO products (
+            source, unique_id, title, price, date, image_urls,
+            link_url, detailed_description, location, contact_info,
+            category, created_at, updated_at, is_synced, status
+        )
+        SELECT
+            CASE {source_case} ELSE 'other' END,
+            unique_id, title, price, date, image_urls,
+            link_url, detailed_description, location, contact_info,
+            category, created_at, updated_at, is_synced, status
+        FROM products_legacy;
+    """)
+    cur.execute("DROP TABLE products_legacy;")
+    cur.execute("""
+        TRUNCATE summary_contrib, summary_category, summary_price_buckets,
+            summary_daily, summary_watermarks;
+    """)
+
+
+# 🧹 PER-SITE MAINTENANCE
+def vacuum_source(source):
+    """VACUUM ANALYZE only the partition holding `source`'s listings."""
+    conn = get_connection()
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    cur = conn.cursor()
+    cur.execute(f"VACUUM (ANALYZE) {partition_name(source)};")
+    cur.close()
+    conn.close()
+
+
+def purge_removed_listings(source, older_than_days=90):
+    """Delete `source` listings marked removed more than `older_than_days` ago.
+
+    Returns:
+        int: number of deleted rows.
+    """
+    partition_name(source)  # validate before touching the table
+
     conn = get_connection()
     cur = conn.cursor()
 
     cur.execute("""
+        DELETE FROM products
+        WHERE source = %s
+          AND status = 'removed'
+          AND COALESCE(updated_at, created_at) < NOW() - make_interval(days => %s);
+    """, (source, older_than_days))
+    deleted = cur.rowcount
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return deleted
+
+
+# 🗓️ MONTHLY PARTITIONS
+def _month_start(year, month):
+    # Normalise month overflow/underflow (0 -> previous December, 13 -> next January)
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1)
+
+
+def ensure_event_partitions(cur, when=None):
+    """Make sure listing_events has partitions around `when` (default: now).
+
+    Use case: called before writing events. Creates the previous, current
+    and next month partitions once per process so month boundaries and
+    client/server clock skew never hit a missing partition.
+    """
+    when = when or datetime.now()
+    key = (when.year, when.month)
+    if key in _event_partitions:
+        return
+
+    for offset in (-1, 0, 1):
+        start = _month_start(when.year, when.month + offset)
+        end = _month_start(start.year, start.month + 1)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS listing_events_{start:%Y_%m}
+            PARTITION OF listing_events
+            FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}');
+        """)
+
+    _event_partitions.add(key)
+
+
+def _diff_events(unique_id, old, new):
+    """Build (unique_id, event_type, old_value, new_value) rows for a write.
+
+    `old` is the row before the upsert (None for a new listing) and `new`
+    the row returned by it (None when the upsert changed nothing).
+    """
+    if new is None:
+        return []
+
+    if old is None:
+        return [(unique_id, "created", None, new[TRACKED_FIELDS.index("price")])]
+
+    return [
+        (unique_id, field, old_value, new_value)
+        for field, old_value, new_value in zip(TRACKED_FIELDS, old, new)
+        if old_value != new_value
+    ]
+
+
+def record_events(cur, events):
+    """Append events to listing_events and NOTIFY listeners.
+
+    Must run on the caller's cursor so history commits (or rolls back)
+    together with the change that produced it.
+    """
+    if not events:
+        return
+
+    ensure_event_partitions(cur)
+
+    rows = execute_values(cur, """
+        INSERT INTO listing_events (unique_id, event_type, old_value, new_value)
+        VALUES %s
+        RETURNING event_id, unique_id, event_type;
+    """, events, fetch=True)
+
+    # Keep the payload compact: consumers fetch details via get_changes_since
+    changed = {}
+    for _, unique_id, event_type in rows:
+        changed.setdefault(unique_id, []).append(event_type)
+
+    payload = json.dumps({"changes": changed})
+    cur.execute("SELECT pg_notify(%s, %s);", (EVENTS_CHANNEL, payload))
+
+
+# 🚀 INSERT / UPDATE (SMART UPSERT)
+def upsert_product(data, reparsed=False):
+    """Insert or update a listing, recording title/price/status changes.
+
+    `reparsed` is for items rebuilt from archived pages: the listing keeps
+    its status, and detail fields the archive had no page for (missing or
+    None) keep their stored values.
+    """
+    # Older records carry only the prefixed ID; derive the source from it
+    source = data.get("source") or source_from_id(data["id"]) or "other"
+
+    detail_keys = ("detailedDescription", "location", "contactInfo")
+    details = [data.get(key) for key in detail_keys] if reparsed else [data[key] for key in detail_keys]
+    if reparsed:
+        # Old pages say nothing about whether the listing is still up
+        status, detail = "products.status", lambda column: f"COALESCE(EXCLUDED.{column}, products.{column})"
+    else:
+        status, detail = "'active'", lambda column: f"EXCLUDED.{column}"
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    # Lock the current row so the recorded "old" values match what we overwrite
+    cur.execute(
+        f"SELECT {', '.join(TRACKED_FIELDS)} FROM products "
+        "WHERE source = %s AND unique_id = %s FOR UPDATE;",
+        (source, data["id"]),
+    )
+    old = cur.fetchone()
+
+    cur.execute(f"""
     INSERT INTO products (
-        unique_id, title, price, date, image_urls,
+        source, unique_id, title, price, date, image_urls,
         link_url, detailed_description, location, contact_info,
-        category, created_at, is_synced
+        category, created_at, is_synced, status
     )
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), FALSE)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), FALSE, 'active')
 
-    ON CONFLICT (unique_id) DO UPDATE
+    ON CONFLICT (source, unique_id) DO UPDATE
     SET
         title = EXCLUDED.title,
         price = EXCLUDED.price,
         date = EXCLUDED.date,
         image_urls = EXCLUDED.image_urls,
         link_url = EXCLUDED.link_url,
-        detailed_description = EXCLUDED.detailed_description,
-        location = EXCLUDED.location,
-        contact_info = EXCLUDED.contact_info,
+        detailed_description = {detail('detailed_description')},
+        location = {detail('location')},
+        contact_info = {detail('contact_info')},
         category = (
                 SELECT ARRAY(
                     SELECT DISTINCT UNNEST(products.category || EXCLUDED.category)
                 )
             ),
         updated_at = NOW(),
-        is_synced = FALSE
+        is_synced = FALSE,
+        status = {status}
 
     WHERE
         products.title IS DISTINCT FROM EXCLUDED.title OR
@@ -79,36 +414,556 @@ def upsert_product(data):
         products.date IS DISTINCT FROM EXCLUDED.date OR
         products.image_urls IS DISTINCT FROM EXCLUDED.image_urls OR
         products.link_url IS DISTINCT FROM EXCLUDED.link_url OR
-        products.detailed_description IS DISTINCT FROM EXCLUDED.detailed_description OR
-        products.location IS DISTINCT FROM EXCLUDED.location OR
-        products.contact_info IS DISTINCT FROM EXCLUDED.contact_info OR
-        products.category IS DISTINCT FROM EXCLUDED.category;
+        products.detailed_description IS DISTINCT FROM {detail('detailed_description')} OR
+        products.location IS DISTINCT FROM {detail('location')} OR
+        products.contact_info IS DISTINCT FROM {detail('contact_info')} OR
+        products.category IS DISTINCT FROM EXCLUDED.category OR
+        products.status IS DISTINCT FROM {status}
+
+    RETURNING title, price, status;
 """, (
+    source,
     data["id"],
     data["title"],
     data["price"],
     data["date"],
     data["imageURLs"],
     data["linkURL"],
-    data["detailedDescription"],
-    data["location"],
-    data["contactInfo"],
+    *details,
     data["category"]
 ))
 
+    # RETURNING yields nothing when the WHERE clause skipped an unchanged row
+    new = cur.fetchone()
+    record_events(cur, _diff_events(data["id"], old, new))
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+def merge_categories(cur, source, unique_id, categories):
+    """Union `categories` into a stored listing's categories.
+
+    Runs on the caller's cursor, so it commits with the change that
+    found the extra categories. A listing not stored yet is left alone.
+
+    Returns:
+        bool: True when the stored categories grew.
+    """
+    cur.execute("""
+        UPDATE products
+        SET category = ARRAY(
+                SELECT DISTINCT UNNEST(COALESCE(category, '{}') || %(categories)s::text[])
+            ),
+            updated_at = NOW(),
+            is_synced = FALSE
+        WHERE source = %(source)s AND unique_id = %(unique_id)s
+          AND NOT (COALESCE(category, '{}') @> %(categories)s::text[]);
+    """, {"source": source, "unique_id": unique_id, "categories": list(categories)})
+    return cur.rowcount == 1
+
+# 👀 LIVENESS
+def mark_seen(source, unique_ids):
+    """Stamp last_seen_at for listings found by the current list crawl.
+
+    Use case: called after a crawl stores its items, so the liveness sweep
+    can tell which stored listings the crawl did not see.
+    """
+    if not unique_ids:
+        return
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        UPDATE products
+        SET last_seen_at = NOW()
+        WHERE source = %s AND unique_id = ANY(%s);
+    """, (source, list(unique_ids)))
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def get_unseen_listings(source, seen_before):
+    """Return active `source` listings not seen since `seen_before`.
+
+    Returns:
+        list[dict]: rows with unique_id, link_url and last_seen_at.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT unique_id, link_url, last_seen_at
+        FROM products
+        WHERE source = %s
+          AND status IS DISTINCT FROM 'removed'
+          AND link_url IS NOT NULL
+          AND (last_seen_at IS NULL OR last_seen_at < %s);
+    """, (source, seen_before))
+
+    columns = [desc[0] for desc in cur.description]
+    rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    cur.close()
+    conn.close()
+    return rows
+
+
+def mark_listings_removed(source, unique_ids):
+    """Flag listings as removed in one statement and record status events.
+
+    Returns:
+        int: number of listings whose status changed.
+    """
+    if not unique_ids:
+        return 0
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        UPDATE products
+        SET status = 'removed', updated_at = NOW(), is_synced = FALSE
+        WHERE source = %s
+          AND unique_id = ANY(%s)
+          AND status IS DISTINCT FROM 'removed'
+        RETURNING unique_id;
+    """, (source, list(unique_ids)))
+    removed = [row[0] for row in cur.fetchall()]
+
+    record_events(cur, [(uid, "status", "active", "removed") for uid in removed])
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return len(removed)
+
+
+# 🖼️ IMAGES
+def get_image_urls(source, since=None):
+    """Return the distinct image URLs of active `source` listings.
+
+    Use case: the image pipeline after a crawl; with `since` (a
+    database timestamp, see db_now), only listings created or changed
+    from then on are read.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT DISTINCT UNNEST(image_urls)
+        FROM products
+        WHERE source = %(source)s
+          AND status IS DISTINCT FROM 'removed'
+          AND (%(since)s::timestamp IS NULL
+               OR created_at >= %(since)s OR updated_at >= %(since)s);
+    """, {"source": source, "since": since})
+    urls = [row[0] for row in cur.fetchall() if row[0]]
+
+    cur.close()
+    conn.close()
+    return urls
+
+
+# 📊 DASHBOARD SUMMARIES
+def create_summary_tables(cur):
+    """Create the maintained summary tables used by the dashboards.
+
+    `summary_contrib` remembers what each listing currently contributes
+    so a refresh can subtract the old contribution and add the new one.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS summary_watermarks (
+            name TEXT PRIMARY KEY,
+            value TIMESTAMP NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS summary_contrib (
+            unique_id TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            category TEXT[] NOT NULL,
+            price_bucket INT,
+            status TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS summary_category (
+            source TEXT NOT NULL,
+            category TEXT NOT NULL,
+            listings BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (source, category)
+        );
+
+        CREATE TABLE IF NOT EXISTS summary_price_buckets (
+            source TEXT NOT NULL,
+            category TEXT NOT NULL,
+            bucket INT NOT NULL,
+            listings BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (source, category, bucket)
+        );
+
+        CREATE TABLE IF NOT EXISTS summary_daily (
+            source TEXT NOT NULL,
+            day DATE NOT NULL,
+            new_listings BIGINT NOT NULL DEFAULT 0,
+            removed_listings BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (source, day)
+        );
+    """)
+
+
+def refresh_summaries():
+    """Fold products changed since the last refresh into the summaries.
+
+    Use case: call after each `collect`. Only rows whose created_at or
+    updated_at passed the stored watermark are read, and each one swaps
+    its previous contribution for its current one, so the cost follows
+    the number of rows the run touched. Re-processing a row is a no-op,
+    which lets the scan overlap the watermark to catch late commits.
+
+    Returns:
+        int: number of changed listings folded in.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    # One refresher at a time; a second caller waits and then sees no work
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('refresh_summaries'));")
+
+    cur.execute("SELECT value FROM summary_watermarks WHERE name = 'products';")
+    row = cur.fetchone()
+    watermark = row[0] if row else datetime(1970, 1, 1)
+
+    cur.execute(f"""
+        CREATE TEMP TABLE summary_changed ON COMMIT DROP AS
+        SELECT
+            unique_id,
+            source,
+            CASE WHEN cardinality(category) > 0 THEN category
+                 ELSE ARRAY['uncategorised'] END AS category,
+            CASE WHEN price_value IS NOT NULL
+                 THEN floor(ln(1 + price_value) * {PRICE_BUCKETS_PER_E})::int END AS price_bucket,
+            COALESCE(status, 'active') AS status,
+            created_at,
+            GREATEST(created_at, COALESCE(updated_at, created_at)) AS changed_at
+        FROM products
+        WHERE created_at > %(since)s - INTERVAL %(overlap)s
+           OR updated_at > %(since)s - INTERVAL %(overlap)s;
+    """, {"since": watermark, "overlap": SUMMARY_OVERLAP})
+
+    cur.execute("SELECT count(*), max(changed_at) FROM summary_changed;")
+    changed, newest = cur.fetchone()
+
+    if changed:
+        # Active listings per (source, category): +1 for the new state, -1 for the old
+        cur.execute("""
+            INSERT INTO summary_category (source, category, listings)
+            SELECT source, cat, SUM(delta)
+            FROM (
+                SELECT s.source, UNNEST(s.category) AS cat, 1 AS delta
+                FROM summary_changed s WHERE s.status = 'active'
+                UNION ALL
+                SELECT c.source, UNNEST(c.category), -1
+                FROM summary_contrib c JOIN summary_changed s USING (unique_id)
+                WHERE c.status = 'active'
+            ) d
+            GROUP BY source, cat
+            HAVING SUM(delta) <> 0
+            ON CONFLICT (source, category) DO UPDATE
+            SET listings = summary_category.listings + EXCLUDED.listings;
+        """)
+
+        cur.execute("""
+            INSERT INTO summary_price_buckets (source, category, bucket, listings)
+            SELECT source, cat, price_bucket, SUM(delta)
+            FROM (
+                SELECT s.source, UNNEST(s.category) AS cat, s.price_bucket, 1 AS delta
+                FROM summary_changed s
+                WHERE s.status = 'active' AND s.price_bucket IS NOT NULL
+                UNION ALL
+                SELECT c.source, UNNEST(c.category), c.price_bucket, -1
+                FROM summary_contrib c JOIN summary_changed s USING (unique_id)
+                WHERE c.status = 'active' AND c.price_bucket IS NOT NULL
+            ) d
+            GROUP BY source, cat, price_bucket
+            HAVING SUM(delta) <> 0
+            ON CONFLICT (source, category, bucket) DO UPDATE
+            SET listings = summary_price_buckets.listings + EXCLUDED.listings;
+        """)
+
+        # New: first time we see the listing. Removed: status flips to 'removed'.
+        cur.execute("""
+            INSERT INTO summary_daily (source, day, new_listings, removed_listings)
+            SELECT source, day, SUM(new_listings), SUM(removed_listings)
+            FROM (
+                SELECT s.source, s.created_at::date AS day, 1 AS new_listings, 0 AS removed_listings
+                FROM summary_changed s
+                LEFT JOIN summary_contrib c USING (unique_id)
+                WHERE c.unique_id IS NULL
+                UNION ALL
+                SELECT s.source, s.changed_at::date, 0, 1
+                FROM summary_changed s
+                LEFT JOIN summary_contrib c USING (unique_id)
+                WHERE s.status = 'removed' AND c.status IS DISTINCT FROM 'removed'
+            ) d
+            GROUP BY source, day
+            ON CONFLICT (source, day) DO UPDATE
+            SET new_listings = summary_daily.new_listings + EXCLUDED.new_listings,
+                removed_listings = summary_daily.removed_listings + EXCLUDED.removed_listings;
+        """)
+
+        cur.execute("""
+            INSERT INTO summary_contrib (unique_id, source, category, price_bucket, status)
+            SELECT unique_id, source, category, price_bucket, status
+            FROM summary_changed
+            ON CONFLICT (unique_id) DO UPDATE
+            SET source = EXCLUDED.source,
+                category = EXCLUDED.category,
+                price_bucket = EXCLUDED.price_bucket,
+                status = EXCLUDED.status;
+        """)
+
+        cur.execute("""
+            INSERT INTO summary_watermarks (name, value)
+            VALUES ('products', %s)
+            ON CONFLICT (name) DO UPDATE
+            SET value = GREATEST(summary_watermarks.value, EXCLUDED.value);
+        """, (newest,))
+
+        # Delivered on commit, so listeners (the query API's cache) never see it early
+        cur.execute("SELECT pg_notify(%s, %s);",
+                    (CRAWLS_CHANNEL, json.dumps({"changed": changed, "watermark": str(newest)})))
+
     conn.commit()
     cur.close()
     conn.close()
 
+    return changed
+
+
+def get_category_summary(conn, source=None):
+    """Return active listing counts per (source, category).
+
+    Use case: replaces ad-hoc `GROUP BY category` scans over products.
+    """
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT source, category, listings
+        FROM summary_category
+        WHERE listings > 0 AND (%(source)s IS NULL OR source = %(source)s)
+        ORDER BY source, listings DESC;
+    """, {"source": source})
+
+    columns = [desc[0] for desc in cur.description]
+    rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+def get_price_percentiles(conn, source=None, category=None, percentiles=(0.25, 0.5, 0.75)):
+    """Return approximate price percentiles from the price histogram.
+
+    Use case: dashboard medians without sorting every price. Values are
+    bucket midpoints, accurate to roughly 1 / PRICE_BUCKETS_PER_E.
+
+    Returns:
+        dict: {percentile: price or None when there are no priced listings}
+    """
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT bucket, SUM(listings)
+        FROM summary_price_buckets
+        WHERE (%(source)s IS NULL OR source = %(source)s)
+          AND (%(category)s IS NULL OR category = %(category)s)
+        GROUP BY bucket
+        HAVING SUM(listings) > 0
+        ORDER BY bucket;
+    """, {"source": source, "category": category})
+
+    buckets = cur.fetchall()
+    cur.close()
+
+    total = sum(count for _, count in buckets)
+    result = {}
+    for p in percentiles:
+        if not total:
+            result[p] = None
+            continue
+
+        target = p * total
+        running = 0
+        for bucket, count in buckets:
+            running += count
+            if running >= target:
+                result[p] = round(math.exp((bucket + 0.5) / PRICE_BUCKETS_PER_E) - 1, 2)
+                break
+
+    return result
+
+
+def get_daily_activity(conn, days=7, source=None):
+    """Return new and removed listing counts per day for the last `days`.
+
+    Use case: the "new this week" panel; sum `new_listings` over the rows.
+    """
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT source, day, new_listings, removed_listings
+        FROM summary_daily
+        WHERE day > CURRENT_DATE - %(days)s
+          AND (%(source)s IS NULL OR source = %(source)s)
+        ORDER BY day DESC, source;
+    """, {"days": days, "source": source})
+
+    columns = [desc[0] for desc in cur.description]
+    rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+# 🔎 FULL-TEXT SEARCH
+def search_products(conn, query, category=None, min_price=None, max_price=None,
+                    limit=20, include_removed=False, source=None):
+    """Return listings matching `query`, best matches first.
+
+    Use case: "Evo IX with spare gearbox" style searches without ILIKE
+    scans. `query` uses web-search syntax (quotes, OR, -exclude); title
+    hits rank above description hits. Filters narrow on category and the
+    parsed numeric price; `source` limits the search to one partition.
+
+    Only the first `SEARCH_CANDIDATES` matches are ranked, so a query that
+    matches most of the table ("turbo OR intercooler") costs the same as
+    a narrow one; add words or filters to rank a broad query's full set.
+    """
+    conditions = ["search_vector @@ q"]
+    params = {"query": query, "limit": limit, "candidates": SEARCH_CANDIDATES}
+
+    if source:
+        conditions.append("source = %(source)s")
+        params["source"] = source
+    if category:
+        conditions.append("category @> ARRAY[%(category)s]::text[]")
+        params["category"] = category
+    if min_price is not None:
+        conditions.append("price_value >= %(min_price)s")
+        params["min_price"] = min_price
+    if max_price is not None:
+        conditions.append("price_value <= %(max_price)s")
+        params["max_price"] = max_price
+    if not include_removed:
+        conditions.append("status IS DISTINCT FROM 'removed'")
+
+    cur = conn.cursor()
+
+    # ts_rank_cd reads each match's whole tsvector; bound it to a candidate set
+    cur.execute(f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT source, unique_id, title, price, price_value, link_url, category, location,
+                   search_vector
+            FROM products, websearch_to_tsquery('english', %(query)s) AS q
+            WHERE {" AND ".join(conditions)}
+            LIMIT %(candidates)s
+        )
+        SELECT source, unique_id, title, price, price_value, link_url, category, location,
+               ts_rank_cd(search_vector, q) AS rank
+        FROM candidates, websearch_to_tsquery('english', %(query)s) AS q
+        ORDER BY rank DESC, unique_id
+        LIMIT %(limit)s;
+    """, params)
+
+    columns = [desc[0] for desc in cur.description]
+    rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+# 📄 LISTING PAGES (KEYSET)
+LISTING_PAGE_COLUMNS = ("source", "unique_id", "title", "price", "price_value", "date", "image_urls",
+                        "link_url", "location", "category", "status", "created_at", "updated_at")
+
+
+def get_listings_page(conn, source=None, category=None, min_price=None, max_price=None,
+                      since=None, until=None, after=None, limit=50, include_removed=False):
+    """Return one page of listings, newest first, starting after the key `after`.
+
+    Use case: paging through products for the query API or an export.
+    `after` is the (created_at, source, unique_id) key of the previous
+    page's last row; the page seeks past it on `products_keyset_idx`, so
+    page 1000 costs the same as page 1, unlike OFFSET. `since` and
+    `until` bound created_at (when the listing was first stored); price
+    filters use the parsed numeric price.
+
+    Returns:
+        dict: rows and `next`, the key to pass as `after` for the next
+        page (None on the last page).
+    """
+    conditions = ["created_at IS NOT NULL"]
+    params = {"limit": limit + 1}
+
+    if source:
+        conditions.append("source = %(source)s")
+        params["source"] = source
+    if category:
+        conditions.append("category @> ARRAY[%(category)s]::text[]")
+        params["category"] = category
+    if min_price is not None:
+        conditions.append("price_value >= %(min_price)s")
+        params["min_price"] = min_price
+    if max_price is not None:
+        conditions.append("price_value <= %(max_price)s")
+        params["max_price"] = max_price
+    if since is not None:
+        conditions.append("created_at >= %(since)s")
+        params["since"] = since
+    if until is not None:
+        conditions.append("created_at < %(until)s")
+        params["until"] = until
+    if after is not None:
+        # Row comparison, so the index scan starts right after the previous page
+        conditions.append("(created_at, source, unique_id) < (%(after_at)s, %(after_source)s, %(after_id)s)")
+        params["after_at"], params["after_source"], params["after_id"] = after
+    if not include_removed:
+        conditions.append("status IS DISTINCT FROM 'removed'")
+
+    cur = conn.cursor()
+
+    # One row past the page tells whether another page follows
+    cur.execute(f"""
+        SELECT {", ".join(LISTING_PAGE_COLUMNS)}
+        FROM products
+        WHERE {" AND ".join(conditions)}
+        ORDER BY created_at DESC, source DESC, unique_id DESC
+        LIMIT %(limit)s;
+    """, params)
+
+    rows = [dict(zip(LISTING_PAGE_COLUMNS, row)) for row in cur.fetchall()]
+    cur.close()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    last = rows[-1] if rows else None
+    return {
+        "rows": rows,
+        "next": (last["created_at"], last["source"], last["unique_id"]) if more else None,
+    }
+
+
 # 🔍 FETCH UNSYNCED ROWS
-def get_unsynced_rows(conn):
+def get_unsynced_rows(conn, source=None):
     cur = conn.cursor()
 
+    # Filtering on source prunes the scan to that site's partition
     cur.execute("""
         SELECT *
         FROM products
-        WHERE is_synced = FALSE;
-    """)
+        WHERE is_synced = FALSE
+          AND (%(source)s IS NULL OR source = %(source)s);
+    """, {"source": source})
 
     columns = [desc[0] for desc in cur.description]
     rows = cur.fetchall()
@@ -116,6 +971,84 @@ def get_unsynced_rows(conn):
     return [dict(zip(columns, row)) for row in rows]
 
 
+# 📜 CHANGE FEED (DELTA EXPORT)
+def get_changes_since(conn, cursor=None, limit=1000):
+    """Return listing events recorded after `cursor`.
+
+    Use case: incremental consumers store the returned `cursor` (an opaque
+    string) and pass it back on the next call instead of re-reading whole
+    product rows.
+
+    Events are paged by writing transaction, then event_id, and only
+    events of transactions older than every transaction still running
+    are returned. With concurrent writers a lower event_id can commit
+    after a higher one; paging by event_id alone would step past it for
+    good. A transaction that commits later always sorts after the
+    cursor. Integer cursors from before this scheme resume after that
+    event_id.
+    """
+    cur = conn.cursor()
+
+    if isinstance(cursor, str) and ":" in cursor:
+        xid, event_id = cursor.split(":", 1)
+        where = "(xid, event_id) > (%s::xid8, %s)"
+        args = (xid, int(event_id))
+    else:
+        where = "event_id > %s"
+        args = (int(cursor or 0),)
+
+    cur.execute(f"""
+        SELECT xid::text, event_id, unique_id, event_type, old_value, new_value, occurred_at
+        FROM listing_events
+        WHERE {where}
+          AND xid < pg_snapshot_xmin(pg_current_snapshot())
+        ORDER BY xid, event_id
+        LIMIT %s;
+    """, (*args, limit))
+
+    columns = [desc[0] for desc in cur.description]
+    events = [dict(zip(columns, row)) for row in cur.fetchall()]
+    cur.close()
+
+    if events:
+        cursor = f"{events[-1]['xid']}:{events[-1]['event_id']}"
+    for event in events:
+        del event["xid"]
+    return {
+        "cursor": cursor,
+        "events": events,
+    }
+
+
+# 📡 LISTEN FOR CHANGES
+def listen_listing_events(callback, timeout=5.0, should_stop=None, channel=EVENTS_CHANNEL):
+    """Block and call `callback(payload)` for every listing_events NOTIFY.
+
+    Use case: react to changes as they are committed. The payload carries
+    the changed ids and event types; fetch the events themselves with
+    get_changes_since and the consumer's stored cursor.
+    `should_stop` is polled every `timeout` seconds to end the loop.
+    With `channel=CRAWLS_CHANNEL` it hears once per committed crawl
+    instead, with the number of listings the crawl changed.
+    """
+    conn = get_connection()
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    cur = conn.cursor()
+    cur.execute(f"LISTEN {channel};")
+
+    try:
+        while not (should_stop and should_stop()):
+            if select.select([conn], [], [], timeout) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                callback(json.loads(notify.payload))
+    finally:
+        cur.close()
+        conn.close()
+
+
 # 📦 BUILD JSON PAYLOAD
 def build_payload(rows):
     return json.dumps({
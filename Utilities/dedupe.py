@@ -0,0 +1,384 @@
+"""Utilities.dedupe
+
+Near-duplicate clustering of listings across sources.
+
+The same car is often advertised on several sites, and because
+`generate_id` hashes the site URL each copy is its own `products` row.
+Each listing gets a MinHash signature over word shingles of its
+normalised title and description, plus the filenames of its images
+(sellers re-upload the same photos). The signature is split into bands
+and each band hashed to a bucket key; listings sharing a bucket in any
+band are candidates, and candidates whose signatures agree on at least
+`MATCH_THRESHOLD` of their positions (an estimate of the Jaccard
+similarity) are linked. Linked listings share `products.cluster_id`;
+a listing with no match keeps NULL.
+
+Signatures and bucket keys live in `listing_signatures`, with a GIN
+index on the keys, so a lookup touches only listings that share a
+bucket instead of comparing every pair. Buckets with more than
+`MAX_BUCKET_SIZE` members are left out in SQL, before any of their
+signatures are read. `update_clusters` walks the
+listings that are new or changed since their signature was computed in
+batches of `BATCH_SIZE`; memory follows the batch, not the table.
+
+Use case:
+    create_dedupe_tables()
+    update_clusters()          # after each crawl; only new/changed rows are read
+"""
+
+import functools
+import hashlib
+import re
+import time
+import zlib
+
+from psycopg2.extras import execute_values
+
+from Utilities import db_utils
+
+# 30 bands of 4 rows: a pair with 0.6 similarity becomes a candidate
+# 98% of the time, one with 0.2 only 5% of the time
+NUM_BANDS = 30
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+
+# Estimated Jaccard similarity a candidate pair needs to be linked
+MATCH_THRESHOLD = 0.5
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Listings with fewer shingles than this ("POA", an empty description)
+# would match each other on nothing; they get no bucket keys
+MIN_SHINGLES = 3
+
+# Buckets shared by more listings than this are boilerplate, not duplicates
+MAX_BUCKET_SIZE = 200
+
+# Listings signed per transaction
+BATCH_SIZE = 5000
+
+# Hash family h(x) = (a * x + b) mod PRIME over 32-bit shingle hashes.
+# The coefficients are derived from a fixed string so stored signatures
+# stay comparable across processes and versions.
+PRIME = 4294967311
+
+_WORD = re.compile(r"[a-z0-9]+")
+# WordPress resizes: "evo-ix-1024x768.jpg" is the same photo as "evo-ix.jpg"
+_IMAGE_SIZE_SUFFIX = re.compile(r"-\d+x\d+(?=\.\w+$)")
+
+
+# ---------------- SIGNATURES ---------------- #
+
+@functools.cache
+def _hash_family():
+    """The (a, b) coefficient columns; numpy loads on the first signature, not at import."""
+    import numpy as np
+
+    coefficients = np.frombuffer(hashlib.shake_128(b"listing-minhash").digest(8 * NUM_PERM),
+                                 dtype="<u4").astype(np.uint64).reshape(2, NUM_PERM)
+    return (coefficients[0] % (PRIME - 1) + 1)[:, None], (coefficients[1] % PRIME)[:, None]
+
+
+def shingles(title, description, image_urls=()):
+    """Return the set of word shingles and image-filename tokens of a listing."""
+    words = _WORD.findall(f"{title or ''} {description or ''}".lower())
+    tokens = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    if 0 < len(words) < SHINGLE_SIZE:
+        tokens.add(" ".join(words))
+
+    for url in image_urls or ():
+        name = _IMAGE_SIZE_SUFFIX.sub("", url.split("?", 1)[0].rsplit("/", 1)[-1].lower())
+        if name:
+            tokens.add(f"img:{name}")
+    return tokens
+
+
+def signature(tokens):
+    """MinHash signature (NUM_PERM uint32 values) of a shingle set, or None when it is empty."""
+    if not tokens:
+        return None
+    import numpy as np
+
+    a, b = _hash_family()
+    hashes = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens))
+    # a, x < 2**32 and b < PRIME, so a * x + b fits in uint64
+    return ((a * hashes + b) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def _from_bytes(data):
+    """A signature stored as BYTEA back as a uint32 array."""
+    import numpy as np
+
+    return np.frombuffer(data, dtype=np.uint32)
+
+
+def band_keys(sig):
+    """One signed 64-bit bucket key per band; the band number is part of the key."""
+    rows = sig.reshape(NUM_BANDS, ROWS_PER_BAND)
+    return [int.from_bytes(hashlib.blake2b(bytes([band]) + rows[band].tobytes(), digest_size=8).digest(),
+                           "big", signed=True)
+            for band in range(NUM_BANDS)]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: the share of signature positions that agree."""
+    import numpy as np
+
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def sign_listing(title, description, image_urls=()):
+    """Return (signature, band keys) for a listing; keys are empty for near-empty listings."""
+    tokens = shingles(title, description, image_urls)
+    sig = signature(tokens)
+    if sig is None or len(tokens) < MIN_SHINGLES:
+        return sig, []
+    return sig, band_keys(sig)
+
+
+# ---------------- CLUSTERS ---------------- #
+
+def link_components(pairs):
+    """Group linked nodes (listing IDs, cluster IDs) with union-find; returns a list of sets."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    groups = {}
+    for x in parent:
+        groups.setdefault(find(x), set()).add(x)
+    return list(groups.values())
+
+
+def candidate_pairs(batch_keys, members_by_key):
+    """Pairs (batch listing, other listing) that share a bucket that is not oversized.
+
+    Args:
+        batch_keys: unique_id -> band keys, for the listings being signed.
+        members_by_key: band key -> unique_ids holding it (batch included).
+    """
+    pairs = set()
+    for uid, keys in batch_keys.items():
+        for key in keys:
+            members = members_by_key.get(key, ())
+            if len(members) > MAX_BUCKET_SIZE:
+                continue
+            for other in members:
+                if other != uid:
+                    pairs.add((uid, other) if uid < other else (other, uid))
+    return pairs
+
+
+# 🧱 CREATE TABLES
+def create_dedupe_tables():
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS listing_signatures (
+            unique_id TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            signature BYTEA,
+            bands BIGINT[] NOT NULL DEFAULT '{}',
+            computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS listing_signatures_bands_idx ON listing_signatures USING GIN (bands);")
+
+    cur.execute("CREATE SEQUENCE IF NOT EXISTS listing_cluster_seq;")
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS cluster_id BIGINT;")
+    cur.execute("CREATE INDEX IF NOT EXISTS products_cluster_id_idx ON products (cluster_id);")
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def _pending_batch(cur, after, limit):
+    """Next listings (in key order after `after`) that are unsigned or changed since signing."""
+    cur.execute("""
+        SELECT p.source, p.unique_id, p.title, p.detailed_description, p.image_urls, p.cluster_id
+        FROM products p
+        LEFT JOIN listing_signatures s ON s.unique_id = p.unique_id
+        WHERE (p.source, p.unique_id) > (%s, %s)
+          AND (s.unique_id IS NULL
+               OR GREATEST(p.created_at, COALESCE(p.updated_at, p.created_at)) > s.computed_at)
+        ORDER BY p.source, p.unique_id
+        LIMIT %s;
+    """, (*after, limit))
+    return cur.fetchall()
+
+
+def _cluster_batch(cur, rows, report):
+    """Sign one batch, find its matches and write the cluster IDs it changes."""
+    sources, signatures, batch_keys, cluster_of = {}, {}, {}, {}
+    values = []
+    for source, uid, title, description, image_urls, cluster_id in rows:
+        sig, keys = sign_listing(title, description, image_urls)
+        sources[uid] = source
+        cluster_of[uid] = cluster_id
+        if sig is not None:
+            signatures[uid] = sig
+        batch_keys[uid] = keys
+        values.append((uid, source, sig.tobytes() if sig is not None else None, keys))
+
+    execute_values(cur, """
+        INSERT INTO listing_signatures (unique_id, source, signature, bands)
+        VALUES %s
+        ON CONFLICT (unique_id) DO UPDATE
+        SET source = EXCLUDED.source,
+            signature = EXCLUDED.signature,
+            bands = EXCLUDED.bands,
+            computed_at = CURRENT_TIMESTAMP;
+    """, values, template="(%s, %s, %s, %s::bigint[])")
+
+    # Members of each bucket the batch touches, the batch included. One past
+    # MAX_BUCKET_SIZE is enough to tell a boilerplate bucket, so no bucket
+    # brings more than that many IDs back, and none of their signatures
+    all_keys = sorted({key for keys in batch_keys.values() for key in keys})
+    members_by_key = {}
+    if all_keys:
+        cur.execute("""
+            SELECT k.key, array_agg(m.unique_id)
+            FROM unnest(%s::bigint[]) AS k(key)
+            CROSS JOIN LATERAL (
+                SELECT unique_id FROM listing_signatures
+                WHERE bands @> ARRAY[k.key]
+                LIMIT %s
+            ) AS m
+            GROUP BY k.key;
+        """, (all_keys, MAX_BUCKET_SIZE + 1))
+        members_by_key = {key: members for key, members in cur.fetchall() if len(members) <= MAX_BUCKET_SIZE}
+
+    # Signatures and clusters of the listings those buckets hold
+    wanted = sorted({uid for members in members_by_key.values() for uid in members} - signatures.keys())
+    stored = set(batch_keys)
+    if wanted:
+        cur.execute("""
+            SELECT s.unique_id, s.source, s.signature, p.cluster_id
+            FROM listing_signatures s
+            JOIN products p ON p.source = s.source AND p.unique_id = s.unique_id
+            WHERE s.unique_id = ANY(%s);
+        """, (wanted,))
+        for uid, source, sig, cluster_id in cur.fetchall():
+            sources[uid] = source
+            cluster_of.setdefault(uid, cluster_id)
+            signatures[uid] = _from_bytes(bytes(sig))
+            stored.add(uid)
+    # Signatures left behind by deleted products
+    members_by_key = {key: [uid for uid in members if uid in stored] for key, members in members_by_key.items()}
+
+    pairs = candidate_pairs(batch_keys, members_by_key)
+    matched = [(a, b) for a, b in pairs if similarity(signatures[a], signatures[b]) >= MATCH_THRESHOLD]
+    report["candidates"] += len(pairs)
+    report["matches"] += len(matched)
+    in_batch = set(batch_keys)
+
+    # Listings outside the batch bring their cluster along as a node, so two
+    # components touching the same cluster become one. A component keeps the
+    # lowest cluster ID it touches; the others are folded into it.
+    linked = {uid for pair in matched for uid in pair}
+    held = [(uid, cluster_of[uid]) for uid in linked - in_batch if cluster_of.get(uid) is not None]
+    claimed = {cluster_id for _, cluster_id in held}
+    updates, merged = {}, {}
+    for component in link_components(matched + held):
+        outside = {node for node in component if isinstance(node, int)}
+        listings = component - outside
+        # With no outside cluster, reuse a batch listing's previous ID so re-signing keeps it stable
+        own = {cluster_of[u] for u in listings if cluster_of.get(u) is not None} - claimed
+        if outside or own:
+            keep = min(outside or own)
+        else:
+            cur.execute("SELECT nextval('listing_cluster_seq');")
+            keep = cur.fetchone()[0]
+            report["clusters_created"] += 1
+        for old in outside - {keep}:
+            merged[old] = keep
+        for uid in listings:
+            if cluster_of.get(uid) != keep:
+                updates[uid] = keep
+
+    # Batch listings that no longer match anything leave their cluster
+    for uid in in_batch - linked:
+        if cluster_of.get(uid) is not None:
+            updates[uid] = None
+
+    if merged:
+        execute_values(cur, """
+            UPDATE products p SET cluster_id = v.new_id
+            FROM (VALUES %s) AS v(old_id, new_id)
+            WHERE p.cluster_id = v.old_id;
+        """, list(merged.items()))
+        report["clusters_merged"] += len(merged)
+
+    if updates:
+        execute_values(cur, """
+            UPDATE products p SET cluster_id = v.cluster_id
+            FROM (VALUES %s) AS v(source, unique_id, cluster_id)
+            WHERE p.source = v.source AND p.unique_id = v.unique_id;
+        """, [(sources[uid], uid, cluster_id) for uid, cluster_id in updates.items()],
+            template="(%s, %s, %s::bigint)")
+        report["assigned"] += len(updates)
+
+
+def update_clusters(batch_size=BATCH_SIZE):
+    """Sign new and changed listings and fold them into the duplicate clusters.
+
+    Use case: call after each `collect` (Run.py does). Each batch is its
+    own transaction, so an interrupted run keeps the batches it finished
+    and the next call carries on from the remaining listings.
+
+    Returns:
+        dict: listings signed, candidate pairs checked, pairs matched,
+        clusters created and merged, cluster IDs written, and seconds.
+    """
+    started = time.perf_counter()
+    report = {"signed": 0, "candidates": 0, "matches": 0, "clusters_created": 0,
+              "clusters_merged": 0, "assigned": 0}
+
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+    after = ("", "")
+    try:
+        while True:
+            # One clusterer at a time; a second caller waits, then finds less to do
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('update_clusters'));")
+            rows = _pending_batch(cur, after, batch_size)
+            if not rows:
+                conn.commit()
+                break
+            _cluster_batch(cur, rows, report)
+            conn.commit()
+            report["signed"] += len(rows)
+            after = (rows[-1][0], rows[-1][1])
+    finally:
+        cur.close()
+        conn.close()
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def get_cluster(conn, unique_id):
+    """Return the listings clustered with `unique_id` (itself included), newest first."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT p.source, p.unique_id, p.title, p.price, p.link_url
+        FROM products p
+        WHERE p.cluster_id = (SELECT cluster_id FROM products WHERE unique_id = %s)
+        ORDER BY p.created_at DESC;
+    """, (unique_id,))
+    rows = cur.fetchall()
+    cur.close()
+    return rows
@@ -1,5 +1,15 @@
 import hashlib
 
+# Listing source -> ID prefix. Source names match the SITES keys in Run.py
+# and name the products partition each source's rows live in.
+SOURCE_PREFIXES = {
+    "motorsport": "MSA_",
+    "rallycars": "RCS_",
+    "racecars": "RCY_",
+    "classiccars": "CCS_",
+    "racecarsdirect": "RCD_",
+}
+
 def generate_id(prefix: str, url: str) -> str:
     """Generate a unique ID by hashing the URL and prefixing it.
 
@@ -11,4 +21,19 @@ def generate_id(prefix: str, url: str) -> str:
         str: The generated ID.
     """
     hash_obj = hashlib.sha256(url.encode())
-    return prefix + hash_obj.hexdigest()
\ No newline at end of file
+    return prefix + hash_obj.hexdigest()
+
+def generate_listing_id(source: str, url: str) -> str:
+    """Generate a listing ID using the registered prefix for `source`.
+
+    Use case: every scraper builds IDs through this so the prefix and the
+    `source` column it stores always agree.
+    """
+    return generate_id(SOURCE_PREFIXES[source], url)
+
+def source_from_id(unique_id: str) -> str | None:
+    """Return the source whose prefix starts `unique_id`, or None."""
+    for source, prefix in SOURCE_PREFIXES.items():
+        if unique_id.startswith(prefix):
+            return source
+    return None
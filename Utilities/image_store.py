@@ -0,0 +1,235 @@
+"""Utilities.image_store
+
+Content-addressed on-disk store for listing images.
+
+Originals are stored once per SHA-256 of their bytes, so the same photo
+served under several URLs (the list card and the `wpadverts` gallery, a
+re-post on another site) takes one file. Each original gets a JPEG
+thumbnail per size in `THUMBNAIL_SIZES`. Files are sharded two levels
+deep by hash so no directory grows past a few thousand entries:
+
+    images/originals/ab/cd/abcd....jpg
+    images/thumbs/320/ab/cd/abcd....jpg
+
+`index.sqlite` maps every fetched URL to its hash, or to a permanent
+failure (gone, not an image), so later runs skip it. A failure is
+retried once it is older than `FAILURE_RETRY_DAYS`.
+
+Use case:
+    store = ImageStore()
+    todo = [url for url in urls if url not in store.fetched(urls)]
+    blob = store.save_blob(data, "image/jpeg")   # thread-safe; no index writes
+    store.record(url, blob)
+    store.thumbnail_path(blob["sha256"], 320)
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+IMAGE_DIR = "images"
+
+# Longest edge in pixels of each thumbnail kept next to an original
+THUMBNAIL_SIZES = (960, 320)
+THUMBNAIL_QUALITY = 80
+
+# URLs per `fetched` query (sqlite's host-parameter limit)
+LOOKUP_CHUNK = 500
+
+# Days a recorded failure keeps its URL from being fetched again
+FAILURE_RETRY_DAYS = 30
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+}
+
+
+def _shard(sha):
+    return os.path.join(sha[:2], sha[2:4])
+
+
+def _extension(content_type, data):
+    ext = EXTENSIONS.get((content_type or "").split(";")[0].strip().lower())
+    if ext:
+        return ext
+    # Some servers send application/octet-stream; go by the magic bytes
+    if data.startswith(b"\xff\xd8"):
+        return ".jpg"
+    if data.startswith(b"\x89PNG"):
+        return ".png"
+    if data.startswith(b"GIF8"):
+        return ".gif"
+    if data[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so readers never see a half-written file
+    tmp = f"{path}.{os.getpid()}.{id(data)}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ImageStore:
+    """Sharded originals and thumbnails plus a sqlite URL index under `directory`."""
+
+    def __init__(self, directory=IMAGE_DIR, thumbnail_sizes=THUMBNAIL_SIZES):
+        self.directory = directory
+        self.thumbnail_sizes = tuple(sorted(thumbnail_sizes, reverse=True))
+
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit; several crawler processes may write the index at once
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"),
+                                   timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT,
+                status INTEGER,
+                error TEXT,
+                fetched_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS urls_sha_idx ON urls (sha256);
+
+            CREATE TABLE IF NOT EXISTS images (
+                sha256 TEXT PRIMARY KEY,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                stored_at TEXT NOT NULL
+            );
+        """)
+
+    # ---------------- PATHS ---------------- #
+
+    def original_path(self, sha, extension):
+        return os.path.join(self.directory, "originals", _shard(sha), f"{sha}{extension}")
+
+    def thumbnail_path(self, sha, size):
+        return os.path.join(self.directory, "thumbs", str(size), _shard(sha), f"{sha}.jpg")
+
+    # ---------------- BLOBS ---------------- #
+
+    def save_blob(self, data, content_type=None):
+        """Store an image's bytes and thumbnails unless its hash is already on disk.
+
+        Touches only the filesystem, so it can run in worker threads
+        (`asyncio.to_thread`) while the index stays on the caller's thread.
+
+        Returns:
+            dict: sha256, extension, size, width, height, `new` (False
+            when the same bytes were stored before) and `thumbnails`
+            (False when Pillow could not read them), or None when the
+            bytes are not an image.
+        """
+        extension = _extension(content_type, data)
+        if extension is None:
+            return None
+        sha = hashlib.sha256(data).hexdigest()
+        blob = {"sha256": sha, "extension": extension, "size": len(data),
+                "width": None, "height": None, "new": False, "thumbnails": True}
+
+        path = self.original_path(sha, extension)
+        if os.path.exists(path):
+            return blob
+
+        size = self._write_thumbnails(sha, data)
+        if size is None:
+            blob["thumbnails"] = False
+        else:
+            blob["width"], blob["height"] = size
+        _write_atomic(path, data)
+        blob["new"] = True
+        return blob
+
+    def _write_thumbnails(self, sha, data):
+        """Write one JPEG per thumbnail size; returns the original's (width, height), or None."""
+        from PIL import Image, ImageOps
+
+        try:
+            image = Image.open(io.BytesIO(data))
+            size = image.size
+            # JPEG decoders can scale by 1/2..1/8 while decoding; far cheaper than a full decode
+            image.draft("RGB", (self.thumbnail_sizes[0], self.thumbnail_sizes[0]))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+        except Exception:
+            # Keep the original; a format Pillow cannot read just has no thumbnails
+            return None
+
+        # Largest first, each one resized from the previous
+        for edge in self.thumbnail_sizes:
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+            _write_atomic(self.thumbnail_path(sha, edge), out.getvalue())
+        return size
+
+    # ---------------- INDEX ---------------- #
+
+    def record(self, url, blob, fetched_at=None):
+        """Index a fetched URL against the blob `save_blob` returned."""
+        now = (fetched_at or datetime.now()).isoformat()
+        if blob["new"]:
+            self._db.execute("""
+                INSERT OR IGNORE INTO images (sha256, extension, size, width, height, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?);
+            """, (blob["sha256"], blob["extension"], blob["size"], blob["width"], blob["height"], now))
+        self._db.execute("""
+            INSERT OR REPLACE INTO urls (url, sha256, status, error, fetched_at)
+            VALUES (?, ?, 200, NULL, ?);
+        """, (url, blob["sha256"], now))
+
+    def record_failure(self, url, status=None, error=None, fetched_at=None):
+        """Index a URL that permanently returned no image (404, not an image).
+
+        It is skipped until the failure is `FAILURE_RETRY_DAYS` old. Do not
+        record transient failures (timeouts, 429, 5xx); those are retried
+        on the next run.
+        """
+        self._db.execute("""
+            INSERT OR REPLACE INTO urls (url, sha256, status, error, fetched_at)
+            VALUES (?, NULL, ?, ?, ?);
+        """, (url, status, error, (fetched_at or datetime.now()).isoformat()))
+
+    def fetched(self, urls, now=None):
+        """Return the subset of `urls` stored, or failed within `FAILURE_RETRY_DAYS`."""
+        urls = list(urls)
+        retry_before = ((now or datetime.now()) - timedelta(days=FAILURE_RETRY_DAYS)).isoformat()
+        found = set()
+        for start in range(0, len(urls), LOOKUP_CHUNK):
+            chunk = urls[start:start + LOOKUP_CHUNK]
+            marks = ",".join("?" for _ in chunk)
+            found.update(row[0] for row in self._db.execute(f"""
+                SELECT url FROM urls
+                WHERE url IN ({marks}) AND (sha256 IS NOT NULL OR fetched_at >= ?);
+            """, (*chunk, retry_before)))
+        return found
+
+    def lookup(self, url):
+        """Return the stored original's path for `url`, or None."""
+        row = self._db.execute("""
+            SELECT i.sha256, i.extension FROM urls u JOIN images i USING (sha256) WHERE u.url = ?;
+        """, (url,)).fetchone()
+        return self.original_path(*row) if row else None
+
+    def stats(self):
+        """URLs indexed, distinct images and their bytes, and URLs that failed."""
+        urls, failed = self._db.execute(
+            "SELECT COUNT(*), COUNT(*) - COUNT(sha256) FROM urls;").fetchone()
+        images, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images;").fetchone()
+        return {"urls": urls, "failed": failed, "images": images, "bytes": size}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,131 @@
+"""Utilities.images_async
+
+Concurrent download of listing images into the `ImageStore`.
+
+Images are fetched over one pooled Playwright `APIRequestContext` (no
+browser page per image) with at most `concurrency` requests in flight;
+each host's limiter in `Utilities.throttle_async` paces them like any
+other request to that site. URLs already in the store's index are
+skipped before anything is requested. Hashing, thumbnailing and writing
+run in worker threads, so slow decodes do not hold up the downloads.
+
+Use case:
+    crawl_started = db_utils.db_now()
+    ...
+    await store_listing_images(pw, "motorsport", since=crawl_started)
+"""
+
+import asyncio
+import time
+
+from Utilities import db_utils, metrics
+from Utilities.image_store import IMAGE_DIR, ImageStore
+from Utilities.retry_async import fetch_with_retries
+
+# Image requests in flight across all hosts
+CONCURRENCY = 16
+
+# Bodies larger than this are not stored (a mislinked video, a raw scan)
+MAX_IMAGE_BYTES = 25 * 1024 ** 2
+
+# Statuses that mean the image is gone; anything else non-200 is retried next run
+PERMANENT_STATUSES = (404, 410)
+
+
+async def fetch_images(request, urls, store, concurrency=CONCURRENCY, budget=20.0):
+    """Download the `urls` the store has not indexed yet.
+
+    Only permanent failures (gone, empty, oversized, not an image) are
+    indexed; timeouts, open circuits, 429s and 5xx count as failed but
+    are tried again on the next run.
+
+    Returns:
+        dict: URLs requested, skipped (already indexed), fetched, failed,
+        new images stored, duplicates (fetched URLs whose bytes were
+        already stored), no_thumbnails (new images Pillow could not read),
+        bytes downloaded, seconds and `dedupe_ratio` (fetched URLs per
+        distinct image).
+    """
+    started = time.perf_counter()
+    unique = list(dict.fromkeys(url for url in urls if url))
+    done = store.fetched(unique)
+    pending = [url for url in unique if url not in done]
+
+    report = {"requested": len(unique), "skipped": len(unique) - len(pending), "fetched": 0,
+              "failed": 0, "new": 0, "duplicates": 0, "no_thumbnails": 0, "bytes": 0}
+    seen_hashes = set()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(url):
+        async with semaphore:
+            try:
+                response = await fetch_with_retries(request, "GET", url, "images.get", budget=budget)
+            except Exception:
+                # Timeout, open circuit or retries spent: worth another try next run
+                report["failed"] += 1
+                return
+            try:
+                status = response.status
+                content_type = response.headers.get("content-type", "")
+                body = await response.body() if status == 200 else b""
+            finally:
+                await response.dispose()
+
+        if status != 200 or not body or len(body) > MAX_IMAGE_BYTES:
+            if status == 200 or status in PERMANENT_STATUSES:
+                store.record_failure(url, status, "empty or oversized body" if status == 200 else None)
+            report["failed"] += 1
+            return
+
+        # Outside the semaphore: the next download starts while this one is processed
+        blob = await asyncio.to_thread(store.save_blob, body, content_type)
+        if blob is None:
+            store.record_failure(url, status, f"not an image ({content_type or 'no content type'})")
+            report["failed"] += 1
+            return
+
+        store.record(url, blob)
+        if not blob["thumbnails"]:
+            report["no_thumbnails"] += 1
+        report["fetched"] += 1
+        report["bytes"] += len(body)
+        # Count by hash: two copies racing through save_blob may both report new
+        if blob["sha256"] in seen_hashes or not blob["new"]:
+            report["duplicates"] += 1
+        else:
+            seen_hashes.add(blob["sha256"])
+            report["new"] += 1
+
+    await asyncio.gather(*(fetch_one(url) for url in pending))
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    distinct = report["fetched"] - report["duplicates"]
+    report["dedupe_ratio"] = round(report["fetched"] / distinct, 3) if distinct else None
+    return report
+
+
+async def store_listing_images(pw, source, since=None, directory=IMAGE_DIR,
+                               concurrency=CONCURRENCY, user_agent=None):
+    """Fetch the images of `source`'s active listings changed since `since`.
+
+    Use case: run after a crawl with the crawl's start time, so only the
+    galleries it added or changed are read; URLs fetched on an earlier
+    run are skipped by the store's index. Read that time from the
+    database clock (`db_utils.db_now`), which stamps created_at and
+    updated_at; a skewed client clock would skip this crawl's listings.
+    """
+    urls = db_utils.get_image_urls(source, since)
+    store = ImageStore(directory)
+    request = await pw.request.new_context(user_agent=user_agent)
+    try:
+        report = await fetch_images(request, urls, store, concurrency=concurrency)
+    finally:
+        await request.dispose()
+        store.close()
+
+    metrics.ITEMS.inc(source, "images", amount=report["new"])
+    if report["no_thumbnails"]:
+        metrics.ERRORS.inc("thumbnails", source, amount=report["no_thumbnails"])
+    report = {"source": source, **report}
+    print(f"Images: {report}")
+    return report
@@ -0,0 +1,95 @@
+"""Utilities.listing_registry
+
+Run-level registry of listings keyed by `unique_id`.
+
+An advert can show up in several categories and in the home page's
+featured/recent panels. The registry hands out one shared item dict per
+ID, merging the category lists in memory, and remembers which IDs have
+had their detail page fetched so each detail page is loaded at most
+once per run. Page objects that outlive a run (scheduler, queue worker)
+call `reset` when the next one starts, so every run sees current prices
+and refetches details.
+
+Use case:
+    registry = ListingRegistry()
+    item = registry.register(ad_data)   # canonical dict, categories merged
+    if registry.needs_details(item):
+        ...fetch details...
+        registry.mark_enriched(item)
+"""
+
+
+# List-card fields a later sighting replaces: the latest card is the current one
+VOLATILE_FIELDS = ("title", "price", "date", "imageURLs")
+
+
+class ListingRegistry:
+    """In-memory dedupe of listings for one run."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget every listing; call at the start of each run."""
+        self._items = {}
+        self._enriched = set()
+        self.duplicates = 0
+        self.saved_navigations = 0
+
+    def register(self, item):
+        """Return the canonical item for `item["id"]`, merging its categories.
+
+        The first item seen for an ID becomes the canonical one. Later
+        sightings add their categories, replace the `VOLATILE_FIELDS` they
+        have a value for and fill any other field the first one lacked.
+        Once the detail page is in, its gallery is kept over a card's images.
+        """
+        unique_id = item.get("id")
+        if not unique_id:
+            return item
+
+        known = self._items.get(unique_id)
+        if known is None:
+            self._items[unique_id] = item
+            return item
+
+        self.duplicates += 1
+        categories = known.get("category") or []
+        for category in item.get("category") or []:
+            if category not in categories:
+                categories.append(category)
+        if categories:
+            known["category"] = categories
+        enriched = unique_id in self._enriched
+        for key, value in item.items():
+            if key == "category":
+                continue
+            volatile = key in VOLATILE_FIELDS and not (enriched and key == "imageURLs")
+            if known.get(key) in (None, "", []) or (volatile and value not in (None, "", [])):
+                known[key] = value
+        return known
+
+    def needs_details(self, item):
+        """True unless this run already fetched the item's detail page.
+
+        Every False answer is a detail navigation saved.
+        """
+        if item.get("id") in self._enriched:
+            self.saved_navigations += 1
+            return False
+        return True
+
+    def mark_enriched(self, item):
+        if item.get("id"):
+            self._enriched.add(item["id"])
+
+    def items(self):
+        """Return the canonical items in first-seen order."""
+        return list(self._items.values())
+
+    def report(self):
+        return {
+            "listings": len(self._items),
+            "duplicates": self.duplicates,
+            "saved_navigations": self.saved_navigations,
+        }
@@ -0,0 +1,116 @@
+"""Utilities.liveness_async
+
+Cheap liveness sweep for listings a list crawl no longer shows.
+
+Stored `link_url`s are probed with HEAD requests (falling back to a small
+conditional GET when a server refuses HEAD) over one pooled Playwright
+`APIRequestContext`, so no browser page is opened per URL. Requests are
+paced by the per-host limiters in `Utilities.throttle_async`. Dead listings
+are flagged in bulk via `db_utils.mark_listings_removed`.
+"""
+
+import asyncio
+from urllib.parse import urlsplit
+
+from Utilities import db_utils
+from Utilities.retry_async import fetch_with_retries
+
+# Statuses that mean the advert is gone
+REMOVED_STATUSES = {404, 410}
+
+# Statuses some servers return for HEAD while serving GET normally
+HEAD_REJECTED_STATUSES = {400, 403, 405, 501}
+
+# Bytes of body read when a GET fallback has to look for removal markers
+GET_PREVIEW_BYTES = 65535
+
+
+def _is_soft_removed(url: str, final_url: str) -> bool:
+    # Removed adverts on some sites redirect to the homepage instead of 404ing
+    original, final = urlsplit(url), urlsplit(final_url)
+    return original.path.strip("/") != "" and final.path.strip("/") == ""
+
+
+async def probe_listing(request, url, last_seen=None, removed_markers=(), budget=20.0):
+    """Probe one listing URL.
+
+    Returns:
+        str: "alive", "removed" or "unknown" (429/5xx/network errors that
+        outlasted the retry `budget`, or an open circuit); unknown
+        listings are left untouched for the next sweep.
+    """
+    try:
+        response = await fetch_with_retries(request, "HEAD", url, "liveness.head",
+                                            budget=budget, max_redirects=5)
+        status, final_url = response.status, response.url
+        await response.dispose()
+
+        if status in HEAD_REJECTED_STATUSES:
+            headers = {"Range": f"bytes=0-{GET_PREVIEW_BYTES}"}
+            if last_seen:
+                headers["If-Modified-Since"] = last_seen.strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+            response = await fetch_with_retries(request, "GET", url, "liveness.get",
+                                                budget=budget, headers=headers, max_redirects=5)
+            status, final_url = response.status, response.url
+            body = await response.text() if status in (200, 206) and removed_markers else ""
+            await response.dispose()
+
+            if any(marker in body for marker in removed_markers):
+                return "removed"
+
+    except Exception:
+        return "unknown"
+
+    if status in REMOVED_STATUSES:
+        return "removed"
+    if status < 400:
+        return "removed" if _is_soft_removed(url, final_url) else "alive"
+    return "unknown"
+
+
+async def sweep_stale_listings(pw, source, seen_before, removed_markers=(),
+                               concurrency=64, user_agent=None):
+    """Probe every `source` listing not seen since `seen_before`.
+
+    Use case: run right after a list crawl with the crawl's start time,
+    read from the database clock (`db_utils.db_now`) like last_seen_at.
+    `concurrency` caps probes in flight overall; each host's own window
+    and rate adapt inside that cap. Alive listings get last_seen_at
+    stamped so they are not re-probed until the next crawl misses them
+    again; dead ones are marked removed.
+
+    Returns:
+        dict: counts of checked/alive/removed/unknown listings.
+    """
+    candidates = db_utils.get_unseen_listings(source, seen_before)
+    outcomes = {"alive": [], "removed": [], "unknown": []}
+
+    if candidates:
+        request = await pw.request.new_context(user_agent=user_agent)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def check(row):
+            async with semaphore:
+                outcome = await probe_listing(request, row["link_url"],
+                                              last_seen=row["last_seen_at"],
+                                              removed_markers=removed_markers)
+            outcomes[outcome].append(row["unique_id"])
+
+        try:
+            await asyncio.gather(*(check(row) for row in candidates))
+        finally:
+            await request.dispose()
+
+    removed = db_utils.mark_listings_removed(source, outcomes["removed"])
+    db_utils.mark_seen(source, outcomes["alive"])
+
+    summary = {
+        "source": source,
+        "checked": len(candidates),
+        "alive": len(outcomes["alive"]),
+        "removed": removed,
+        "unknown": len(outcomes["unknown"]),
+    }
+    print(f"Liveness sweep: {summary}")
+    return summary
@@ -0,0 +1,232 @@
+"""Utilities.load_more_async
+
+Page through the AJAX endpoint behind a "Load More" button without
+clicking it.
+
+`discover_load_more` dispatches one click on the button and captures the
+XHR/fetch request it sends. A dispatched click reaches the button's
+handler even inside a collapsed panel, so nothing has to be expanded
+first. `LoadMoreRequest` is that request with its paging parameter
+located: a page number (`PAGE_PARAMS`) or an offset (`OFFSET_PARAMS`),
+in the query string, a form body or a JSON body. `harvest` re-issues the
+request for each following page over the page's `APIRequestContext`
+(same cookies and nonce), `concurrency` pages at a time, and parses the
+HTML fragment of every response. An offset moves by the number of cards
+the captured request returns. It stops at the first page that adds no
+new cards. The DOM never grows and no page waits for networkidle.
+
+`APIRequestContext` traffic bypasses HAR record/replay and the page
+archive, so callers recording, replaying or archiving should click
+instead.
+
+Fragments arrive as raw HTML or as JSON wrapping it (WordPress
+admin-ajax answers `{"success": true, "data": {"html": ...}}`);
+`fragment_html` finds the HTML either way.
+
+Use case:
+    spec = await discover_load_more(page, page.locator("#option01 button"))
+    result = await harvest(page.request, spec, parse=parse_cards, key=lambda c: c["linkURL"], source="motorsport")
+"""
+
+import asyncio
+import json
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from Utilities import metrics
+from Utilities.retry_async import fetch_with_retries
+
+# Fragment pages in flight; each host's limiter paces them further
+CONCURRENCY = 4
+
+# Guards against endpoints that never run dry
+MAX_PAGES = 500
+
+# Parameter names that carry a page number or an item offset, most specific first
+PAGE_PARAMS = ("paged", "page", "pg", "page_no", "pageno", "current_page", "pagenum")
+OFFSET_PARAMS = ("offset", "start", "skip", "from")
+
+# JSON keys that usually hold the rendered fragment
+HTML_KEYS = ("html", "content", "markup", "data", "items", "result")
+
+# Request headers worth replaying; the rest are set by the request context
+REPLAYED_HEADERS = ("x-requested-with", "x-wp-nonce", "x-csrf-token", "content-type", "accept")
+
+
+class LoadMoreRequest:
+    """The request a "Load More" click sends, with its paging parameter located.
+
+    Args:
+        url, method, headers, post_data: as captured from the click.
+        where: "query", "form" or "json"; where the paging parameter is.
+        name: the paging parameter.
+        first: its value in the captured request (the first page loaded).
+        step: how far it moves per page: 1 for page numbers; None for
+            offsets until `harvest` has seen how many cards a page holds.
+    """
+
+    def __init__(self, url, method, headers, post_data, where, name, first, step):
+        self.url = url
+        self.method = method
+        self.headers = headers
+        self.post_data = post_data
+        self.where = where
+        self.name = name
+        self.first = first
+        self.step = step
+
+    def __repr__(self):
+        step = "?" if self.step is None else self.step
+        return f"LoadMoreRequest({self.method} {self.url} {self.where}:{self.name}={self.first}+{step}n)"
+
+    @classmethod
+    def from_request(cls, url, method, headers, post_data):
+        """Locate the paging parameter of a captured request, or return None."""
+        headers = {k: v for k, v in (headers or {}).items() if k.lower() in REPLAYED_HEADERS}
+        candidates = [("query", dict(parse_qsl(urlsplit(url).query)))]
+        content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+        if post_data and "json" in content_type:
+            try:
+                body = json.loads(post_data)
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                candidates.append(("json", body))
+        elif post_data:
+            candidates.append(("form", dict(parse_qsl(post_data))))
+
+        for names, offset in ((PAGE_PARAMS, False), (OFFSET_PARAMS, True)):
+            for where, params in candidates:
+                for name in names:
+                    value = params.get(name)
+                    if value is not None and str(value).isdigit():
+                        # An offset is not necessarily one page size; harvest measures the page
+                        return cls(url, method, headers, post_data, where, name, int(value),
+                                   None if offset else 1)
+        return None
+
+    def page(self, n):
+        """Return (url, fetch kwargs) for the `n`-th page after the captured one (0 = captured)."""
+        if n and self.step is None:
+            raise ValueError("page size unknown; fetch page 0 first")
+        value = self.first + n * (self.step or 0)
+        url, kwargs = self.url, {"headers": self.headers}
+        if self.where == "query":
+            parts = urlsplit(self.url)
+            query = dict(parse_qsl(parts.query))
+            query[self.name] = str(value)
+            url = urlunsplit(parts._replace(query=urlencode(query)))
+            if self.post_data:
+                kwargs["data"] = self.post_data
+        elif self.where == "form":
+            form = dict(parse_qsl(self.post_data))
+            form[self.name] = str(value)
+            kwargs["form"] = form
+        else:
+            body = json.loads(self.post_data)
+            body[self.name] = value if isinstance(body[self.name], int) else str(value)
+            kwargs["data"] = json.dumps(body)
+        return url, kwargs
+
+
+async def discover_load_more(page, button, timeout=15000):
+    """Click `button` once and return the `LoadMoreRequest` it sent, or None.
+
+    Only XHR/fetch requests to the page's own host are considered, so
+    analytics beacons fired by the same click are ignored.
+    """
+    host = urlsplit(page.url).netloc
+
+    def is_fragment_request(request):
+        return request.resource_type in ("xhr", "fetch") and urlsplit(request.url).netloc == host
+
+    try:
+        async with page.expect_request(is_fragment_request, timeout=timeout) as captured:
+            await button.dispatch_event("click")
+        request = await captured.value
+    except Exception as e:
+        print(f"⚠️ No Load More request seen: {e}")
+        return None
+
+    spec = LoadMoreRequest.from_request(request.url, request.method, request.headers, request.post_data)
+    if spec is None:
+        print(f"⚠️ No paging parameter in {request.method} {request.url} ({request.post_data!r})")
+    return spec
+
+
+def fragment_html(body, content_type=""):
+    """Return the HTML fragment of a Load More response, raw or wrapped in JSON."""
+    text = body.decode("utf-8", "replace") if isinstance(body, bytes) else body
+    if "json" not in content_type and not text.lstrip().startswith(("{", "[")):
+        return text
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return text
+    return _find_html(payload) or ""
+
+
+def _find_html(value):
+    if isinstance(value, str):
+        return value if "<" in value else None
+    if isinstance(value, list):
+        parts = [html for html in map(_find_html, value) if html]
+        return "".join(parts) or None
+    if isinstance(value, dict):
+        keys = [k for k in HTML_KEYS if k in value] + [k for k in value if k not in HTML_KEYS]
+        for key in keys:
+            html = _find_html(value[key])
+            if html:
+                return html
+    return None
+
+
+async def harvest(request, spec, parse, key, source, concurrency=CONCURRENCY, max_pages=MAX_PAGES):
+    """Fetch every page of `spec` and return the cards `parse(html)` finds, in page order.
+
+    Pages are requested in waves of `concurrency`; the wave that reaches
+    the end costs at most `concurrency - 1` empty requests. A page whose
+    cards (by `key`) were all seen already also ends the walk, since some
+    endpoints repeat their last page forever. For an offset parameter
+    the captured page is fetched alone first and the number of cards it
+    returns becomes `spec.step`.
+
+    Returns:
+        dict: cards, pages fetched and whether the end was reached
+        (`complete`; False after a failed page or `max_pages`).
+    """
+    cards, seen = [], set()
+    fetched = 0
+
+    async def fetch_page(n):
+        url, kwargs = spec.page(n)
+        response = await fetch_with_retries(request, spec.method, url, f"{source}.load_more", **kwargs)
+        try:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status} for page {n} of {url}")
+            return parse(fragment_html(await response.body(), response.headers.get("content-type", "")))
+        finally:
+            await response.dispose()
+
+    start = 0
+    while start < max_pages:
+        # Until the page size is known, offsets can only be fetched one page at a time
+        wave = range(start, min(start + (concurrency if spec.step else 1), max_pages))
+        start = wave.stop
+        try:
+            pages = await asyncio.gather(*(fetch_page(n) for n in wave))
+        except Exception as e:
+            print(f"⚠️ Load More paging stopped after {fetched} pages: {e}")
+            metrics.ERRORS.inc("load_more", source)
+            return {"cards": cards, "pages": fetched, "complete": False}
+        fetched += len(pages)
+        if spec.step is None:
+            spec.step = len(pages[0]) or 1
+
+        for page_cards in pages:
+            new = [card for card in page_cards if key(card) not in seen]
+            if not new:
+                return {"cards": cards, "pages": fetched, "complete": True}
+            seen.update(key(card) for card in new)
+            cards.extend(new)
+
+    return {"cards": cards, "pages": fetched, "complete": False}
@@ -0,0 +1,367 @@
+"""Utilities.metrics
+
+In-process run metrics: per-stage latency histograms, counters and gauges.
+
+Stages (open, list_page, pagination, detail, db_upsert, file_output) are
+timed with `timer` or `timed` and land in one histogram labelled by stage
+and source. Recording is a dict lookup plus a bisect, so it is cheap
+enough for the extraction loops; nothing is formatted until the metrics
+are read. `serve` exposes them in the Prometheus text format on a local
+port, and `write_report` dumps a JSON run report. Throttle and retry
+counts already kept by `throttle_async` and `retry_async` are read at
+render time rather than recorded twice.
+
+Use case:
+    metrics.serve(9108)
+    with metrics.timer("open", self.SOURCE):
+        await navigate(self.page, self.homeLink, "motorsport.open")
+    ...
+    metrics.write_report("output/run_report.json")
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds; navigations and detail pages sit in the 0.5-30s range
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+REPORT_PATH = os.path.join("output", "run_report.json")
+
+_started = time.time()
+
+
+class Counter:
+    """Monotonic count per label tuple."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    """Last value set per label tuple."""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+
+class Histogram:
+    """Bucketed observations per label tuple: [bucket counts..., sum, count, max]."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, value, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0, 0.0]
+        # Last bucket slot is +Inf
+        state[bisect_left(self.buckets, value)] += 1
+        state[-3] += value
+        state[-2] += 1
+        if value > state[-1]:
+            state[-1] = value
+
+    def quantile(self, labels, q):
+        """Estimate a quantile by interpolating inside its bucket."""
+        state = self.values.get(labels)
+        if not state or not state[-2]:
+            return None
+        rank = q * state[-2]
+        seen = 0
+        for i, n in enumerate(state[:len(self.buckets) + 1]):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else state[-1]
+                # Never report more than the slowest observation
+                return min(state[-1], lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return state[-1]
+
+
+# ---------------- METRICS ---------------- #
+
+STAGE_SECONDS = Histogram("scraper_stage_seconds", "Time spent per scraper stage.", ("stage", "source"))
+NAVIGATION_SECONDS = Histogram("scraper_navigation_seconds",
+                               "Network time of throttled navigations and fetches.", ("host",))
+ITEMS = Counter("scraper_items_total", "Listings handled, by stage (list, detail, stored).", ("source", "stage"))
+ERRORS = Counter("scraper_errors_total", "Errors caught or raised per stage.", ("stage", "source"))
+BYTES = Counter("scraper_response_bytes_total", "Response bytes (from Content-Length).", ("host",))
+QUEUE_DEPTH = Gauge("scraper_queue_depth", "Work waiting per queue.", ("queue",))
+LISTING_DEDUPE = Gauge("scraper_listing_dedupe",
+                       "Listing registry counts of the last run (listings, duplicates, saved_navigations).",
+                       ("source", "kind"))
+
+REGISTRY = [STAGE_SECONDS, NAVIGATION_SECONDS, ITEMS, ERRORS, BYTES, QUEUE_DEPTH, LISTING_DEDUPE]
+
+
+class timer:
+    """Context manager timing one stage; exceptions also count as errors.
+
+    Use case: `with metrics.timer("pagination", self.SOURCE): ...`, also
+    inside coroutines (the timing itself never awaits).
+    """
+
+    __slots__ = ("stage", "source", "started")
+
+    def __init__(self, stage, source=""):
+        self.stage = stage
+        self.source = source
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.stage, self.source)
+        if exc_type is not None:
+            ERRORS.inc(self.stage, self.source)
+        return False
+
+
+def timed(stage):
+    """Decorator form of `timer` for functions and coroutine functions.
+
+    Methods of page objects are labelled with their class's `SOURCE`.
+    """
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with timer(stage, getattr(args[0], "SOURCE", "") if args else ""):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with timer(stage, getattr(args[0], "SOURCE", "") if args else ""):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe_navigation(host, seconds, headers=None):
+    NAVIGATION_SECONDS.observe(seconds, host)
+    length = (headers or {}).get("content-length")
+    if length and length.isdigit():
+        BYTES.inc(host, amount=int(length))
+
+
+# ---------------- PROCESS STATE ---------------- #
+
+def browser_rss_bytes():
+    """Resident memory of this process's descendants (the Playwright driver and Chromium).
+
+    Linux only (reads /proc); None elsewhere.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                # The command name may contain spaces; the fields after it are fixed
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    pending = list(children.get(os.getpid(), []))
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm", encoding="utf-8") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+def _collected():
+    """Gauges and counters owned by other modules, read on demand."""
+    from Utilities.retry_async import OUTCOMES
+    from Utilities.throttle_async import snapshot as host_snapshot
+
+    navigations = Counter("scraper_navigations_total", "Throttled requests per host and outcome.",
+                          ("host", "outcome"))
+    for host, stats in host_snapshot().items():
+        for outcome in ("ok", "throttled", "error", "timeout"):
+            navigations.values[(host, outcome)] = stats[outcome]
+
+    outcomes = Counter("scraper_navigation_outcomes_total",
+                       "Retried navigation results per call site.", ("call_site", "outcome"))
+    outcomes.values = dict(OUTCOMES)
+
+    memory = Gauge("scraper_browser_rss_bytes", "Resident memory of the browser processes.")
+    rss = browser_rss_bytes()
+    if rss is not None:
+        memory.values[()] = rss
+    return [navigations, outcomes, memory]
+
+
+# ---------------- EXPOSITION ---------------- #
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render():
+    """Return all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY + _collected():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        # Copy first: the crawl keeps recording while the HTTP thread renders
+        for labels, value in list(metric.values.items()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(metric.labelnames, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, n in zip(metric.buckets + (float("inf"),), value[:len(metric.buckets) + 1]):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(metric.labelnames, labels)} {value[-3]}")
+            lines.append(f"{metric.name}_count{_labels(metric.labelnames, labels)} {value[-2]}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would drown the crawl's own output
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics on `host:port` from a daemon thread for the rest of the run."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+# ---------------- RUN REPORT ---------------- #
+
+def snapshot():
+    """Return the recorded values in a picklable form for `merge`.
+
+    Use case: a shard worker returns it with its results so the parent's
+    report covers every process.
+    """
+    return {metric.name: {labels: list(value) if isinstance(value, list) else value
+                          for labels, value in metric.values.items()}
+            for metric in REGISTRY}
+
+
+def merge(recorded):
+    """Add a worker's `snapshot()` into this process's metrics (gauges take the new value)."""
+    for metric in REGISTRY:
+        for labels, value in (recorded or {}).get(metric.name, {}).items():
+            if metric.kind == "gauge":
+                metric.values[labels] = value
+            elif metric.kind == "counter":
+                metric.values[labels] = metric.values.get(labels, 0) + value
+            else:
+                state = metric.values.setdefault(labels, [0] * (len(metric.buckets) + 1) + [0.0, 0, 0.0])
+                for i, n in enumerate(value[:-1]):
+                    state[i] += n
+                state[-1] = max(state[-1], value[-1])
+
+
+def _histogram_report(histogram):
+    report = {}
+    for labels, state in list(histogram.values.items()):
+        key = "/".join(str(label) for label in labels if label) or "all"
+        report[key] = {
+            "count": state[-2],
+            "total_s": round(state[-3], 3),
+            "mean_s": round(state[-3] / state[-2], 4) if state[-2] else None,
+            "p50_s": round(histogram.quantile(labels, 0.5), 4),
+            "p95_s": round(histogram.quantile(labels, 0.95), 4),
+            "max_s": round(state[-1], 4),
+        }
+    return report
+
+
+def report():
+    """Return the run report: stage timings, counters, gauges and host stats."""
+    def flat(counter):
+        return {"/".join(str(label) for label in labels) or "all": value
+                for labels, value in sorted(counter.values.items())}
+
+    from Utilities.retry_async import outcome_counts
+    from Utilities.throttle_async import snapshot as host_snapshot
+
+    return {
+        "started_at": datetime.fromtimestamp(_started).isoformat(timespec="seconds"),
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.time() - _started, 1),
+        "stages": _histogram_report(STAGE_SECONDS),
+        "navigations": _histogram_report(NAVIGATION_SECONDS),
+        "items": flat(ITEMS),
+        "errors": flat(ERRORS),
+        "response_bytes": flat(BYTES),
+        "queue_depth": flat(QUEUE_DEPTH),
+        "listing_dedupe": flat(LISTING_DEDUPE),
+        "hosts": host_snapshot(),
+        "outcomes": outcome_counts(),
+        "browser_rss_bytes": browser_rss_bytes(),
+    }
+
+
+def record_dedupe(source, counts):
+    """Keep a `ListingRegistry.report()` for the run report and /metrics."""
+    for kind, value in counts.items():
+        LISTING_DEDUPE.set(value, source, kind)
+
+
+def write_report(path=REPORT_PATH):
+    """Write `report()` as JSON to `path`; returns the path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2, default=str)
+    return path
@@ -0,0 +1,68 @@
+"""Utilities.navigation_async
+
+Throttled navigation and HTTP fetch helpers.
+
+Every page load and direct HTTP request should go through these so the
+per-host limiter in `Utilities.throttle_async` sees (and paces) all
+traffic to a site.
+"""
+
+import time
+
+from Utilities import metrics
+from Utilities.throttle_async import _host, get_limiter
+
+# Default navigation timeout (ms); slow hosts back off instead of stalling
+NAV_TIMEOUT = 30000
+
+
+def _retry_after(headers) -> float | None:
+    value = (headers or {}).get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async def goto(page, url, timeout=NAV_TIMEOUT, wait_until="domcontentloaded"):
+    """Navigate `page` to `url` through the host's limiter.
+
+    Use case: drop-in replacement for `page.goto` in the Pages classes.
+    Returns the Playwright response (may be None for same-document loads).
+    """
+    async with get_limiter(url).acquire() as slot:
+        started = time.perf_counter()
+        response = await page.goto(url, timeout=timeout, wait_until=wait_until)
+        metrics.observe_navigation(_host(url), time.perf_counter() - started,
+                                   response.headers if response is not None else None)
+        if response is not None:
+            slot.record_status(response.status, _retry_after(response.headers))
+    return response
+
+
+async def fetch(request, method, url, timeout=10000, **kwargs):
+    """Issue an HTTP request with a Playwright `APIRequestContext`.
+
+    Use case: lightweight HEAD/GET probes that must respect the same
+    per-host limits as browser navigations. Never raises on HTTP status.
+    """
+    async with get_limiter(url).acquire() as slot:
+        started = time.perf_counter()
+        response = await request.fetch(url, method=method, timeout=timeout,
+                                       fail_on_status_code=False, **kwargs)
+        metrics.observe_navigation(_host(url), time.perf_counter() - started, response.headers)
+        slot.record_status(response.status, _retry_after(response.headers))
+    return response
+
+
+def throttled(url):
+    """Return the limiter slot context for actions that navigate indirectly.
+
+    Use case: wrap a pagination click plus its waits so it is paced like
+    a `goto`:
+
+        async with throttled(self.page.url):
+            await next_page.click()
+            await wait_dom(self.page)
+    """
+    return get_limiter(url).acquire()
@@ -0,0 +1,176 @@
+"""Utilities.normalise
+
+Shared normalisation of the date and price text the scrapers extract.
+
+Dates come out as "22 December 2025" when they can be parsed: relative
+English or Dutch ages ("14 uur ago", "3 days ago"), explicit dates with
+English or Dutch month names ("December 20 , 2025", "12 maart 2026")
+and numeric ISO/European forms. Anything else is returned unchanged.
+Prices keep their display text with whitespace runs collapsed;
+`price_value` gives the number the database derives from it.
+
+Listing pages repeat the same few strings, so parsing is memoised in a
+bounded LRU keyed on the raw text. A relative date is cached as its age
+and applied to the current time on each call, so cached results never
+go stale. The batch functions normalise a whole page of values at once.
+
+Use case:
+    normalise_date("14 uur ago")             # -> "18 October 2026"
+    normalise_items(items[start:])           # a page of scraped items, in place
+"""
+
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# Distinct raw strings kept per cache
+CACHE_SIZE = 4096
+
+DATE_OUTPUT_FORMAT = "%d %B %Y"
+
+# Checked in order against the lower-cased text with commas and "ago" removed
+RELATIVE_PATTERNS = [
+    (re.compile(r"^(\d+)\s*(uur|u|hours?|hrs?|h)\b"), timedelta(hours=1)),
+    (re.compile(r"^(\d+)\s*(min|mins|minuten|minutes?)\b"), timedelta(minutes=1)),
+    (re.compile(r"^(\d+)\s*(dag|dagen|d|day|days)\b"), timedelta(days=1)),
+    (re.compile(r"^(\d+)\s*(week|weeks|w)\b"), timedelta(weeks=1)),
+    # Months and years are approximate
+    (re.compile(r"^(\d+)\s*(month|months|maand|maanden)\b"), timedelta(days=30)),
+    (re.compile(r"^(\d+)\s*(year|years|jaar)\b"), timedelta(days=365)),
+]
+
+DUTCH_TO_EN_MONTHS = {
+    "januari": "January",
+    "februari": "February",
+    "maart": "March",
+    "april": "April",
+    "mei": "May",
+    "juni": "June",
+    "juli": "July",
+    "augustus": "August",
+    "september": "September",
+    "oktober": "October",
+    "november": "November",
+    "december": "December",
+
+    # abbreviations
+    "jan": "January",
+    "feb": "February",
+    "mrt": "March",
+    "apr": "April",
+    "jun": "June",
+    "jul": "July",
+    "aug": "August",
+    "sep": "September",
+    "okt": "October",
+    "nov": "November",
+    "dec": "December",
+}
+
+DATE_FORMATS = [
+    "%B %d %Y",
+    "%b %d %Y",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+]
+
+_WHITESPACE = re.compile(r"\s+")
+_DUTCH_MONTH = re.compile(r"\b(" + "|".join(DUTCH_TO_EN_MONTHS) + r")\b", re.IGNORECASE)
+# Same rule as the products.price_value generated column
+_PRICE_NUMBER = re.compile(r"[0-9]+(?:\.[0-9]+)?")
+
+
+# ---------------- DATES ---------------- #
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_date(text):
+    """Return ("ago", timedelta), ("date", formatted) or None for unparseable text."""
+    s = text.strip()
+    # normalize spacing and remove extra commas and 'ago'
+    s_proc = _WHITESPACE.sub(" ", s.replace(",", "")).strip().lower().replace("ago", "").strip()
+
+    for pattern, unit in RELATIVE_PATTERNS:
+        m = pattern.match(s_proc)
+        if m:
+            return "ago", unit * int(m.group(1))
+
+    # Explicit formats: commas removed, Dutch month names translated
+    s_try = _DUTCH_MONTH.sub(lambda m: DUTCH_TO_EN_MONTHS[m.group(1).lower()], s.replace(",", "").strip())
+    for fmt in DATE_FORMATS:
+        try:
+            return "date", datetime.strptime(s_try, fmt).strftime(DATE_OUTPUT_FORMAT)
+        except ValueError:
+            pass
+    return None
+
+
+def normalise_date(text, now=None):
+    """Format a scraped date as '22 December 2025', or return `text` unchanged.
+
+    Args:
+        now: reference time for relative dates; defaults to the current time.
+    """
+    if not text:
+        return ""
+    parsed = _parse_date(text)
+    if parsed is None:
+        return text
+    kind, value = parsed
+    if kind == "ago":
+        return ((now or datetime.now()) - value).strftime(DATE_OUTPUT_FORMAT)
+    return value
+
+
+def normalise_dates(texts, now=None):
+    """Normalise a page of dates against one reference time."""
+    now = now or datetime.now()
+    return [normalise_date(text, now) for text in texts]
+
+
+# ---------------- PRICES ---------------- #
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalise_price(text):
+    """Collapse whitespace in a price's display text ("£ 12,500\\n" -> "£ 12,500")."""
+    if not text:
+        return text
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def normalise_prices(texts):
+    return [normalise_price(text) for text in texts]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def price_value(text):
+    """Return the number in a price's text ("£12,500" -> 12500.0), or None.
+
+    Use case: the same value the database stores in `price_value`.
+    """
+    m = _PRICE_NUMBER.search((text or "").replace(",", ""))
+    return float(m.group(0)) if m else None
+
+
+# ---------------- ITEMS ---------------- #
+
+def normalise_items(items, now=None):
+    """Normalise the "date" and "price" fields of scraped items in place.
+
+    Use case: once per list page, on the items that page added.
+    """
+    now = now or datetime.now()
+    for item in items:
+        if "date" in item:
+            item["date"] = normalise_date(item["date"], now)
+        if "price" in item:
+            item["price"] = normalise_price(item["price"])
+    return items
+
+
+def cache_info():
+    """Hit/miss counts of the date and price caches."""
+    return {"dates": _parse_date.cache_info()._asdict(), "prices": normalise_price.cache_info()._asdict()}
@@ -3,8 +3,6 @@ import sys
 import subprocess
 from datetime import datetime
 
-import pandas as pd
-
 def as_json(items: list, meta: dict | None = None):
     """Format items and optional metadata as a JSON-serializable dict.
 
@@ -29,6 +27,9 @@ def as_excel(items: list, meta: dict | None = None, file_path: str = "output.xls
         print("Invalid items")
         return
 
+    # pandas + openpyxl take seconds to import; only Excel output pays for them
+    import pandas as pd
+
     # Convert items to DataFrame
     new_df = pd.DataFrame([item for item in items if isinstance(item, dict)])
 
@@ -0,0 +1,279 @@
+"""Utilities.page_archive
+
+Optional compressed, content-addressed archive of fetched HTML, with an
+offline re-parse.
+
+When enabled, list and detail pages are stored as gzip blobs named by
+the SHA-256 of their HTML (a page that did not change is stored once)
+and indexed in `index.sqlite` by URL and fetch time. Retention is
+size-bounded: once the blobs exceed `max_bytes`, the oldest fetches are
+dropped along with any blob no remaining fetch refers to.
+
+`reparse` runs the current extractors over the archive in a process
+pool. Each worker loads archived HTML into a Chromium page with
+`set_content`, JavaScript off and every request aborted, so a selector
+fix can be applied to history without touching the sites.
+
+Use case:
+    page_archive.enable("archive")
+    await page_archive.capture(page, "motorsport", "list", category="race-cars")
+    ...
+    page_archive.reparse([MotorsportAuctions], since=datetime(2026, 1, 1))
+"""
+
+import asyncio
+import gzip
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+ARCHIVE_DIR = "archive"
+
+# Blob bytes kept before the oldest fetches are pruned
+MAX_ARCHIVE_BYTES = 5 * 1024 ** 3
+
+# Captures between retention checks
+PRUNE_EVERY = 500
+
+# Archived pages handed to a re-parse worker at a time
+REPARSE_CHUNK = 500
+
+_archive = None
+
+
+class PageArchive:
+    """Blob store plus sqlite index under `directory`."""
+
+    def __init__(self, directory=ARCHIVE_DIR, max_bytes=MAX_ARCHIVE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._captures = 0
+
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        # Autocommit; several crawler processes may write the index at once
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"),
+                                   timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS fetches (
+                fetch_id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                source TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                category TEXT,
+                fetched_at TEXT NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS fetches_time_idx ON fetches (fetched_at);
+            CREATE INDEX IF NOT EXISTS fetches_sha_idx ON fetches (sha256);
+
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+        """)
+
+    def _blob_path(self, sha):
+        return os.path.join(self.directory, "blobs", sha[:2], f"{sha}.html.gz")
+
+    def store(self, html, url, source, kind, category=None, fetched_at=None):
+        """Archive one fetch; returns the blob's SHA-256."""
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(sha)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a half-written blob
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._db.execute("INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?);",
+                             (sha, os.path.getsize(path)))
+
+        self._db.execute("""
+            INSERT INTO fetches (url, source, kind, category, fetched_at, sha256)
+            VALUES (?, ?, ?, ?, ?, ?);
+        """, (url, source, kind, category, (fetched_at or datetime.now()).isoformat(), sha))
+
+        self._captures += 1
+        if self._captures % PRUNE_EVERY == 0:
+            self.prune()
+        return sha
+
+    def load(self, sha):
+        with gzip.open(self._blob_path(sha), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def size(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs;").fetchone()[0]
+
+    def prune(self):
+        """Drop the oldest fetches until the blobs fit in `max_bytes`.
+
+        Returns:
+            int: number of fetches removed.
+        """
+        total = self.size()
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        oldest = self._db.execute("SELECT fetch_id, sha256 FROM fetches ORDER BY fetched_at, fetch_id;")
+        for fetch_id, sha in oldest.fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM fetches WHERE fetch_id = ?;", (fetch_id,))
+            removed += 1
+
+            if self._db.execute("SELECT 1 FROM fetches WHERE sha256 = ? LIMIT 1;", (sha,)).fetchone():
+                continue
+            row = self._db.execute("SELECT size FROM blobs WHERE sha256 = ?;", (sha,)).fetchone()
+            self._db.execute("DELETE FROM blobs WHERE sha256 = ?;", (sha,))
+            try:
+                os.remove(self._blob_path(sha))
+            except FileNotFoundError:
+                pass
+            total -= row[0] if row else 0
+
+        print(f"🗜️ Pruned {removed} archived fetches; archive is {total / 1024 ** 2:.0f} MB")
+        return removed
+
+    def fetches(self, sources, since=None):
+        """Return fetch rows for `sources`, oldest first."""
+        marks = ",".join("?" for _ in sources)
+        cur = self._db.execute(f"""
+            SELECT url, source, kind, category, fetched_at, sha256
+            FROM fetches
+            WHERE source IN ({marks}) AND fetched_at >= ?
+            ORDER BY fetched_at, fetch_id;
+        """, (*sources, since.isoformat() if since else ""))
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+# ---------------- CAPTURE ---------------- #
+
+def enable(directory=ARCHIVE_DIR, max_bytes=MAX_ARCHIVE_BYTES):
+    """Start archiving pages passed to `capture` in this process."""
+    global _archive
+    _archive = PageArchive(directory, max_bytes)
+    return _archive
+
+
+def enabled():
+    """True when this process archives the pages passed to `capture`."""
+    return _archive is not None
+
+
+async def capture(page, source, kind, url=None, category=None):
+    """Archive the page's current HTML if archiving is enabled.
+
+    Args:
+        kind: "list" or "detail", which decides the extractor on re-parse.
+        url: defaults to `page.url`.
+    """
+    if _archive is None:
+        return
+    try:
+        html = await page.content()
+        _archive.store(html, url or page.url, source, kind, category)
+    except Exception as e:
+        # Archiving is best effort; never fail a crawl over it
+        print(f"Warning: could not archive {url or page.url}: {e}")
+
+
+# ---------------- RE-PARSE ---------------- #
+
+def _reparse_chunk(args):
+    return asyncio.run(_reparse_async(*args))
+
+
+async def _reparse_async(directory, site_classes, rows):
+    from playwright.async_api import async_playwright
+
+    archive = PageArchive(directory)
+    results = []
+
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        # The DOM was captured after scripts ran; archived pages need no JS or subresources
+        context = await browser.new_context(java_script_enabled=False)
+        await context.route("**/*", lambda route: route.abort())
+        page = await context.new_page()
+
+        for row in rows:
+            result = {**row, "items": [], "fields": None, "error": None}
+            # A fresh page object per fetch, so no run-level dedupe state leaks between them
+            site = site_classes[row["source"]](page)
+            try:
+                await page.set_content(archive.load(row["sha256"]), wait_until="domcontentloaded")
+                if row["kind"] == "list":
+                    result["items"] = await site.extract_list_page([], category=row["category"])
+                elif hasattr(site, "extract_detail_data"):
+                    result["fields"] = await site.extract_detail_data({})
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            results.append(result)
+
+        await browser.close()
+    return results
+
+
+def reparse(site_classes, directory=ARCHIVE_DIR, since=None, workers=None, persist=True):
+    """Re-extract archived pages with the current extractors and persist them.
+
+    List pages rebuild the items (newer fetches win; categories are
+    merged), detail pages fill in the detail fields of the item with the
+    same link, and each site's items go through its `persist_reparsed`
+    method (`persist` for sites without one). Items whose detail page was
+    never archived are stored without detail fields.
+
+    Returns:
+        dict: pages processed, parse errors, items per source and seconds.
+    """
+    started = time.monotonic()
+    archive = PageArchive(directory)
+    by_source = {site_cls.SOURCE: site_cls for site_cls in site_classes}
+    rows = archive.fetches(list(by_source), since)
+
+    chunks = [(directory, by_source, rows[i:i + REPARSE_CHUNK]) for i in range(0, len(rows), REPARSE_CHUNK)]
+    items = {source: {} for source in by_source}
+    details = {}
+    errors = 0
+
+    # Spawn, not fork: each worker runs its own event loop and Playwright driver
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        # map() keeps chunk order, so results arrive oldest fetch first
+        for results in pool.map(_reparse_chunk, chunks):
+            for result in results:
+                if result["error"]:
+                    errors += 1
+                    print(f"Could not re-parse {result['url']} ({result['fetched_at']}): {result['error']}")
+                    continue
+                if result["fields"] is not None:
+                    details[result["url"]] = result["fields"]
+                for item in result["items"]:
+                    known = items[result["source"]].get(item["id"])
+                    if known is not None and (known.get("category") or item.get("category")):
+                        item["category"] = sorted(set(known.get("category") or []) | set(item.get("category") or []))
+                    items[result["source"]][item["id"]] = item
+
+    report = {"pages": len(rows), "errors": errors, "items": {}}
+    for source, by_id in items.items():
+        merged = list(by_id.values())
+        for item in merged:
+            item.update(details.get(item.get("linkURL")) or {})
+        report["items"][source] = len(merged)
+        if persist and merged:
+            site = by_source[source](None)
+            getattr(site, "persist_reparsed", site.persist)(merged)
+
+    report["seconds"] = round(time.monotonic() - started, 1)
+    return report
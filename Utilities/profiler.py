@@ -0,0 +1,194 @@
+"""Utilities.profiler
+
+Opt-in profiler for Playwright round trips.
+
+`enable()` wraps every coroutine method of Playwright's page, frame,
+locator and input classes. Each call is timed and charged to the chain
+of repo frames (Pages and Utilities functions, with line numbers) that
+led to it, so `safe_click` called from `extract_ad_data` and from
+`move_to_next_page` show up as separate rows. A call made while another
+profiled call is running (Playwright calling itself) is not counted
+twice. Nothing is patched unless `enable()` is called.
+
+`print_report` prints the stacks ranked by cumulative time, flame-style;
+`write_folded` writes them in the folded format flamegraph.pl and
+speedscope read (weights in microseconds).
+
+Use case:
+    profiler.enable()
+    await site.open()
+    await site.collect()
+    profiler.print_report()
+"""
+
+import contextvars
+import functools
+import inspect
+import os
+import sys
+import time
+
+# Playwright async API classes whose coroutine methods are timed
+PROFILED_CLASSES = ("Page", "Frame", "Locator", "ElementHandle", "Mouse", "Keyboard",
+                    "APIRequestContext", "Response")
+
+# Frames from these files are wrappers, not call sites
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(_ROOT, "Utilities", "metrics.py")}
+
+FOLDED_PATH = os.path.join("output", "playwright_profile.folded")
+
+# stack tuple -> [calls, seconds, errors, slowest]
+STATS = {}
+
+_patched = []
+_inside = contextvars.ContextVar("profiler_inside", default=False)
+
+
+def _call_stack(frame):
+    """Repo frames from the outermost to the innermost, as 'function:line'."""
+    stack = []
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_ROOT) and filename not in _SKIP_FILES:
+            stack.append(f"{frame.f_code.co_qualname}:{frame.f_lineno}")
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _wrap(owner, name, method):
+    label = f"{owner}.{name}"
+
+    @functools.wraps(method)
+    async def profiled(*args, **kwargs):
+        if _inside.get():
+            return await method(*args, **kwargs)
+
+        stack = _call_stack(sys._getframe(1)) + (label,)
+        token = _inside.set(True)
+        failed = False
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _inside.reset(token)
+            entry = STATS.get(stack)
+            if entry is None:
+                entry = STATS[stack] = [0, 0.0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += failed
+            if elapsed > entry[3]:
+                entry[3] = elapsed
+
+    return profiled
+
+
+def enable(classes=None):
+    """Start timing Playwright calls in this process.
+
+    Args:
+        classes: classes to patch; defaults to `PROFILED_CLASSES` from
+            `playwright.async_api`.
+    """
+    if _patched:
+        return
+    if classes is None:
+        import playwright.async_api as api
+        classes = [getattr(api, name) for name in PROFILED_CLASSES]
+
+    for cls in classes:
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.iscoroutinefunction(attr):
+                continue
+            setattr(cls, name, _wrap(cls.__name__, name, attr))
+            _patched.append((cls, name, attr))
+
+
+def disable():
+    """Restore the original Playwright methods; recorded stats are kept."""
+    while _patched:
+        cls, name, attr = _patched.pop()
+        setattr(cls, name, attr)
+
+
+def reset():
+    STATS.clear()
+
+
+# ---------------- RESULTS ---------------- #
+
+def snapshot():
+    """Return the recorded stats in a picklable form for `merge`."""
+    return {stack: list(entry) for stack, entry in STATS.items()}
+
+
+def merge(recorded):
+    """Add another process's `snapshot()` (e.g. a shard worker's) into this one."""
+    for stack, (calls, seconds, errors, slowest) in (recorded or {}).items():
+        entry = STATS.setdefault(tuple(stack), [0, 0.0, 0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+        entry[2] += errors
+        entry[3] = max(entry[3], slowest)
+
+
+def ranked(by="seconds"):
+    """Return one row per stack, slowest (or chattiest, with by="calls") first."""
+    rows = [{"stack": stack, "calls": calls, "seconds": seconds, "errors": errors, "slowest": slowest}
+            for stack, (calls, seconds, errors, slowest) in STATS.items()]
+    return sorted(rows, key=lambda row: row[by], reverse=True)
+
+
+def _by_origin():
+    """Cumulative seconds and calls per repo frame, counting each stack once per frame."""
+    totals = {}
+    for stack, (calls, seconds, _, _) in STATS.items():
+        for frame in set(stack[:-1]):
+            entry = totals.setdefault(frame, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+    return totals
+
+
+def print_report(top=25, by="seconds"):
+    """Print the hottest call stacks and the call sites they start from.
+
+    Times are cumulative across concurrent tasks, so they can add up to
+    more than the run's wall time.
+    """
+    rows = ranked(by)
+    if not rows:
+        print("Profiler: no Playwright calls recorded")
+        return
+
+    total = sum(row["seconds"] for row in rows) or 1e-9
+    calls = sum(row["calls"] for row in rows)
+    print(f"\n🔬 Playwright round trips: {calls} calls, {total:.1f}s cumulative")
+    print(f"{'calls':>8} {'total s':>9} {'mean ms':>8} {'share':>6} {'errors':>6}  stack")
+    for row in rows[:top]:
+        stack = row["stack"]
+        print(f"{row['calls']:>8} {row['seconds']:>9.2f} {row['seconds'] / row['calls'] * 1000:>8.1f} "
+              f"{row['seconds'] / total:>6.1%} {row['errors']:>6}  {stack[-1]}")
+        # Innermost caller first, then each frame it was called from
+        for depth, frame in enumerate(reversed(stack[:-1]), start=1):
+            print(f"{'':>42}{'  ' * depth}← {frame}")
+
+    print(f"\n{'calls':>8} {'total s':>9} {'share':>6}  call site (including callees)")
+    origins = sorted(_by_origin().items(), key=lambda kv: kv[1][1], reverse=True)
+    for frame, (n, seconds) in origins[:top]:
+        print(f"{n:>8} {seconds:>9.2f} {seconds / total:>6.1%}  {frame}")
+
+
+def write_folded(path=FOLDED_PATH):
+    """Write the stacks as 'frame;frame;call <microseconds>' lines; returns the path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, (_, seconds, _, _) in sorted(STATS.items()):
+            f.write(f"{';'.join(stack)} {int(seconds * 1e6)}\n")
+    return path
@@ -0,0 +1,361 @@
+"""Utilities.query_api
+
+Read-only HTTP query service over `products`.
+
+    GET /listings?source=&category=&min_price=&max_price=&since=&until=&limit=&cursor=
+    GET /health
+
+`/listings` returns `{"listings": [...], "next": <cursor or null>}`,
+newest listings first. Pass `next` back as `cursor` for the following
+page. Pages come from `db_utils.get_listings_page`, which seeks past the
+previous page's key instead of using OFFSET, so deep pages are as cheap as
+the first. `since` and `until` are ISO dates bounding when a listing was
+first stored.
+
+Rendered responses are kept in an in-process cache keyed by the
+normalised query, for at most `CACHE_TTL` seconds. A background thread
+LISTENs on `db_utils.CRAWLS_CHANNEL` and drops the whole cache when
+`refresh_summaries` commits the end of a crawl. Every response carries
+an ETag of its body, and a request whose If-None-Match still matches
+gets a bodiless 304. Database reads share a small pool of read-only
+connections.
+
+Use case:
+    python -m Utilities.query_api --port 8080
+    curl 'http://127.0.0.1:8080/listings?category=rally-cars&max_price=40000&limit=20'
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from Utilities import db_utils
+
+PORT = 8080
+
+# Seconds a cached response may be served; a crawl commit clears it sooner
+CACHE_TTL = 60.0
+# Distinct queries kept; the least recently used is dropped first
+CACHE_SIZE = 4096
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Read-only database connections shared by the request threads
+POOL_SIZE = 8
+
+FILTERS = ("source", "category", "min_price", "max_price", "since", "until", "limit", "cursor",
+           "include_removed")
+
+
+class BadRequest(ValueError):
+    """A query parameter the API cannot use; answered with 400."""
+
+
+# ---------------- CACHE ---------------- #
+
+class ResponseCache:
+    """LRU of rendered responses with a TTL, cleared as a whole by `invalidate`.
+
+    `generation` moves on every invalidation. A response rendered from
+    data read before an invalidation is not stored, so a query that raced
+    a crawl commit cannot put stale rows back.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, size=CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.generation = 0
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (etag, body) for `key`, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1], entry[2]
+
+    def put(self, key, etag, body, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, payload=None):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.stats["invalidations"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "generation": self.generation}
+
+
+# ---------------- CONNECTIONS ---------------- #
+
+class ConnectionPool:
+    """Up to `size` connections from `connect`, handed out one request at a time."""
+
+    def __init__(self, connect=db_utils.get_connection, size=POOL_SIZE):
+        self.connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+                # Each query is its own read-only transaction; nothing is left open between requests
+                conn.set_session(readonly=True, autocommit=True)
+            try:
+                yield conn
+            except Exception:
+                # The connection may be broken; the next request opens a fresh one
+                conn.close()
+                raise
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+# ---------------- QUERIES ---------------- #
+
+def encode_cursor(key):
+    """Opaque `cursor` for a page key (created_at, source, unique_id)."""
+    created_at, source, unique_id = key
+    raw = json.dumps([created_at.isoformat(), source, unique_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, source, unique_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(source), str(unique_id)
+    except (ValueError, TypeError) as e:
+        raise BadRequest(f"invalid cursor: {e}") from None
+
+
+def _number(name, value):
+    try:
+        return float(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be a number") from None
+
+
+def _day(name, value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an ISO date (YYYY-MM-DD)") from None
+
+
+def parse_query(query_string):
+    """Validate a /listings query string into `get_listings_page` arguments.
+
+    Returns:
+        tuple: (arguments dict, cache key). Equivalent queries share a
+        key whatever their parameter order.
+    """
+    values = parse_qs(query_string, keep_blank_values=False)
+    unknown = sorted(set(values) - set(FILTERS))
+    if unknown:
+        raise BadRequest(f"unknown parameter(s): {', '.join(unknown)}")
+    value = {name: items[-1] for name, items in values.items()}
+
+    try:
+        limit = int(value.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest("limit must be an integer") from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f"limit must be between 1 and {MAX_LIMIT}")
+
+    arguments = {
+        "source": value.get("source"),
+        "category": value.get("category"),
+        "min_price": _number("min_price", value["min_price"]) if "min_price" in value else None,
+        "max_price": _number("max_price", value["max_price"]) if "max_price" in value else None,
+        "since": _day("since", value["since"]) if "since" in value else None,
+        "until": _day("until", value["until"]) if "until" in value else None,
+        "after": decode_cursor(value["cursor"]) if "cursor" in value else None,
+        "limit": limit,
+        "include_removed": value.get("include_removed", "").lower() in ("1", "true", "yes"),
+    }
+    key = "&".join(f"{name}={value[name]}" for name in sorted(value))
+    return arguments, key
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def render_page(page):
+    """Serialise a `get_listings_page` result; returns (etag, body)."""
+    body = json.dumps({
+        "listings": page["rows"],
+        "next": encode_cursor(page["next"]) if page["next"] else None,
+    }, default=_json_default, separators=(",", ":")).encode("utf-8")
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"', body
+
+
+# ---------------- SERVER ---------------- #
+
+class QueryServer(ThreadingHTTPServer):
+    """Serves the query API from `connect`ed databases; `start` also starts the invalidation listener."""
+
+    daemon_threads = True
+
+    def __init__(self, port=PORT, host="127.0.0.1", connect=db_utils.get_connection,
+                 pool_size=POOL_SIZE, cache_ttl=CACHE_TTL, cache_size=CACHE_SIZE):
+        super().__init__((host, port), _Handler)
+        self.pool = ConnectionPool(connect, pool_size)
+        self.cache = ResponseCache(cache_ttl, cache_size)
+        self.started = time.time()
+        self._stopping = False
+
+    def url(self, path=""):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/{path.lstrip('/')}"
+
+    def start(self, listen=True):
+        threading.Thread(target=self.serve_forever, name="query-api", daemon=True).start()
+        if listen:
+            threading.Thread(target=self._listen, name="query-api-invalidation", daemon=True).start()
+        print(f"🔎 Query API on {self.url('listings')}")
+        return self
+
+    def stop(self):
+        self._stopping = True
+        self.shutdown()
+        self.server_close()
+        self.pool.close()
+
+    def _listen(self):
+        # Without the listener the cache still expires after its TTL
+        while not self._stopping:
+            try:
+                db_utils.listen_listing_events(self.cache.invalidate, timeout=1.0,
+                                               should_stop=lambda: self._stopping,
+                                               channel=db_utils.CRAWLS_CHANNEL)
+            except Exception as e:
+                print(f"⚠️ Cache invalidation listener failed, retrying: {e}")
+                time.sleep(5)
+
+    def listings(self, query_string):
+        """Return (etag, body) for a /listings query, from the cache when possible."""
+        arguments, key = parse_query(query_string)
+        cached = self.cache.get(key)
+        if cached:
+            return cached
+
+        generation = self.cache.generation
+        with self.pool.connection() as conn:
+            page = db_utils.get_listings_page(conn, **arguments)
+        etag, body = render_page(page)
+        self.cache.put(key, etag, body, generation)
+        return etag, body
+
+    def health(self):
+        return {"uptime_s": round(time.time() - self.started), "cache": self.cache.snapshot()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: QueryServer
+    # Keep-alive: load balancers and scripts reuse their connections
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients wait out a delayed ACK (~40 ms) on every response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        try:
+            if path == "/listings":
+                etag, body = self.server.listings(parts.query)
+            elif path == "/health":
+                body = json.dumps(self.server.health()).encode("utf-8")
+                return self._send(200, body)
+            else:
+                return self._send(404, b'{"error":"not found"}')
+        except BadRequest as e:
+            return self._send(400, json.dumps({"error": str(e)}).encode("utf-8"))
+        except Exception as e:
+            print(f"❌ Query failed for {self.path}: {e}")
+            return self._send(500, b'{"error":"query failed"}')
+
+        tags = _etags(self.headers.get("If-None-Match"))
+        if etag in tags or "*" in tags:
+            return self._send(304, b"", etag)
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            # Clients may keep the response but must revalidate it with If-None-Match
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Hundreds of requests a second would drown everything else
+        pass
+
+
+def _etags(header):
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve read-only listing queries over HTTP.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL, metavar="S",
+                        help=f"seconds a cached response may be served (default: {CACHE_TTL:g})")
+    args = parser.parse_args(argv)
+
+    server = QueryServer(args.port, args.host, cache_ttl=args.cache_ttl).start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Utilities.replay_async
+
+Record/replay of a run's network traffic for offline, repeatable runs.
+
+Recording uses Playwright's HAR recorder (`record_har_path` on the
+context, see `get_page`). Replay serves the HAR back with
+`route_from_har` and aborts anything that was not recorded, so a
+replayed run never reaches the live sites. Latency can be injected in
+front of every response: a fixed delay plus seeded jitter, or the time
+each request took when it was recorded.
+
+Use case:
+    pw, browser, context, page = await get_page(record_har="recordings/msa.har.zip")
+    ...
+    pw, browser, context, page = await get_page(replay_har="recordings/msa.har.zip",
+                                                latency_ms=50, jitter_ms=20)
+"""
+
+import asyncio
+import json
+import random
+import weakref
+import zipfile
+
+# Contexts recording to or replaying from a HAR (see `uses_har`)
+_har_contexts = weakref.WeakSet()
+
+
+def mark_har(context):
+    """Note that `context` records to or replays from a HAR."""
+    _har_contexts.add(context)
+
+
+def uses_har(context):
+    """True when `context` records or replays a HAR.
+
+    Use case: `APIRequestContext` traffic (`page.request`) bypasses both,
+    so callers fall back to fetching through the page instead.
+    """
+    return context in _har_contexts
+
+
+def har_timings(har_path):
+    """Map (method, url) to the total time in ms the request took when recorded."""
+    if zipfile.is_zipfile(har_path):
+        with zipfile.ZipFile(har_path) as archive:
+            har = json.loads(archive.read("har.har"))
+    else:
+        with open(har_path, encoding="utf-8") as f:
+            har = json.load(f)
+
+    return {
+        (entry["request"]["method"], entry["request"]["url"]): max(0.0, entry.get("time") or 0.0)
+        for entry in har["log"]["entries"]
+    }
+
+
+async def install_replay(context, har_path, latency_ms=0.0, jitter_ms=0.0,
+                         recorded_latency=False, seed=0):
+    """Serve `context`'s requests from `har_path`, optionally with added latency.
+
+    Args:
+        latency_ms / jitter_ms: fixed delay plus a uniform random extra,
+            drawn from a `seed`ed generator so repeated runs see the same
+            sequence of delays.
+        recorded_latency: replay each response after the time it took
+            when recorded instead.
+    """
+    await context.route_from_har(har_path, not_found="abort")
+    mark_har(context)
+
+    if not (latency_ms or jitter_ms or recorded_latency):
+        return
+
+    timings = har_timings(har_path) if recorded_latency else {}
+    rng = random.Random(seed)
+
+    async def delay(route):
+        request = route.request
+        if recorded_latency:
+            ms = timings.get((request.method, request.url), 0.0)
+        else:
+            ms = latency_ms + rng.uniform(0, jitter_ms)
+        if ms > 0:
+            await asyncio.sleep(ms / 1000)
+        await route.fallback()
+
+    # Routes run in reverse registration order: delay first, then the HAR router
+    await context.route("**/*", delay)
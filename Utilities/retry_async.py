@@ -0,0 +1,215 @@
+"""Utilities.retry_async
+
+Retries, backoff and per-host circuit breaking for navigations and fetches.
+
+Failures are classified (timeout, dns, connection, not_found, throttled,
+server, other). Transient kinds are retried with jittered exponential
+backoff until a time budget runs out. Each host has a `CircuitBreaker`
+that opens after repeated failures, so callers fail fast instead of
+waiting out one timeout after another. Outcomes are counted per call
+site in `OUTCOMES`.
+"""
+
+import asyncio
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from Utilities.navigation_async import NAV_TIMEOUT, fetch, goto
+
+# Kinds worth another attempt; not_found and other are final
+RETRYABLE = {"timeout", "dns", "connection", "throttled", "server"}
+
+# (call_site, outcome) -> count; outcome is "ok" or an error kind
+OUTCOMES = Counter()
+
+_breakers = {}
+
+
+class NavigationError(Exception):
+    """A classified navigation/fetch failure.
+
+    Attributes:
+        kind: failure class, e.g. "timeout" or "not_found".
+        url: the URL that failed.
+        status: HTTP status when the failure came from a response.
+    """
+
+    def __init__(self, kind, url, status=None, cause=None):
+        self.kind = kind
+        self.url = url
+        self.status = status
+        detail = f"HTTP {status}" if status else (str(cause).splitlines()[0] if cause else "")
+        super().__init__(f"{kind} for {url}" + (f": {detail}" if detail else ""))
+
+
+class CircuitOpenError(NavigationError):
+    """Raised without trying when the host's breaker is open."""
+
+    def __init__(self, url, retry_in):
+        super().__init__("circuit_open", url)
+        self.retry_in = retry_in
+
+
+def classify_status(status):
+    """Map an HTTP status to an error kind, or None for success."""
+    if status in (404, 410):
+        return "not_found"
+    if status == 429:
+        return "throttled"
+    if status >= 500:
+        return "server"
+    return None
+
+
+def classify_exception(e):
+    """Map an exception raised by Playwright (or asyncio) to an error kind."""
+    if isinstance(e, NavigationError):
+        return e.kind
+    message = str(e)
+    if isinstance(e, asyncio.TimeoutError) or "Timeout" in type(e).__name__ or "ERR_TIMED_OUT" in message:
+        return "timeout"
+    if "ERR_NAME_NOT_RESOLVED" in message or "ENOTFOUND" in message or "EAI_AGAIN" in message:
+        return "dns"
+    if "ERR_CONNECTION" in message or "ECONNRESET" in message or "ECONNREFUSED" in message:
+        return "connection"
+    return "other"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one host.
+
+    Opens after `threshold` failures in a row and rejects calls for
+    `cooldown` seconds, then lets one trial call through (half-open).
+    A failed trial re-opens it with double the cooldown, up to
+    `max_cooldown`; any success closes it.
+    """
+
+    def __init__(self, threshold=5, cooldown=15.0, max_cooldown=300.0):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.opened_until = 0.0
+        self._trial_running = False
+
+    def check(self, url):
+        now = time.monotonic()
+        if self.failures >= self.threshold:
+            if now < self.opened_until or self._trial_running:
+                raise CircuitOpenError(url, max(0.0, self.opened_until - now))
+            self._trial_running = True
+
+    def record_success(self):
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_running:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        self._trial_running = False
+        if self.failures >= self.threshold:
+            self.opened_until = time.monotonic() + self.cooldown
+            print(f"⚠️ Circuit open for {self.cooldown:.0f}s after {self.failures} failures")
+
+
+def get_breaker(url):
+    host = urlsplit(url).netloc or url
+    if host not in _breakers:
+        _breakers[host] = CircuitBreaker()
+    return _breakers[host]
+
+
+async def with_retries(attempt, url, call_site, budget=60.0, base_delay=0.5, max_delay=8.0):
+    """Run `attempt(timeout_ms)` until it succeeds, fails for good or the budget ends.
+
+    Args:
+        attempt: coroutine function taking the per-attempt timeout in ms.
+        url: used for the host's circuit breaker and error messages.
+        call_site: label the outcome is counted under.
+        budget: seconds available across all attempts and backoff sleeps.
+
+    Raises:
+        NavigationError: the last classified failure.
+    """
+    breaker = get_breaker(url)
+    deadline = time.monotonic() + budget
+    retry = 0
+
+    while True:
+        try:
+            breaker.check(url)
+        except CircuitOpenError:
+            OUTCOMES[(call_site, "circuit_open")] += 1
+            raise
+
+        remaining = deadline - time.monotonic()
+        try:
+            result = await attempt(int(max(1.0, min(NAV_TIMEOUT / 1000, remaining)) * 1000))
+        except Exception as e:
+            kind = classify_exception(e)
+            error = e if isinstance(e, NavigationError) else NavigationError(kind, url, cause=e)
+        else:
+            breaker.record_success()
+            OUTCOMES[(call_site, "ok")] += 1
+            return result
+
+        # A missing page is still an answer from a healthy host
+        if error.kind == "not_found":
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** retry))
+        if error.kind not in RETRYABLE or time.monotonic() + delay >= deadline:
+            OUTCOMES[(call_site, error.kind)] += 1
+            raise error
+
+        OUTCOMES[(call_site, "retry")] += 1
+        retry += 1
+        await asyncio.sleep(delay)
+
+
+async def navigate(page, url, call_site, budget=60.0, wait_until="domcontentloaded"):
+    """`goto` with retries; 404/410 raise NavigationError("not_found") at once.
+
+    Use case: every page load in the Pages classes, e.g.
+        await navigate(self.page, link, "motorsport.detail")
+    """
+    async def attempt(timeout):
+        response = await goto(page, url, timeout=timeout, wait_until=wait_until)
+        kind = classify_status(response.status) if response is not None else None
+        if kind:
+            raise NavigationError(kind, url, status=response.status)
+        return response
+
+    return await with_retries(attempt, url, call_site, budget=budget)
+
+
+async def fetch_with_retries(request, method, url, call_site, budget=20.0, **kwargs):
+    """`fetch` with retries on throttling/5xx/network errors.
+
+    Unlike `navigate`, 404/410 responses are returned (callers such as
+    the liveness sweep treat them as an answer, not a failure).
+    """
+    async def attempt(timeout):
+        response = await fetch(request, method, url, timeout=timeout, **kwargs)
+        kind = classify_status(response.status)
+        if kind in RETRYABLE:
+            await response.dispose()
+            raise NavigationError(kind, url, status=response.status)
+        return response
+
+    return await with_retries(attempt, url, call_site, budget=budget)
+
+
+def outcome_counts():
+    """Return OUTCOMES as {call_site: {outcome: count}}."""
+    report = {}
+    for (call_site, outcome), count in sorted(OUTCOMES.items()):
+        report.setdefault(call_site, {})[outcome] = count
+    return report
@@ -0,0 +1,297 @@
+"""Utilities.scheduler_async
+
+Long-running revisit scheduler: re-crawls each category (or whole site)
+on its own adaptive interval under a global navigation budget.
+
+Each target keeps an EWMA of its change rate, i.e. new listing IDs plus
+price changes per hour, measured by diffing a visit against the previous
+one. The next visit is due once about `TARGET_CHANGES` changes are
+expected, clamped between `MIN_INTERVAL` and `MAX_INTERVAL`, so a
+churning category comes back within hours while a quiet one drifts
+towards a day. When several targets are due, the one with the most
+expected changes per navigation goes first, and visits wait while the
+last hour's navigations would exceed the budget.
+
+State lives in the `revisit_targets` table, so a restarted daemon picks
+up where it left off. Every timestamp in it comes from the database
+clock (`db_utils.db_now`), so daemons on several machines agree on what
+is due.
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import timedelta
+
+from psycopg2.extras import Json, RealDictCursor
+
+from Utilities import db_utils
+from Utilities.throttle_async import configure_host, get_limiter
+
+# Bounds for the adaptive interval, in seconds
+MIN_INTERVAL = 15 * 60
+MAX_INTERVAL = 24 * 3600
+
+# Interval between the first (baseline) visit and the first measured one
+INITIAL_INTERVAL = 60 * 60
+
+# Changes a visit should find on average
+TARGET_CHANGES = 3.0
+
+# EWMA weight of the latest change-rate observation
+RATE_ALPHA = 0.3
+
+# Navigation cost assumed for a target never visited
+DEFAULT_NAV_COST = 50.0
+
+
+def create_schedule_table():
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS revisit_targets (
+            target TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            category TEXT,
+
+            change_rate DOUBLE PRECISION NOT NULL DEFAULT 0,
+            nav_cost DOUBLE PRECISION,
+            visits INT NOT NULL DEFAULT 0,
+            snapshot JSONB,
+
+            last_visit_at TIMESTAMP,
+            next_due_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def site_targets(site_cls):
+    """Return (target, source, category) rows: one per category, else one per site."""
+    categories = getattr(site_cls, "CATEGORIES", None)
+    if categories and hasattr(site_cls, "collect_categorized_data"):
+        return [(f"{site_cls.SOURCE}:{c}", site_cls.SOURCE, c) for c in categories]
+    return [(site_cls.SOURCE, site_cls.SOURCE, None)]
+
+
+def register_targets(targets):
+    """Insert targets that are not scheduled yet; existing state is kept."""
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    for target, source, category in targets:
+        cur.execute("""
+            INSERT INTO revisit_targets (target, source, category)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (target) DO NOTHING;
+        """, (target, source, category))
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def load_targets(sources):
+    conn = db_utils.get_connection()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    cur.execute("""
+        SELECT target, source, category, change_rate, nav_cost, visits,
+               snapshot, last_visit_at, next_due_at
+        FROM revisit_targets
+        WHERE source = ANY(%s);
+    """, (list(sources),))
+    rows = cur.fetchall()
+
+    cur.close()
+    conn.close()
+    return rows
+
+
+def next_interval(change_rate):
+    """Seconds until `TARGET_CHANGES` changes are expected at `change_rate` per hour."""
+    if change_rate <= 0:
+        return MAX_INTERVAL
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, TARGET_CHANGES / change_rate * 3600))
+
+
+def diff_snapshot(previous, items):
+    """Count new IDs and price changes against the previous visit.
+
+    Returns:
+        tuple: (changes, snapshot) where snapshot maps id -> price.
+    """
+    snapshot = {item["id"]: item.get("price") for item in items if item.get("id")}
+    if previous is None:
+        return 0, snapshot
+
+    changes = sum(
+        1 for unique_id, price in snapshot.items()
+        if unique_id not in previous or previous[unique_id] != price
+    )
+    return changes, snapshot
+
+
+def record_visit(target, items, navigations, visited_at):
+    """Fold one visit into the target's change rate and schedule the next one.
+
+    Returns:
+        dict: the changes seen and the chosen interval in seconds.
+    """
+    changes, snapshot = diff_snapshot(target["snapshot"], items)
+
+    if target["snapshot"] is None or target["last_visit_at"] is None:
+        # Baseline visit: nothing to compare with yet
+        change_rate = target["change_rate"]
+        interval = INITIAL_INTERVAL
+    else:
+        hours = max((visited_at - target["last_visit_at"]).total_seconds() / 3600, 1e-3)
+        change_rate = RATE_ALPHA * (changes / hours) + (1 - RATE_ALPHA) * target["change_rate"]
+        interval = next_interval(change_rate)
+
+    nav_cost = navigations if target["nav_cost"] is None else 0.5 * target["nav_cost"] + 0.5 * navigations
+
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE revisit_targets
+        SET change_rate = %s, nav_cost = %s, visits = visits + 1, snapshot = %s,
+            last_visit_at = %s, next_due_at = %s
+        WHERE target = %s;
+    """, (change_rate, nav_cost, Json(snapshot), visited_at,
+          visited_at + timedelta(seconds=interval), target["target"]))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    return {"changes": changes, "change_rate": round(change_rate, 3), "interval": round(interval)}
+
+
+def postpone(target, seconds=MIN_INTERVAL):
+    """Push a failed target back without touching its change rate."""
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE revisit_targets SET next_due_at = NOW() + make_interval(secs => %s)
+        WHERE target = %s;
+    """, (seconds, target["target"]))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def priority(target, now):
+    """Expected changes waiting per navigation spent; unvisited targets go first."""
+    if target["last_visit_at"] is None:
+        return float("inf")
+    hours = (now - target["last_visit_at"]).total_seconds() / 3600
+    return target["change_rate"] * hours / (target["nav_cost"] or DEFAULT_NAV_COST)
+
+
+class NavigationBudget:
+    """Sliding one-hour window of navigations spent."""
+
+    def __init__(self, per_hour):
+        self.per_hour = per_hour
+        self._spent = deque()  # (monotonic time, navigations)
+
+    def used(self):
+        cutoff = time.monotonic() - 3600
+        while self._spent and self._spent[0][0] < cutoff:
+            self._spent.popleft()
+        return sum(n for _, n in self._spent)
+
+    async def wait_for(self, cost):
+        # A visit dearer than the whole budget still runs once the window is empty
+        while self._spent and self.used() + min(cost, self.per_hour) > self.per_hour:
+            await asyncio.sleep(max(1.0, self._spent[0][0] + 3600 - time.monotonic()))
+
+    def spend(self, navigations):
+        self._spent.append((time.monotonic(), navigations))
+
+
+async def _visit(site, target):
+    if target["category"]:
+        items = await site.collect_categorized_data(target["category"])
+        site.persist(items, target["category"])
+        return items
+
+    await site.open()
+    return await site.collect() or []
+
+
+async def run_scheduler(site_classes, nav_budget=600, headless=True, should_stop=None):
+    """Revisit the sites' targets forever (or until `should_stop()` is true).
+
+    Use case:
+        await run_scheduler([MotorsportAuctions], nav_budget=600)
+
+    Args:
+        site_classes: page-object classes to schedule.
+        nav_budget: navigations (page loads and throttled clicks) per hour
+            across all targets.
+    """
+    # Imported here so the schedule helpers work without Playwright installed
+    from Utilities.browser_async import get_page
+
+    create_schedule_table()
+    for site_cls in site_classes:
+        register_targets(site_targets(site_cls))
+
+    budget = NavigationBudget(nav_budget)
+    pw, browser, context, page = await get_page(headless=headless)
+
+    try:
+        sites = {}
+        for site_cls in site_classes:
+            sites[site_cls.SOURCE] = site_cls(page)
+            configure_host(site_cls.homeLink, **getattr(site_cls, "THROTTLE", {}))
+
+        while not (should_stop and should_stop()):
+            now = db_utils.db_now()
+            targets = load_targets(sites)
+            due = [t for t in targets if t["next_due_at"] <= now]
+
+            if not due:
+                soonest = min(t["next_due_at"] for t in targets)
+                await asyncio.sleep(min(300.0, max(1.0, (soonest - now).total_seconds())))
+                continue
+
+            target = max(due, key=lambda t: priority(t, now))
+            await budget.wait_for(target["nav_cost"] or DEFAULT_NAV_COST)
+
+            site = sites[target["source"]]
+            # Every page load and throttled click passes through the host's limiter
+            limiter = get_limiter(site.homeLink)
+            before = sum(limiter.stats.values())
+            visited_at = db_utils.db_now()
+            try:
+                items = await _visit(site, target)
+            except Exception as e:
+                print(f"❌ Visit to {target['target']} failed: {e}")
+                postpone(target)
+                continue
+            finally:
+                navigations = sum(limiter.stats.values()) - before
+                budget.spend(navigations)
+
+            if not items:
+                # Collectors swallow their own errors; an empty visit is a blip, not a
+                # category that emptied, and must not reset the snapshot
+                print(f"⚠️ Visit to {target['target']} found nothing; trying again later")
+                postpone(target)
+                continue
+
+            result = record_visit(target, items, navigations, visited_at)
+            db_utils.refresh_summaries()
+            print(f"🔁 {target['target']}: {len(items)} items, {result['changes']} changes, "
+                  f"{navigations} navigations; next in {result['interval'] / 60:.0f} min "
+                  f"({budget.used()}/{nav_budget} navigations this hour)")
+    finally:
+        await context.close()
+        await browser.close()
+        await pw.stop()
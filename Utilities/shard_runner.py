@@ -0,0 +1,273 @@
+"""Utilities.shard_runner
+
+Run a crawl across several processes, each with its own Chromium.
+
+The parent splits the work into shards, hands them to a spawn-based
+process pool and is the only process that writes to the database:
+listing, detail and sitemap results come back to it and go through
+the site's `persist` method. A whole-site `collect` shard writes only
+its own Excel file, which no other shard shares.
+
+Sharding:
+    - sites with `CATEGORIES` and `collect_category_listing` are crawled
+      in two phases: one listing shard per category, then the
+      de-duplicated ads split into one contiguous detail range per worker;
+    - sitemap sites (`collect_changes`) fetch over plain HTTP in a single
+      `changes` shard, whose records and skipped ids the parent stores;
+    - other sites paginate by clicking, so each is a single `collect` shard.
+
+Every shard on a host gets an equal share of the site's `THROTTLE`
+limits, so N workers together stay within one process's per-host budget.
+
+Use case:
+    report = await run_sharded([MotorsportAuctions, RallyCarsForSale], workers=8)
+    sys.exit(1 if report["failed"] else 0)
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from Utilities import db_utils, metrics, page_archive, profiler
+from Utilities.listing_registry import ListingRegistry
+from Utilities.liveness_async import sweep_stale_listings
+from Utilities.retry_async import outcome_counts
+from Utilities.throttle_async import DEFAULT_LIMITS, configure_host, snapshot
+
+
+def _scaled_limits(limits, share):
+    # Split one host's budget between `share` processes crawling it at once
+    scaled = {**DEFAULT_LIMITS, **limits}
+    for key in ("rate", "min_rate", "max_rate"):
+        scaled[key] = scaled[key] / share
+    for key in ("burst", "max_concurrency"):
+        scaled[key] = max(1, scaled[key] // share)
+    return scaled
+
+
+def _is_categorised(site_cls):
+    return hasattr(site_cls, "CATEGORIES") and hasattr(site_cls, "collect_category_listing")
+
+
+def _collects_changes(site_cls):
+    return hasattr(site_cls, "collect_changes")
+
+
+def _split(items, parts):
+    # Contiguous, near-equal ranges; never more ranges than items
+    size = math.ceil(len(items) / max(1, parts)) or 1
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ---------------- WORKER ---------------- #
+
+def run_shard(shard):
+    """Process-pool entry point: run one shard in a fresh event loop."""
+    return asyncio.run(_run_shard(shard))
+
+
+async def _run_shard(shard):
+    # Imported here so the parent never loads Playwright's browser helpers
+    from Utilities.browser_async import get_page
+
+    site_cls = shard["site"]
+    result = {
+        "shard": shard["name"],
+        "source": site_cls.SOURCE,
+        "task": shard["task"],
+        "items": [],
+        "error": None,
+        "pid": os.getpid(),
+    }
+    started = time.monotonic()
+    pw = browser = context = None
+
+    if shard.get("archive"):
+        page_archive.enable(shard["archive"])
+    if shard.get("profile"):
+        profiler.enable()
+
+    try:
+        pw, browser, context, page = await get_page(headless=shard["headless"])
+        site = site_cls(page)
+        configure_host(site.homeLink, **_scaled_limits(getattr(site, "THROTTLE", {}), shard["share"]))
+
+        if shard["task"] == "listing":
+            result["items"] = await site.collect_category_listing(shard["category"])
+        elif shard["task"] == "details":
+            items = shard["items"]
+            await site.gather_detailed_data(items)
+            result["items"] = items
+        elif shard["task"] == "changes":
+            await site.open()
+            result["items"], result["unchanged"] = await site.collect_changes()
+        else:
+            await site.open()
+            result["items"] = await site.collect() or []
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        for closer in (context, browser):
+            if closer is not None:
+                try:
+                    await closer.close()
+                except Exception:
+                    pass
+        if pw is not None:
+            await pw.stop()
+
+    result["seconds"] = round(time.monotonic() - started, 2)
+    result["hosts"] = snapshot()
+    result["outcomes"] = outcome_counts()
+    result["metrics"] = metrics.snapshot()
+    result["profile"] = profiler.snapshot()
+    return result
+
+
+# ---------------- PARENT ---------------- #
+
+def _shards(site_cls, task, units, headless, workers, **extra):
+    # One host's shards share its budget only while they can run side by side
+    share = max(1, min(workers, len(units)))
+    return [
+        {"site": site_cls, "task": task, "name": f"{site_cls.SOURCE}.{task}.{i}",
+         "headless": headless, "share": share, **extra, **unit}
+        for i, unit in enumerate(units)
+    ]
+
+
+def _persist(site_cls, items, category=None):
+    site = site_cls(None)
+    if items and hasattr(site, "persist"):
+        site.persist(items, category)
+
+
+async def _drain(pool, shards, report):
+    loop = asyncio.get_running_loop()
+
+    async def submit(shard):
+        try:
+            return await loop.run_in_executor(pool, run_shard, shard)
+        except Exception as e:
+            # The worker process itself died (crash, OOM kill)
+            return {"shard": shard["name"], "source": shard["site"].SOURCE, "task": shard["task"],
+                    "items": [], "error": f"worker died: {type(e).__name__}: {e}",
+                    "seconds": None, "hosts": {}, "outcomes": {}}
+
+    remaining = len(shards)
+    metrics.QUEUE_DEPTH.set(remaining, "shards")
+    for future in asyncio.as_completed([submit(shard) for shard in shards]):
+        result = await future
+        remaining -= 1
+        metrics.merge(result.get("metrics"))
+        profiler.merge(result.get("profile"))
+        metrics.QUEUE_DEPTH.set(remaining, "shards")
+
+        report["shards"].append({k: result[k] for k in ("shard", "task", "error", "seconds")}
+                                | {"items": len(result["items"])})
+        for call_site, counts in result["outcomes"].items():
+            report["outcomes"].setdefault(call_site, Counter()).update(counts)
+        for host, stats in result["hosts"].items():
+            report["hosts"].setdefault(host, Counter()).update(
+                {k: v for k, v in stats.items() if k in ("rate", "ok", "throttled", "error", "timeout")}
+            )
+
+        if result["error"]:
+            # Partial results are dropped: half-enriched items must not overwrite stored rows
+            report["failed"] += 1
+            report["failed_sources"].add(result["source"])
+            print(f"❌ Shard {result['shard']} failed: {result['error']}")
+            continue
+
+        print(f"✅ Shard {result['shard']}: {len(result['items'])} items in {result['seconds']}s")
+        yield result
+
+
+async def run_sharded(site_classes, workers=None, headless=True, sweep=True, archive=None,
+                      profile=False):
+    """Crawl `site_classes` with a pool of `workers` browser processes.
+
+    Args:
+        site_classes: page-object classes, e.g. [MotorsportAuctions].
+        workers: process count; defaults to the number of CPUs.
+        headless: passed to each worker's `get_page`.
+        archive: archive directory each worker captures pages into (see
+            Utilities.page_archive), or None.
+        profile: time each worker's Playwright calls (see Utilities.profiler)
+            and merge them into this process's profile.
+        sweep: run the liveness sweep for each site once its writes land.
+
+    Returns:
+        dict: per-shard results, summed host stats and navigation
+        outcomes, detail navigations saved by de-duplicating the
+        listings, and `failed`, the number of shards that raised.
+    """
+    workers = workers or os.cpu_count() or 1
+    # From the database clock, which stamps last_seen_at
+    crawl_started = db_utils.db_now()
+    report = {"workers": workers, "shards": [], "hosts": {}, "outcomes": {}, "failed": 0,
+              "saved_navigations": 0,
+              "failed_sources": set()}
+
+    by_source = {site_cls.SOURCE: site_cls for site_cls in site_classes}
+    listings = {}
+    first_phase = []
+    for site_cls in site_classes:
+        configure_host(site_cls.homeLink, **getattr(site_cls, "THROTTLE", {}))
+        if _is_categorised(site_cls):
+            listings[site_cls.SOURCE] = ListingRegistry()
+            first_phase += _shards(site_cls, "listing",
+                                   [{"category": c} for c in site_cls.CATEGORIES], headless, workers,
+                                   archive=archive, profile=profile)
+        elif _collects_changes(site_cls):
+            first_phase += _shards(site_cls, "changes", [{}], headless, workers,
+                                   archive=archive, profile=profile)
+        else:
+            first_phase += _shards(site_cls, "collect", [{}], headless, workers,
+                                   archive=archive, profile=profile)
+
+    # Spawn, not fork: each worker starts its own event loop and Playwright driver
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        async for result in _drain(pool, first_phase, report):
+            if result["task"] == "listing":
+                # The same ad can sit in several categories; crawl its details once
+                for item in result["items"]:
+                    listings[result["source"]].register(item)
+            elif result["task"] == "changes":
+                by_source[result["source"]](None).store_changes(result["items"], result["unchanged"])
+
+        second_phase = []
+        for source, registry in listings.items():
+            report["saved_navigations"] += registry.duplicates
+            # Each duplicate is a detail page no shard has to load
+            metrics.record_dedupe(source, {**registry.report(), "saved_navigations": registry.duplicates})
+            ranges = _split(registry.items(), workers)
+            second_phase += _shards(by_source[source], "details",
+                                    [{"items": items} for items in ranges], headless, workers,
+                                    archive=archive, profile=profile)
+
+        async for result in _drain(pool, second_phase, report):
+            _persist(by_source[result["source"]], result["items"])
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    if sweep:
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as pw:
+            for site_cls in site_classes:
+                # A site with missing shards would see its unvisited listings as stale
+                if site_cls.SOURCE in report["failed_sources"]:
+                    continue
+                await sweep_stale_listings(pw, site_cls.SOURCE, crawl_started,
+                                           removed_markers=getattr(site_cls, "REMOVED_MARKERS", ()))
+
+    report["outcomes"] = {k: dict(v) for k, v in report["outcomes"].items()}
+    report["hosts"] = {k: dict(v) for k, v in report["hosts"].items()}
+    report["failed_sources"] = sorted(report["failed_sources"])
+    return report
@@ -0,0 +1,612 @@
+"""Utilities.sitemap_async
+
+Sitemap-driven listing collection over plain HTTP.
+
+Some sites publish every advert in their XML sitemaps, so listings can
+be discovered without clicking through result pages. `SitemapSite` finds
+the sitemaps in robots.txt (falling back to `SITEMAP_URLS`), follows
+sitemap indexes, and parses each sitemap incrementally. Gzipped
+sitemaps are inflated in chunks, so a 50k-URL sitemap is never held as
+a parsed tree. URLs matching `LISTING_URL_PATTERN` whose `lastmod` is
+unchanged since the last run are skipped. The rest are fetched
+concurrently through one pooled `APIRequestContext` and paced by the
+per-host limiters. Their fields come from the JSON-LD, OpenGraph and
+microdata the page declares, with no browser rendering.
+
+`sitemap_lastmods` remembers the lastmod of every listing URL stored.
+
+Use case:
+    class RaceCarsDirect(SitemapSite):
+        homeLink = "https://www.racecarsdirect.com/"
+        SOURCE = "racecarsdirect"
+        LISTING_URL_PATTERN = re.compile(r"/Advert/Details/\\d+")
+
+    site = RaceCarsDirect(page)
+    await site.open()
+    items = await site.collect()
+"""
+
+import asyncio
+import json
+import re
+import time
+import zlib
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+from psycopg2.extras import execute_values
+
+from Utilities import db_utils, metrics
+from Utilities.id_utils import generate_listing_id
+from Utilities.normalise import normalise_date, normalise_items
+from Utilities.output import as_excel
+from Utilities.retry_async import fetch_with_retries
+
+# Detail pages in flight per site; each host's limiter paces them further
+CONCURRENCY = 8
+
+# Bytes fed to the XML parser at a time
+CHUNK_SIZE = 64 * 1024
+
+# Nested sitemap indexes followed before giving up (guards against loops)
+MAX_SITEMAP_DEPTH = 3
+
+CURRENCY_SYMBOLS = {"GBP": "£", "EUR": "€", "USD": "$"}
+
+# JSON-LD types that describe the advertised item
+LISTING_TYPES = {"Product", "Vehicle", "Car", "Motorcycle", "IndividualProduct", "Offer"}
+
+# Elements whose end starts a new line in captured text
+_BLOCK_TAGS = {"p", "div", "li", "br", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+_VOID_TAGS = {"img", "br", "hr", "input", "link", "meta", "source"}
+
+
+# 🧱 CREATE TABLE
+def create_sitemap_table():
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sitemap_lastmods (
+            source TEXT NOT NULL,
+            url TEXT NOT NULL,
+            lastmod TEXT,
+            fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, url)
+        );
+    """)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def load_lastmods(source):
+    """Return {url: lastmod} for the listings of `source` stored so far."""
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT url, lastmod FROM sitemap_lastmods WHERE source = %s;", (source,))
+    known = dict(cur.fetchall())
+
+    cur.close()
+    conn.close()
+    return known
+
+
+def store_lastmods(source, entries):
+    """Remember the lastmod of each (url, lastmod) fetched and stored this run."""
+    if not entries:
+        return
+
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    execute_values(cur, """
+        INSERT INTO sitemap_lastmods (source, url, lastmod)
+        VALUES %s
+        ON CONFLICT (source, url) DO UPDATE
+        SET lastmod = EXCLUDED.lastmod,
+            fetched_at = CURRENT_TIMESTAMP;
+    """, [(source, url, lastmod) for url, lastmod in entries])
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+# ---------------- SITEMAPS ---------------- #
+
+def parse_sitemap(data):
+    """Yield ("sitemap" | "url", loc, lastmod) from sitemap XML, gzipped or not.
+
+    Elements are cleared as soon as they are read, so memory stays flat
+    however many URLs the sitemap lists.
+    """
+    parser = XMLPullParser(events=("end",))
+    # Sitemaps served as .xml.gz files arrive still gzipped (wbits 47: gzip or zlib header)
+    inflate = zlib.decompressobj(47) if data[:2] == b"\x1f\x8b" else None
+
+    for start in range(0, len(data), CHUNK_SIZE):
+        chunk = data[start:start + CHUNK_SIZE]
+        parser.feed(inflate.decompress(chunk) if inflate else chunk)
+        yield from _sitemap_entries(parser)
+    if inflate:
+        parser.feed(inflate.flush())
+    parser.close()
+    yield from _sitemap_entries(parser)
+
+
+def _sitemap_entries(parser):
+    for _, element in parser.read_events():
+        # Tags arrive as "{namespace}loc"; the namespace varies between generators
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag not in ("url", "sitemap"):
+            continue
+        fields = {child.tag.rsplit("}", 1)[-1]: (child.text or "").strip() for child in element}
+        if fields.get("loc"):
+            yield tag, fields["loc"], fields.get("lastmod") or None
+        element.clear()
+
+
+def sitemaps_from_robots(text, base_url):
+    """Return the absolute sitemap URLs a robots.txt declares."""
+    return [urljoin(base_url, line.split(":", 1)[1].strip())
+            for line in text.splitlines() if line.lower().startswith("sitemap:")]
+
+
+# ---------------- DETAIL PAGES ---------------- #
+
+class _PageFields(HTMLParser):
+    """Collect JSON-LD blocks, meta tags, itemprop values and the text of chosen classes."""
+
+    def __init__(self, text_classes=()):
+        super().__init__(convert_charrefs=True)
+        self.text_classes = set(text_classes)
+        self.meta = {}
+        self.jsonld = []
+        self.itemprops = {}
+        self.texts = {}
+        self.title = ""
+        self._captures = []  # [tag, key, parts, depth] of elements whose text is wanted
+        self._in_jsonld = False
+        self._in_script = False
+        self._in_title = False
+        self._script = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name") or attrs.get("itemprop")
+            if key and attrs.get("content"):
+                self.meta.setdefault(key.lower(), []).append(attrs["content"].strip())
+            return
+        if tag in ("script", "style"):
+            self._in_script = True
+            self._in_jsonld = (attrs.get("type") or "").lower() == "application/ld+json"
+            self._script = []
+            return
+        if tag == "title":
+            self._in_title = True
+
+        for capture in self._captures:
+            if capture[0] == tag:
+                capture[3] += 1
+            elif tag == "br":
+                capture[2].append("\n")
+
+        prop = attrs.get("itemprop")
+        if prop:
+            value = attrs.get("content") or attrs.get("src") or attrs.get("href")
+            if value:
+                self.itemprops.setdefault(prop, []).append(value.strip())
+            elif tag not in _VOID_TAGS:
+                self._captures.append([tag, ("itemprop", prop), [], 1])
+        for cls in (attrs.get("class") or "").split():
+            if cls in self.text_classes and tag not in _VOID_TAGS:
+                self._captures.append([tag, ("class", cls), [], 1])
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            if self._in_jsonld:
+                try:
+                    self.jsonld.append(json.loads("".join(self._script)))
+                except ValueError:
+                    pass
+            self._in_script = self._in_jsonld = False
+            return
+        if tag == "title":
+            self._in_title = False
+
+        for capture in list(self._captures):
+            if capture[0] != tag:
+                if tag in _BLOCK_TAGS:
+                    capture[2].append("\n")
+                continue
+            capture[3] -= 1
+            if capture[3] == 0:
+                self._captures.remove(capture)
+                kind, key = capture[1]
+                text = _collapse("".join(capture[2]))
+                target = self.itemprops if kind == "itemprop" else self.texts
+                if text:
+                    target.setdefault(key, []).append(text)
+
+    def handle_data(self, data):
+        if self._in_script:
+            if self._in_jsonld:
+                self._script.append(data)
+            return
+        if self._in_title:
+            self.title += data
+        for capture in self._captures:
+            capture[2].append(data)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+
+def _collapse(text):
+    # Keep paragraph breaks, collapse the rest of the whitespace
+    lines = (" ".join(line.split()) for line in text.replace("\r\n", "\n").split("\n"))
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _jsonld_nodes(blocks):
+    """Flatten JSON-LD blocks and their @graph lists into a list of dicts."""
+    nodes = []
+    stack = list(blocks)
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            nodes.append(node)
+            stack.extend(node.get("@graph", []))
+    return nodes
+
+
+def _types(node):
+    kind = node.get("@type", [])
+    return set(kind if isinstance(kind, list) else [kind])
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _image_urls(values, base_url):
+    urls = []
+    for value in values:
+        if isinstance(value, dict):
+            value = value.get("url") or value.get("contentUrl")
+        if isinstance(value, str) and value.strip():
+            urls.append(urljoin(base_url, value.strip()))
+    return urls
+
+
+def _format_price(amount, currency):
+    """Render a structured price like the list cards do: ("12500", "GBP") -> "£12,500"."""
+    try:
+        number = float(str(amount).replace(",", ""))
+    except ValueError:
+        return str(amount)
+    text = f"{number:,.0f}" if number == int(number) else f"{number:,.2f}"
+    symbol = CURRENCY_SYMBOLS.get((currency or "").upper())
+    return f"{symbol}{text}" if symbol else f"{text} {currency or ''}".strip()
+
+
+def _address(value):
+    if isinstance(value, str):
+        return value
+    if not isinstance(value, dict):
+        return None
+    if "address" in value:
+        return _address(value["address"])
+    parts = [value.get(k) for k in ("addressLocality", "addressRegion", "addressCountry")]
+    parts = [p.get("name") if isinstance(p, dict) else p for p in parts]
+    return ", ".join(p for p in parts if p) or value.get("name")
+
+
+def listing_fields(html, url, text_classes=()):
+    """Extract a listing's fields from the structured data of its detail page.
+
+    JSON-LD (a Product/Vehicle node and its offer) is preferred, then
+    microdata `itemprop`s, then OpenGraph tags, then the text of the
+    elements whose class is in `text_classes` (keyed by class).
+
+    Returns:
+        dict: title, price, date, description, images, location,
+        category, contact and `texts` (class -> text).
+    """
+    page = _PageFields(text_classes)
+    page.feed(html)
+    page.close()
+
+    nodes = _jsonld_nodes(page.jsonld)
+    item = next((n for n in nodes if _types(n) & (LISTING_TYPES - {"Offer"})), {})
+    offer = next(iter(_as_list(item.get("offers"))), None) or \
+        next((n for n in nodes if "Offer" in _types(n)), {})
+    crumbs = next((n for n in nodes if "BreadcrumbList" in _types(n)), {})
+    meta, props = page.meta, page.itemprops
+
+    def first(*values):
+        for value in values:
+            if isinstance(value, list):
+                value = value[0] if value else None
+            if value not in (None, ""):
+                return value
+        return None
+
+    amount = first(offer.get("price"), props.get("price"), meta.get("product:price:amount"))
+    currency = first(offer.get("priceCurrency"), props.get("priceCurrency"),
+                     meta.get("product:price:currency"))
+    date = first(item.get("datePosted"), item.get("datePublished"), offer.get("validFrom"),
+                 props.get("datePosted"), props.get("datePublished"), meta.get("article:published_time"))
+
+    images = _image_urls(_as_list(item.get("image")) or props.get("image", []) or meta.get("og:image", []), url)
+
+    categories = _as_list(item.get("category"))
+    if not categories and crumbs:
+        names = [(c.get("item", {}).get("name") if isinstance(c.get("item"), dict) else None) or c.get("name")
+                 for c in _as_list(crumbs.get("itemListElement"))]
+        # The last crumb is the advert itself, the first is the home page
+        categories = [n for n in names[1:-1] if n]
+
+    seller = item.get("seller") or offer.get("seller") or {}
+    return {
+        "title": first(item.get("name"), props.get("name"), meta.get("og:title"), _collapse(page.title)),
+        "price": _format_price(amount, currency) if amount not in (None, "") else None,
+        # Structured dates are ISO 8601; normalise_date reads the date part
+        "date": normalise_date(str(date)[:10]) if date else "",
+        "description": _collapse(str(first(item.get("description"), props.get("description"),
+                                            meta.get("og:description"), meta.get("description")) or "")),
+        "images": list(dict.fromkeys(images)),
+        "location": first(_address(offer.get("availableAtOrFrom")), _address(item.get("itemLocation")),
+                          _address(seller) if isinstance(seller, dict) else None, props.get("addressLocality")),
+        "category": [str(c) for c in categories if c],
+        "contact": first(seller.get("telephone") if isinstance(seller, dict) else None, props.get("telephone")),
+        "texts": {cls: "\n\n".join(parts) for cls, parts in page.texts.items()},
+    }
+
+
+# ---------------- SITE ---------------- #
+
+class SitemapSite:
+    """Base page object for sites collected from their sitemaps.
+
+    Subclasses set `homeLink`, `SOURCE`, `OUTPUT_FILE_NAME`,
+    `LISTING_URL_PATTERN` and optionally `SITEMAP_URLS`,
+    `DESCRIPTION_CLASS` (a class whose text is the full description when
+    the structured data only has a summary) and `THROTTLE`, and may
+    override `parse_detail` for fields the structured data lacks.
+
+    Args:
+        page: Playwright page; only its `request` context is used.
+    """
+
+    homeLink = None
+    SOURCE = None
+    OUTPUT_FILE_NAME = None
+    # Listing detail paths, relative to homeLink; everything else in the sitemaps is ignored
+    LISTING_URL_PATTERN = None
+    # Tried when robots.txt declares no sitemap, relative to homeLink
+    SITEMAP_URLS = ("sitemap.xml",)
+    DESCRIPTION_CLASS = None
+    THROTTLE = {"rate": 1.0, "burst": 2, "max_rate": 10.0, "max_concurrency": 8}
+    # Everything goes over page.request, which HAR record/replay does not see
+    USES_BROWSER = False
+
+    def __init__(self, page):
+        self.page = page
+        self.sitemaps = []
+
+    @property
+    def request(self):
+        return self.page.request
+
+    # ---------------- OPEN ---------------- #
+
+    @metrics.timed("open")
+    async def open(self):
+        """Find the site's sitemaps in robots.txt."""
+        robots = urljoin(self.homeLink, "robots.txt")
+        declared = []
+        try:
+            response = await fetch_with_retries(self.request, "GET", robots, f"{self.SOURCE}.robots")
+            if response.status == 200:
+                declared = sitemaps_from_robots(await response.text(), self.homeLink)
+            await response.dispose()
+        except Exception as e:
+            print(f"⚠️ Could not read {robots}: {e}")
+
+        # Only follow sitemaps on the site's own host
+        host = urlsplit(self.homeLink).netloc
+        self.sitemaps = [url for url in declared if urlsplit(url).netloc == host] or \
+            [urljoin(self.homeLink, path) for path in self.SITEMAP_URLS]
+
+    # ---------------- DISCOVER ---------------- #
+
+    async def walk_sitemaps(self):
+        """Return [(url, lastmod)] for every listing URL in the sitemaps, deduplicated."""
+        entries = {}
+        queue = [(url, 0) for url in self.sitemaps]
+        seen = set()
+        # Patterns are written against the path below homeLink
+        root = urlsplit(self.homeLink).path.rstrip("/")
+
+        while queue:
+            sitemap, depth = queue.pop(0)
+            if sitemap in seen:
+                continue
+            seen.add(sitemap)
+            try:
+                response = await fetch_with_retries(self.request, "GET", sitemap, f"{self.SOURCE}.sitemap")
+                status = response.status
+                body = await response.body() if status == 200 else None
+                await response.dispose()
+            except Exception as e:
+                print(f"⚠️ Skipping sitemap {sitemap}: {e}")
+                metrics.ERRORS.inc("sitemap", self.SOURCE)
+                continue
+            if body is None:
+                # A fallback from SITEMAP_URLS the site does not have, or a dead index entry
+                print(f"⚠️ Skipping sitemap {sitemap}: HTTP {status}")
+                metrics.ERRORS.inc("sitemap", self.SOURCE)
+                continue
+
+            try:
+                for kind, loc, lastmod in parse_sitemap(body):
+                    if kind == "sitemap":
+                        if depth < MAX_SITEMAP_DEPTH:
+                            queue.append((urljoin(sitemap, loc), depth + 1))
+                    else:
+                        path = urlsplit(loc).path
+                        if path.startswith(root) and self.LISTING_URL_PATTERN.search(path[len(root):]):
+                            entries[loc] = lastmod
+            except (ParseError, zlib.error) as e:
+                # Keep what parsed before the error and carry on with the other sitemaps
+                print(f"⚠️ Malformed sitemap {sitemap}: {e}")
+                metrics.ERRORS.inc("sitemap", self.SOURCE)
+
+        metrics.ITEMS.inc(self.SOURCE, "sitemap", amount=len(entries))
+        return list(entries.items())
+
+    # ---------------- DETAILS ---------------- #
+
+    def parse_detail(self, html, url):
+        """Build a listing record from a detail page's HTML, or None if it has no title."""
+        text_classes = (self.DESCRIPTION_CLASS,) if self.DESCRIPTION_CLASS else ()
+        fields = listing_fields(html, url, text_classes)
+        if not fields["title"]:
+            return None
+
+        description = fields["texts"].get(self.DESCRIPTION_CLASS) or fields["description"]
+        return {
+            "title": fields["title"],
+            "price": fields["price"] or "",
+            "date": fields["date"],
+            "imageURL": fields["images"][0] if fields["images"] else "",
+            "linkURL": url,
+            "id": generate_listing_id(self.SOURCE, url),
+            "source": self.SOURCE,
+            "detailedDescription": description,
+            "location": fields["location"],
+            "contactInfo": fields["contact"],
+            "imageURLs": fields["images"],
+            "category": fields["category"],
+        }
+
+    async def fetch_details(self, entries, concurrency=CONCURRENCY):
+        """Fetch and parse the detail pages of `entries` ([(url, lastmod)]) concurrently.
+
+        Returns:
+            list[dict]: one record per page that parsed, with its `lastmod`.
+        """
+        items = []
+        semaphore = asyncio.Semaphore(concurrency)
+        remaining = len(entries)
+
+        async def fetch_one(url, lastmod):
+            nonlocal remaining
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await fetch_with_retries(self.request, "GET", url, f"{self.SOURCE}.detail")
+                    html = await response.text() if response.status == 200 else None
+                    await response.dispose()
+                except Exception as e:
+                    print(f"Skipping details for {url}: {e}")
+                    html = None
+            remaining -= 1
+            metrics.QUEUE_DEPTH.set(remaining, f"{self.SOURCE}.detail")
+
+            item = self.parse_detail(html, url) if html else None
+            if item is None:
+                metrics.ERRORS.inc("detail", self.SOURCE)
+                return
+            item["lastmod"] = lastmod
+            if not item["date"] and lastmod:
+                # Pages without a structured date were at least current at their lastmod
+                item["date"] = normalise_date(lastmod[:10])
+            items.append(item)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "detail", self.SOURCE)
+            metrics.ITEMS.inc(self.SOURCE, "detail")
+
+        await asyncio.gather(*(fetch_one(url, lastmod) for url, lastmod in entries))
+        normalise_items(items)
+        return items
+
+    # ---------------- COLLECT ---------------- #
+
+    def load_lastmods(self):
+        return load_lastmods(self.SOURCE)
+
+    def record_run(self, fetched, unchanged_ids):
+        """Remember the lastmods fetched and mark the skipped listings seen.
+
+        Listings skipped for an unchanged lastmod are still on the site, so
+        the liveness sweep must leave them alone.
+        """
+        store_lastmods(self.SOURCE, fetched)
+        db_utils.mark_seen(self.SOURCE, unchanged_ids)
+
+    async def collect_changes(self):
+        """Fetch the listings that are new or changed since the last run, writing nothing.
+
+        Use case: a shard worker sends both lists back to the parent,
+        which stores them with `store_changes`.
+
+        Returns:
+            tuple: (records fetched this run, ids of listings skipped for
+            an unchanged lastmod).
+        """
+        if not self.sitemaps:
+            await self.open()
+
+        entries = await self.walk_sitemaps()
+        known = self.load_lastmods()
+        # A URL without lastmod cannot be proven unchanged, so it is always fetched
+        changed = [(url, lastmod) for url, lastmod in entries
+                   if lastmod is None or known.get(url) != lastmod]
+        print(f"{self.SOURCE}: {len(entries)} listings in sitemaps, {len(changed)} new or changed")
+
+        items = await self.fetch_details(changed)
+        changed_urls = {url for url, _ in changed}
+        unchanged_ids = [generate_listing_id(self.SOURCE, url) for url, _ in entries if url not in changed_urls]
+        return items, unchanged_ids
+
+    def store_changes(self, items, unchanged_ids):
+        """Persist what `collect_changes` returned and remember its lastmods."""
+        self.persist(items)
+        self.record_run([(item["linkURL"], item["lastmod"]) for item in items], unchanged_ids)
+
+    async def collect(self):
+        """Fetch the listings that are new or changed since the last run and persist them.
+
+        Returns:
+            list[dict]: the records fetched this run.
+        """
+        items, unchanged_ids = await self.collect_changes()
+        self.store_changes(items, unchanged_ids)
+        return items
+
+    # ---------------- PERSIST ---------------- #
+
+    def persist(self, items, category=None):
+        """Upsert `items`, mark them seen and append them to the Excel output."""
+        for item in items:
+            with metrics.timer("db_upsert", self.SOURCE):
+                db_utils.upsert_product(item)
+            metrics.ITEMS.inc(self.SOURCE, "stored")
+
+        db_utils.mark_seen(self.SOURCE, [item["id"] for item in items])
+
+        meta = {"source": self.homeLink, "category": category, "records": len(items)}
+        with metrics.timer("file_output", self.SOURCE):
+            as_excel(items, meta=meta, file_path=self.OUTPUT_FILE_NAME)
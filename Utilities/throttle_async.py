@@ -0,0 +1,236 @@
+"""Utilities.throttle_async
+
+Per-host request scheduler shared by every navigation and HTTP fetch.
+
+Each host gets a `HostLimiter` combining a token bucket (requests per
+second) with an AIMD concurrency window. The rate doubles while healthy
+until the first sign of trouble (slow start), then grows additively; a
+429, a 5xx or a timeout cuts the rate by 30% and halves the window. The
+window only grows while callers are actually queueing for it. Limits
+come from each site's `THROTTLE` class attribute via `configure_host`.
+
+Use case:
+    limiter = get_limiter(url)
+    async with limiter.acquire() as slot:
+        response = await page.goto(url)
+        slot.record_status(response.status)
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+# Used for hosts that were never configured
+DEFAULT_LIMITS = {
+    "rate": 2.0,
+    "burst": 4,
+    "min_rate": 0.2,
+    "max_rate": 20.0,
+    "max_concurrency": 8,
+    "latency_target": 3.0,
+}
+
+# For replayed runs, where there is no server to protect
+UNLIMITED = {
+    "rate": 1e6,
+    "burst": 10 ** 6,
+    "min_rate": 1e6,
+    "max_rate": 1e6,
+    "max_concurrency": 10 ** 6,
+}
+
+THROTTLE_STATUSES = {429, 503}
+
+_limiters = {}
+
+
+def _host(url_or_host: str) -> str:
+    return urlsplit(url_or_host).netloc or url_or_host
+
+
+class Slot:
+    """Handle for one in-flight request; report how it went before exit."""
+
+    def __init__(self):
+        self.outcome = None
+        self.retry_after = None
+
+    def record_status(self, status: int, retry_after: float | None = None):
+        if status in THROTTLE_STATUSES:
+            self.outcome = "throttled"
+            self.retry_after = retry_after
+        elif status >= 500:
+            self.outcome = "error"
+        else:
+            self.outcome = "ok"
+
+    def record_timeout(self):
+        self.outcome = "timeout"
+
+    def record_error(self):
+        self.outcome = "error"
+
+
+class HostLimiter:
+    """Token bucket plus AIMD concurrency for one host.
+
+    Args:
+        rate: starting requests per second.
+        burst: token bucket depth.
+        min_rate / max_rate: bounds for the adaptive rate.
+        max_concurrency: ceiling for the adaptive in-flight window.
+        latency_target: seconds; slower responses stop additive growth.
+    """
+
+    def __init__(self, rate=2.0, burst=4, min_rate=0.2, max_rate=20.0,
+                 max_concurrency=8, latency_target=3.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+
+        self.concurrency = 1
+        self.in_flight = 0
+        self.latency = None  # EWMA of response time in seconds
+
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._backed_off_at = 0.0
+        self._healthy_streak = 0
+        self._window_acks = 0
+        self._slow_start = True
+        self._rate_bound = False
+        self._window_full = False
+        self._slot_freed = asyncio.Condition()
+        self._bucket_lock = asyncio.Lock()
+
+        self.stats = {"ok": 0, "throttled": 0, "error": 0, "timeout": 0}
+
+    # ---------------- ADMISSION ---------------- #
+
+    async def _take_token(self):
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                # The rate, not the window, is what is holding requests back
+                self._rate_bound = True
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Wait for a rate token and a concurrency slot, then yield a `Slot`.
+
+        Exceptions escaping the block count as errors (timeouts as
+        timeouts) unless the caller already recorded an outcome.
+        """
+        await self._take_token()
+
+        async with self._slot_freed:
+            if self.in_flight >= self.concurrency:
+                # The window, not the rate, is what held this request back
+                self._window_full = True
+                await self._slot_freed.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+
+        slot = Slot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except BaseException as e:
+            if slot.outcome is None:
+                is_timeout = isinstance(e, asyncio.TimeoutError) or "Timeout" in type(e).__name__
+                slot.outcome = "timeout" if is_timeout else "error"
+            raise
+        finally:
+            self._observe(slot, time.monotonic() - started)
+            async with self._slot_freed:
+                self.in_flight -= 1
+                self._slot_freed.notify_all()
+
+    # ---------------- ADAPTATION ---------------- #
+
+    def _observe(self, slot: Slot, elapsed: float):
+        outcome = slot.outcome or "ok"
+        self.stats[outcome] += 1
+
+        if outcome == "ok":
+            self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+            if self.latency > self.latency_target:
+                return
+            self._healthy_streak += 1
+            self._window_acks += 1
+
+            # Window: +1 per window's worth of healthy responses while it is the bottleneck
+            if self._window_full and self._window_acks >= self.concurrency:
+                self._window_acks = 0
+                self._window_full = False
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+            # Rate: one step per second's worth of healthy responses while it is the bottleneck
+            if self._healthy_streak >= max(1, self.rate):
+                self._healthy_streak = 0
+                if self._rate_bound:
+                    self._rate_bound = False
+                    step = self.rate if self._slow_start else max(0.5, self.rate * 0.05)
+                    self.rate = min(self.max_rate, self.rate + step)
+            return
+
+        self._healthy_streak = 0
+        self._window_acks = 0
+        now = time.monotonic()
+
+        if slot.retry_after:
+            self._paused_until = max(self._paused_until, now + slot.retry_after)
+
+        # One multiplicative decrease per round trip; the rest of a burst is the same signal
+        if now - self._backed_off_at < max(1.0, self.latency or 0.0):
+            return
+        self._backed_off_at = now
+        self._slow_start = False
+        self.rate = max(self.min_rate, self.rate * 0.7)
+        self.concurrency = max(1, self.concurrency // 2)
+        self._tokens = min(self._tokens, 0.0)
+
+
+def configure_host(url_or_host: str, **limits) -> HostLimiter:
+    """Create (or replace) the limiter for a host with the given limits.
+
+    Use case: called once per site with its `THROTTLE` class attribute.
+    """
+    limiter = HostLimiter(**{**DEFAULT_LIMITS, **limits})
+    _limiters[_host(url_or_host)] = limiter
+    return limiter
+
+
+def get_limiter(url_or_host: str) -> HostLimiter:
+    """Return the limiter for the URL's host, creating a default one."""
+    host = _host(url_or_host)
+    if host not in _limiters:
+        _limiters[host] = HostLimiter(**DEFAULT_LIMITS)
+    return _limiters[host]
+
+
+def snapshot() -> dict:
+    """Return the current rate, window and outcome counts per host."""
+    return {
+        host: {
+            "rate": round(limiter.rate, 2),
+            "concurrency": limiter.concurrency,
+            "latency": round(limiter.latency, 3) if limiter.latency is not None else None,
+            **limiter.stats,
+        }
+        for host, limiter in _limiters.items()
+    }
@@ -0,0 +1,334 @@
+"""Utilities.work_queue
+
+Postgres-backed job queue that lets several worker processes (or
+machines) share one crawl.
+
+Jobs are category list pages and detail URLs in `crawl_jobs`, unique per
+(crawl_id, kind, url) so enqueueing is idempotent. Workers claim jobs with
+`FOR UPDATE SKIP LOCKED`, hold them under a lease they renew with
+heartbeats, and complete them only if they still own the lease.
+Abandoned leases go back to `pending` via `requeue_expired`.
+"""
+
+import asyncio
+import json
+import os
+import socket
+
+from psycopg2.extras import Json, execute_values
+
+from Utilities import db_utils, metrics
+
+# Seconds a claim stays valid without a heartbeat
+LEASE_SECONDS = 120
+
+# Attempts before a job is parked as failed
+MAX_ATTEMPTS = 3
+
+
+def create_queue_table():
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_jobs (
+            job_id BIGSERIAL PRIMARY KEY,
+            crawl_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            source TEXT NOT NULL,
+            url TEXT NOT NULL,
+            payload JSONB,
+
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            worker_id TEXT,
+            lease_until TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            error TEXT,
+
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+
+            UNIQUE (crawl_id, kind, url)
+        );
+    """)
+
+    # Claims scan only pending rows, oldest first
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS crawl_jobs_pending_idx
+        ON crawl_jobs (job_id) WHERE status = 'pending';
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS crawl_jobs_running_idx
+        ON crawl_jobs (lease_until) WHERE status = 'running';
+    """)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_jobs(crawl_id, kind, source, jobs):
+    """Add jobs given as (url, payload) pairs; each URL is queued once per crawl.
+
+    When a URL is queued again with a `category` list the existing job
+    lacks (the same ad listed under two categories), the categories are
+    merged into its payload and, in the same transaction, into the stored
+    listing. The job itself is not re-run: a pending job upserts the
+    merged payload, and a running one picks the merge up in
+    `settle_categories`.
+
+    Returns:
+        int: number of jobs queued or updated.
+    """
+    if not jobs:
+        return 0
+
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    rows = execute_values(cur, """
+        INSERT INTO crawl_jobs (crawl_id, kind, source, url, payload)
+        VALUES %s
+        ON CONFLICT (crawl_id, kind, url) DO UPDATE
+        SET payload = jsonb_set(crawl_jobs.payload, '{category}', (
+                SELECT jsonb_agg(DISTINCT c)
+                FROM jsonb_array_elements(
+                    crawl_jobs.payload->'category' || EXCLUDED.payload->'category'
+                ) AS c
+            ))
+        WHERE jsonb_typeof(EXCLUDED.payload->'category') = 'array'
+          AND jsonb_typeof(crawl_jobs.payload->'category') = 'array'
+          AND NOT (crawl_jobs.payload->'category' @> EXCLUDED.payload->'category')
+        RETURNING job_id, xmax <> 0 AS merged, payload;
+    """, [(crawl_id, kind, source, url, Json(payload)) for url, payload in jobs], fetch=True)
+
+    # A done or running job will not write the merged payload; put it on the listing directly
+    for _, merged, payload in rows:
+        if merged and payload.get("id"):
+            db_utils.merge_categories(cur, source, payload["id"], payload["category"])
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return len(rows)
+
+
+def settle_categories(job):
+    """Union categories merged into a job's payload since it was claimed into its listing.
+
+    Call after the job's upsert. Reading the payload FOR UPDATE waits for
+    a merge still in flight; a merge that starts later finds the listing
+    stored and updates it itself.
+    """
+    listing_id = (job["payload"] or {}).get("id")
+    if not listing_id:
+        return
+
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT payload->'category' FROM crawl_jobs WHERE job_id = %s FOR UPDATE;", (job["job_id"],))
+    row = cur.fetchone()
+    if row and isinstance(row[0], list):
+        db_utils.merge_categories(cur, job["source"], listing_id, row[0])
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def claim_job(worker_id, crawl_id=None, lease_seconds=LEASE_SECONDS):
+    """Claim the oldest pending job, or return None when there is none.
+
+    SKIP LOCKED lets concurrent workers pass over rows another worker is
+    claiming instead of queueing behind it.
+    """
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        UPDATE crawl_jobs
+        SET status = 'running',
+            worker_id = %(worker_id)s,
+            attempts = attempts + 1,
+            lease_until = NOW() + make_interval(secs => %(lease)s),
+            heartbeat_at = NOW()
+        WHERE job_id = (
+            SELECT job_id
+            FROM crawl_jobs
+            WHERE status = 'pending'
+              AND (%(crawl_id)s IS NULL OR crawl_id = %(crawl_id)s)
+            ORDER BY job_id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING job_id, crawl_id, kind, source, url, payload, attempts;
+    """, {"worker_id": worker_id, "crawl_id": crawl_id, "lease": lease_seconds})
+
+    row = cur.fetchone()
+    columns = [desc[0] for desc in cur.description]
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return dict(zip(columns, row)) if row else None
+
+
+def heartbeat(job_id, worker_id, lease_seconds=LEASE_SECONDS):
+    """Extend the lease; returns False if this worker no longer owns the job."""
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        UPDATE crawl_jobs
+        SET lease_until = NOW() + make_interval(secs => %s), heartbeat_at = NOW()
+        WHERE job_id = %s AND worker_id = %s AND status = 'running';
+    """, (lease_seconds, job_id, worker_id))
+    owned = cur.rowcount == 1
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return owned
+
+
+def complete_job(job_id, worker_id):
+    """Mark a job done if this worker still owns it.
+
+    Completing twice, or after the lease moved to another worker, is a
+    no-op that returns False; job results must be idempotent writes.
+    """
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        UPDATE crawl_jobs
+        SET status = 'done', finished_at = NOW(), lease_until = NULL, error = NULL
+        WHERE job_id = %s AND worker_id = %s AND status = 'running';
+    """, (job_id, worker_id))
+    completed = cur.rowcount == 1
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return completed
+
+
+def fail_job(job_id, worker_id, error, max_attempts=MAX_ATTEMPTS):
+    """Return a job to pending, or park it as failed after `max_attempts`."""
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        UPDATE crawl_jobs
+        SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+            worker_id = NULL, lease_until = NULL, error = %s
+        WHERE job_id = %s AND worker_id = %s AND status = 'running';
+    """, (max_attempts, str(error)[:2000], job_id, worker_id))
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def requeue_expired(max_attempts=MAX_ATTEMPTS):
+    """Release jobs whose lease ran out (crashed or stalled workers).
+
+    Returns:
+        int: number of jobs released.
+    """
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        UPDATE crawl_jobs
+        SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+            worker_id = NULL, lease_until = NULL, error = 'lease expired'
+        WHERE status = 'running' AND lease_until < NOW();
+    """, (max_attempts,))
+    released = cur.rowcount
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return released
+
+
+def queue_depth(crawl_id=None):
+    """Return job counts per status, e.g. {"pending": 12, "running": 3}."""
+    conn = db_utils.get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT status, count(*)
+        FROM crawl_jobs
+        WHERE %(crawl_id)s IS NULL OR crawl_id = %(crawl_id)s
+        GROUP BY status;
+    """, {"crawl_id": crawl_id})
+    depth = dict(cur.fetchall())
+
+    cur.close()
+    conn.close()
+    return depth
+
+
+async def _keep_lease(job_id, worker_id, lease_seconds):
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        if not heartbeat(job_id, worker_id, lease_seconds):
+            print(f"⚠️ Lost lease on job {job_id}")
+            return
+
+
+async def run_worker(site, crawl_id=None, worker_id=None, lease_seconds=LEASE_SECONDS,
+                     idle_timeout=30.0, poll_interval=1.0):
+    """Claim and run jobs with `site.run_job(job)` until the crawl drains.
+
+    Use case: start one per process/node against the same database. The
+    worker exits once nothing is pending or running for `idle_timeout`
+    seconds.
+
+    Returns:
+        dict: counts of completed and failed jobs for this worker.
+    """
+    worker_id = worker_id or default_worker_id()
+    done = failed = 0
+    idle = 0.0
+
+    while True:
+        job = claim_job(worker_id, crawl_id, lease_seconds)
+        if job is None:
+            requeue_expired()
+            depth = queue_depth(crawl_id)
+            metrics.QUEUE_DEPTH.set(depth.get("pending", 0), f"crawl:{crawl_id or '*'}")
+            # Running jobs may still enqueue more work, so keep waiting for them
+            if depth.get("pending") or depth.get("running"):
+                idle = 0.0
+            elif idle >= idle_timeout:
+                break
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
+            continue
+
+        idle = 0.0
+        keeper = asyncio.create_task(_keep_lease(job["job_id"], worker_id, lease_seconds))
+        try:
+            await site.run_job(job)
+        except Exception as e:
+            print(f"Job {job['job_id']} ({job['kind']} {job['url']}) failed: {e}")
+            fail_job(job["job_id"], worker_id, e)
+            failed += 1
+        else:
+            complete_job(job["job_id"], worker_id)
+            done += 1
+        finally:
+            keeper.cancel()
+
+    summary = {"worker_id": worker_id, "done": done, "failed": failed}
+    print(f"Worker finished: {json.dumps(summary)}")
+    return summary